@@ -209,6 +209,22 @@ TEMPLATE_CONTEXT_PROCESSORS = (
 # Output to use in template system for invalid (e.g. misspelled) variables.
 TEMPLATE_STRING_IF_INVALID = ''
 
+# Whether to compile templates to Python functions rather than interpreting
+# them. Ignored when TEMPLATE_DEBUG is True.
+TEMPLATE_COMPILE = False
+
+# Whether to record the time spent rendering every template, block and tag,
+# and send it with the django.template.profiling.template_profiled signal.
+TEMPLATE_PROFILING = False
+
+# Number of seconds between checks of the source files of the templates cached
+# by django.template.loaders.cached.Loader for changes. None disables checks.
+TEMPLATE_CACHE_CHECK_INTERVAL = None
+
+# Directory where django.template.loaders.persistent.Loader stores parsed
+# templates. None disables the on-disk cache.
+TEMPLATE_CACHE_DIR = None
+
 # Default email address to use for various automated correspondence from
 # the site managers.
 DEFAULT_FROM_EMAIL = 'webmaster@localhost'
@@ -456,6 +472,7 @@ SESSION_COOKIE_SECURE = False                           # Whether the session co
 SESSION_COOKIE_PATH = '/'                               # The path of the session cookie.
 SESSION_COOKIE_HTTPONLY = True                          # Whether to use the non-RFC standard httpOnly flag (IE, FF3+, others)
 SESSION_SAVE_EVERY_REQUEST = False                      # Whether to save the session data on every request.
+SESSION_EXPIRY_REFRESH_FRACTION = 0                     # Fraction of the session age that must elapse before an unchanged session is saved again by the database backends.
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False                 # Whether a user's session cookie expires when the Web browser is closed.
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'  # The module to store session data
 SESSION_FILE_PATH = None                                # Directory to store session files if using the file session module. If None, the backend will use a sensible default.
@@ -472,6 +489,9 @@ CACHES = {
 CACHE_MIDDLEWARE_KEY_PREFIX = ''
 CACHE_MIDDLEWARE_SECONDS = 600
 CACHE_MIDDLEWARE_ALIAS = 'default'
+# Number of seconds the cache middleware keeps serving an expired page while
+# a single request regenerates it.
+CACHE_MIDDLEWARE_STALE_SECONDS = 0
 
 ####################
 # COMMENTS         #
@@ -1,3 +1,6 @@
+from django.template.context import LazyValue
+
+
 # PermWrapper and PermLookupDict proxy the permissions system into objects that
 # the template system can understand.
 
@@ -33,6 +36,8 @@ def auth(request):
 
     If there is no 'user' attribute in the request, uses AnonymousUser (from
     django.contrib.auth).
+
+    'perms' is only computed if the template uses it.
     """
     if hasattr(request, 'user'):
         user = request.user
@@ -42,5 +47,5 @@ def auth(request):
 
     return {
         'user': user,
-        'perms': PermWrapper(user),
+        'perms': LazyValue(PermWrapper, user),
     }
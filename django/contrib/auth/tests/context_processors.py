@@ -2,7 +2,9 @@ import os
 
 from django.conf import global_settings
 from django.contrib.auth import authenticate
+from django.contrib.auth.context_processors import auth
 from django.db.models import Q
+from django.http import HttpRequest
 from django.template import context
 from django.test import TestCase
 from django.test.utils import override_settings
@@ -45,6 +47,19 @@ class AuthContextProcessorTests(TestCase):
         response = self.client.get('/auth_processor_attr_access/')
         self.assertContains(response, "Session accessed")
 
+    def test_perms_lazy(self):
+        """
+        Tests that perms is only computed when it's looked up.
+        """
+        variables = auth(HttpRequest())
+        self.assertTrue(variables['user'].is_anonymous())
+        self.assertFalse(variables['perms'].evaluated)
+        c = context.Context(variables)
+        self.assertTrue(c['user'].is_anonymous())
+        self.assertFalse(variables['perms'].evaluated)
+        self.assertFalse(c['perms']['auth'])
+        self.assertTrue(variables['perms'].evaluated)
+
     def test_perms_attrs(self):
         self.client.login(username='super', password='secret')
         response = self.client.get('/auth_processor_perms/')
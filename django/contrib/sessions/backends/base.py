@@ -13,6 +13,9 @@ from django.utils.crypto import get_random_string
 from django.utils.crypto import salted_hmac
 from django.utils import timezone
 
+# Number of sessions clear_expired() removes per batch by default.
+CLEAR_EXPIRED_BATCH_SIZE = 1000
+
 class CreateError(Exception):
     """
     Used internally as a consistent exception type to catch from save (see the
@@ -278,3 +281,16 @@ class SessionBase(object):
         Loads the session data and returns a dictionary.
         """
         raise NotImplementedError
+
+    @classmethod
+    def clear_expired(cls, batch_size=CLEAR_EXPIRED_BATCH_SIZE, progress=None):
+        """
+        Removes expired sessions from the session store, at most batch_size
+        at a time, and returns the number of sessions removed. If given,
+        progress is called with the running total after each batch.
+
+        If this operation isn't possible on a given backend, it should raise
+        NotImplementedError. If it isn't necessary, because the backend has
+        a built-in expiration mechanism, it should be a no-op.
+        """
+        raise NotImplementedError
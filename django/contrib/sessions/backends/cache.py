@@ -1,4 +1,5 @@
-from django.contrib.sessions.backends.base import SessionBase, CreateError
+from django.contrib.sessions.backends.base import (SessionBase, CreateError,
+    CLEAR_EXPIRED_BATCH_SIZE)
 from django.core.cache import cache
 
 KEY_PREFIX = "django.contrib.sessions.cache"
@@ -64,3 +65,8 @@ class SessionStore(SessionBase):
                 return
             session_key = self.session_key
         self._cache.delete(KEY_PREFIX + session_key)
+
+    @classmethod
+    def clear_expired(cls, batch_size=CLEAR_EXPIRED_BATCH_SIZE, progress=None):
+        # The cache expires sessions by itself.
+        return 0
@@ -5,6 +5,7 @@ Cached, database-backed sessions.
 from django.conf import settings
 from django.contrib.sessions.backends.db import SessionStore as DBStore
 from django.core.cache import cache
+from django.utils import timezone
 
 KEY_PREFIX = "django.contrib.sessions.cached_db"
 
@@ -23,14 +24,18 @@ class SessionStore(DBStore):
 
     def load(self):
         try:
-            data = cache.get(self.cache_key, None)
+            stored = cache.get(self.cache_key, None)
         except Exception:
             # Some backends (e.g. memcache) raise an exception on invalid
             # cache keys. If this happens, reset the session. See #17810.
-            data = None
-        if data is None:
-            data = super(SessionStore, self).load()
-            cache.set(self.cache_key, data, settings.SESSION_COOKIE_AGE)
+            stored = None
+        # The cache holds the encoded data and expiry date of the database row.
+        if isinstance(stored, tuple) and stored[1] > timezone.now():
+            self._stored = stored
+            return self.decode(stored[0])
+        data = super(SessionStore, self).load()
+        if self._stored is not None:
+            cache.set(self.cache_key, self._stored, settings.SESSION_COOKIE_AGE)
         return data
 
     def exists(self, session_key):
@@ -38,9 +43,9 @@ class SessionStore(DBStore):
             return True
         return super(SessionStore, self).exists(session_key)
 
-    def save(self, must_create=False):
-        super(SessionStore, self).save(must_create)
-        cache.set(self.cache_key, self._session, settings.SESSION_COOKIE_AGE)
+    def _write(self, session_data, expire_date, must_create=False):
+        super(SessionStore, self)._write(session_data, expire_date, must_create)
+        cache.set(self.cache_key, self._stored, settings.SESSION_COOKIE_AGE)
 
     def delete(self, session_key=None):
         super(SessionStore, self).delete(session_key)
@@ -1,4 +1,6 @@
-from django.contrib.sessions.backends.base import SessionBase, CreateError
+from django.conf import settings
+from django.contrib.sessions.backends.base import (SessionBase, CreateError,
+    CLEAR_EXPIRED_BATCH_SIZE)
 from django.core.exceptions import SuspiciousOperation
 from django.db import IntegrityError, transaction, router
 from django.utils.encoding import force_unicode
@@ -11,6 +13,9 @@ class SessionStore(SessionBase):
     """
     def __init__(self, session_key=None):
         super(SessionStore, self).__init__(session_key)
+        # The encoded data and expiry date last read from or written to the
+        # database, used to skip saves that wouldn't change anything.
+        self._stored = None
 
     def load(self):
         try:
@@ -18,6 +23,7 @@ class SessionStore(SessionBase):
                 session_key = self.session_key,
                 expire_date__gt=timezone.now()
             )
+            self._stored = (force_unicode(s.session_data), s.expire_date)
             return self.decode(force_unicode(s.session_data))
         except (Session.DoesNotExist, SuspiciousOperation):
             self.create()
@@ -46,11 +52,34 @@ class SessionStore(SessionBase):
         True, a database error will be raised if the saving operation doesn't
         create a *new* entry (as opposed to possibly updating an existing
         entry).
+
+        The database isn't touched if the session data is unchanged and the
+        expiry date would move by less than SESSION_EXPIRY_REFRESH_FRACTION
+        of the session's age.
         """
+        session_data = self.encode(self._get_session(no_load=must_create))
+        expire_date = self.get_expiry_date()
+        if not must_create and self._is_unchanged(session_data, expire_date):
+            return
+        self._write(session_data, expire_date, must_create)
+
+    def _is_unchanged(self, session_data, expire_date):
+        if self._stored is None:
+            return False
+        stored_data, stored_expire_date = self._stored
+        if session_data != stored_data:
+            return False
+        # The expiry date may also have moved back, e.g. when
+        # SESSION_COOKIE_AGE was lowered.
+        delta = expire_date - stored_expire_date
+        elapsed = abs(delta.days * 86400 + delta.seconds + delta.microseconds / 1000000.0)
+        return elapsed <= settings.SESSION_EXPIRY_REFRESH_FRACTION * self.get_expiry_age()
+
+    def _write(self, session_data, expire_date, must_create=False):
         obj = Session(
             session_key=self._get_or_create_session_key(),
-            session_data=self.encode(self._get_session(no_load=must_create)),
-            expire_date=self.get_expiry_date()
+            session_data=session_data,
+            expire_date=expire_date
         )
         using = router.db_for_write(Session, instance=obj)
         sid = transaction.savepoint(using=using)
@@ -61,17 +90,41 @@ class SessionStore(SessionBase):
                 transaction.savepoint_rollback(sid, using=using)
                 raise CreateError
             raise
+        self._stored = (session_data, expire_date)
 
     def delete(self, session_key=None):
         if session_key is None:
             if self.session_key is None:
                 return
             session_key = self.session_key
+        if session_key == self.session_key:
+            self._stored = None
         try:
             Session.objects.get(session_key=session_key).delete()
         except Session.DoesNotExist:
             pass
 
+    @classmethod
+    def clear_expired(cls, batch_size=CLEAR_EXPIRED_BATCH_SIZE, progress=None):
+        """
+        Deletes expired sessions in batches, each in its own short
+        transaction, so that the session table is never locked for long.
+        """
+        using = router.db_for_write(Session)
+        now = timezone.now()
+        expired = Session.objects.using(using).filter(expire_date__lt=now)
+        count = 0
+        while True:
+            session_keys = list(expired.values_list('session_key', flat=True)[:batch_size])
+            if not session_keys:
+                break
+            Session.objects.using(using).filter(pk__in=session_keys).delete()
+            transaction.commit_unless_managed(using=using)
+            count += len(session_keys)
+            if progress is not None:
+                progress(count)
+        return count
+
 
 # At bottom to avoid circular import
 from django.contrib.sessions.models import Session
@@ -1,10 +1,13 @@
+import datetime
 import errno
 import os
 import tempfile
 
 from django.conf import settings
-from django.contrib.sessions.backends.base import SessionBase, CreateError
+from django.contrib.sessions.backends.base import (SessionBase, CreateError,
+    CLEAR_EXPIRED_BATCH_SIZE)
 from django.core.exceptions import SuspiciousOperation, ImproperlyConfigured
+from django.utils import timezone
 
 
 class SessionStore(SessionBase):
@@ -145,3 +148,59 @@ class SessionStore(SessionBase):
 
     def clean(self):
         pass
+
+    def _is_expired(self, session_file_name):
+        """
+        Returns True if the session stored in the given file has expired,
+        i.e. if its expiry age has elapsed since the file was last written.
+        """
+        try:
+            modified = os.stat(session_file_name).st_mtime
+            session_file = open(session_file_name, "rb")
+            try:
+                file_data = session_file.read()
+            finally:
+                session_file.close()
+        except (IOError, OSError):
+            # The session was deleted meanwhile.
+            return False
+        try:
+            self._session_cache = self.decode(file_data) if file_data else {}
+        except (EOFError, SuspiciousOperation):
+            return True
+        modified = datetime.datetime.fromtimestamp(modified)
+        if settings.USE_TZ:
+            modified = timezone.make_aware(modified, timezone.get_default_timezone())
+        expiry = self.get('_session_expiry')
+        if isinstance(expiry, datetime.datetime):
+            return expiry < timezone.now()
+        if not expiry:   # Checks both None and 0 cases
+            expiry = settings.SESSION_COOKIE_AGE
+        return modified + datetime.timedelta(seconds=expiry) < timezone.now()
+
+    @classmethod
+    def clear_expired(cls, batch_size=CLEAR_EXPIRED_BATCH_SIZE, progress=None):
+        """
+        Deletes the files of expired sessions. The storage directory is
+        listed once; progress is reported every batch_size deletions.
+        """
+        store = cls()
+        prefix = store.file_prefix
+        count = 0
+        for file_name in os.listdir(store.storage_path):
+            if not file_name.startswith(prefix):
+                continue
+            session_key = file_name[len(prefix):]
+            # Skip the temporary files written by save().
+            if not set(session_key).issubset(cls.VALID_KEY_CHARS):
+                continue
+            session_file_name = os.path.join(store.storage_path, file_name)
+            if not store._is_expired(session_file_name):
+                continue
+            store.delete(session_key)
+            count += 1
+            if progress is not None and count % batch_size == 0:
+                progress(count)
+        if progress is not None and count % batch_size:
+            progress(count)
+        return count
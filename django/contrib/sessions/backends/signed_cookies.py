@@ -6,7 +6,8 @@ except ImportError:
 from django.conf import settings
 from django.core import signing
 
-from django.contrib.sessions.backends.base import SessionBase
+from django.contrib.sessions.backends.base import (SessionBase,
+    CLEAR_EXPIRED_BATCH_SIZE)
 
 
 class PickleSerializer(object):
@@ -91,3 +92,8 @@ class SessionStore(SessionBase):
         return signing.dumps(session_cache, compress=True,
             salt='django.contrib.sessions.backends.signed_cookies',
             serializer=PickleSerializer)
+
+    @classmethod
+    def clear_expired(cls, batch_size=CLEAR_EXPIRED_BATCH_SIZE, progress=None):
+        # Sessions live in the clients' cookies; there is nothing to clear.
+        return 0
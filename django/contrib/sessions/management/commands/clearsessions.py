@@ -0,0 +1,34 @@
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import NoArgsCommand, CommandError
+from django.contrib.sessions.backends.base import CLEAR_EXPIRED_BATCH_SIZE
+from django.utils.importlib import import_module
+
+
+class Command(NoArgsCommand):
+    option_list = NoArgsCommand.option_list + (
+        make_option('--batch-size', action='store', dest='batch_size',
+            type='int', default=CLEAR_EXPIRED_BATCH_SIZE,
+            help='Number of sessions to delete per transaction. Default is %d.' % CLEAR_EXPIRED_BATCH_SIZE),
+    )
+    help = "Can be run as a cronjob or directly to clean out expired sessions."
+
+    def handle_noargs(self, **options):
+        verbosity = int(options.get('verbosity', 1))
+        batch_size = options.get('batch_size', CLEAR_EXPIRED_BATCH_SIZE)
+        if batch_size < 1:
+            raise CommandError("--batch-size must be a positive integer.")
+
+        def progress(count):
+            if verbosity >= 2:
+                self.stdout.write("Deleted %d expired sessions so far.\n" % count)
+
+        engine = import_module(settings.SESSION_ENGINE)
+        try:
+            count = engine.SessionStore.clear_expired(batch_size, progress)
+        except NotImplementedError:
+            raise CommandError("Session engine '%s' doesn't support clearing "
+                               "expired sessions." % settings.SESSION_ENGINE)
+        if verbosity >= 1:
+            self.stdout.write("Deleted %d expired sessions.\n" % count)
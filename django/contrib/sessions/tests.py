@@ -1,7 +1,9 @@
 from datetime import datetime, timedelta
+import os
 import shutil
 import string
 import tempfile
+import time
 import warnings
 
 from django.conf import settings
@@ -12,13 +14,16 @@ from django.contrib.sessions.backends.file import SessionStore as FileSession
 from django.contrib.sessions.backends.signed_cookies import SessionStore as CookieSession
 from django.contrib.sessions.models import Session
 from django.contrib.sessions.middleware import SessionMiddleware
+from django.core import management
 from django.core.cache.backends.base import CacheKeyWarning
 from django.core.exceptions import ImproperlyConfigured, SuspiciousOperation
+from django.db.models import signals
 from django.http import HttpResponse
 from django.test import TestCase, RequestFactory
 from django.test.utils import override_settings, get_warnings_state, restore_warnings_state
 from django.utils import timezone
 from django.utils import unittest
+from StringIO import StringIO
 
 
 class SessionTestsMixin(object):
@@ -286,6 +291,102 @@ class DatabaseSessionTests(SessionTestsMixin, TestCase):
         del self.session._session_cache
         self.assertEqual(self.session['y'], 2)
 
+    def test_unchanged_session_not_saved(self):
+        self.session['x'] = 1
+        self.session.save()
+        session = self.backend(self.session.session_key)
+        self.assertEqual(session['x'], 1)
+        # Nothing changed, and the expiry date only moves by a tiny fraction
+        # of the session age.
+        with override_settings(SESSION_EXPIRY_REFRESH_FRACTION=0.1):
+            with self.assertNumQueries(0):
+                session.save()
+        # The expiry date is refreshed by default (a SELECT and an UPDATE)
+        with self.assertNumQueries(2):
+            session.save()
+        session['x'] = 2
+        with override_settings(SESSION_EXPIRY_REFRESH_FRACTION=0.1):
+            with self.assertNumQueries(2):
+                session.save()
+        del session._session_cache
+        self.assertEqual(session['x'], 2)
+
+    def test_unchanged_session_shorter_expiry_saved(self):
+        self.session['x'] = 1
+        self.session.save()
+        session = self.backend(self.session.session_key)
+        self.assertEqual(session['x'], 1)
+        with override_settings(SESSION_COOKIE_AGE=60,
+                               SESSION_EXPIRY_REFRESH_FRACTION=0.1):
+            session.save()
+        s = Session.objects.get(session_key=self.session.session_key)
+        self.assertTrue(s.expire_date <= timezone.now() + timedelta(seconds=60))
+
+    def test_clearsessions_command(self):
+        """
+        Test clearsessions command for clearing expired sessions.
+        """
+        self.assertEqual(0, Session.objects.count())
+        for i in range(3):
+            session = self.backend()
+            session['foo'] = 'bar'
+            session.set_expiry(-3600 if i else 3600)
+            session.save()
+        self.assertEqual(3, Session.objects.count())
+        out = StringIO()
+        with override_settings(SESSION_ENGINE=self.backend.__module__):
+            management.call_command('clearsessions', batch_size=1,
+                                    verbosity=2, stdout=out)
+        self.assertEqual(1, Session.objects.count())
+        self.assertEqual(out.getvalue(),
+                         "Deleted 1 expired sessions so far.\n"
+                         "Deleted 2 expired sessions so far.\n"
+                         "Deleted 2 expired sessions.\n")
+
+    def test_clear_expired_queries(self):
+        for i in range(5):
+            session = self.backend()
+            session['foo'] = 'bar'
+            session.set_expiry(-3600)
+            session.save()
+        # Three queries per batch (selecting the expired keys and the
+        # sessions, deleting them), plus a final SELECT
+        with self.assertNumQueries(10):
+            self.assertEqual(self.backend.clear_expired(batch_size=2), 5)
+
+    def test_clear_expired_signals(self):
+        deleted = []
+        def receiver(sender, instance, **kwargs):
+            deleted.append(instance.session_key)
+        for i in range(3):
+            session = self.backend()
+            session['foo'] = 'bar'
+            session.set_expiry(-3600)
+            session.save()
+        signals.post_delete.connect(receiver, sender=Session)
+        try:
+            self.backend.clear_expired(batch_size=2)
+        finally:
+            signals.post_delete.disconnect(receiver, sender=Session)
+        self.assertEqual(len(deleted), 3)
+
+    def test_cleanup_command(self):
+        # The deprecated cleanup command silently deletes expired database
+        # sessions, whatever the session engine.
+        session = self.backend()
+        session.set_expiry(-3600)
+        session.save()
+        out = StringIO()
+        warnings_state = get_warnings_state()
+        warnings.simplefilter('ignore', PendingDeprecationWarning)
+        try:
+            with override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cache'):
+                management.call_command('cleanup', stdout=out)
+        finally:
+            restore_warnings_state(warnings_state)
+        self.assertEqual(Session.objects.count(), 0)
+        self.assertEqual(out.getvalue(), '')
+
 
 @override_settings(USE_TZ=True)
 class DatabaseSessionWithTimeZoneTests(DatabaseSessionTests):
@@ -309,6 +410,22 @@ class CacheDBSessionTests(SessionTestsMixin, TestCase):
         self.assertEqual(self.session.load(), {})
         restore_warnings_state(warnings_state)
 
+    @override_settings(SESSION_EXPIRY_REFRESH_FRACTION=0.1)
+    def test_unchanged_session_not_saved(self):
+        self.session['x'] = 1
+        self.session.save()
+        # Loading and saving back an unchanged session doesn't hit the
+        # database at all.
+        with self.assertNumQueries(0):
+            session = self.backend(self.session.session_key)
+            self.assertEqual(session['x'], 1)
+            session.save()
+        session['x'] = 2
+        with self.assertNumQueries(2):
+            session.save()
+        session = self.backend(self.session.session_key)
+        self.assertEqual(session['x'], 2)
+
 
 @override_settings(USE_TZ=True)
 class CacheDBSessionWithTimeZoneTests(CacheDBSessionTests):
@@ -331,6 +448,24 @@ class FileSessionTests(SessionTestsMixin, unittest.TestCase):
         shutil.rmtree(self.temp_session_store)
         super(FileSessionTests, self).tearDown()
 
+    def test_clear_expired(self):
+        for i in range(3):
+            session = self.backend()
+            session['foo'] = 'bar'
+            session.set_expiry(-3600 if i else 3600)
+            session.save()
+        # A session saved long ago, with the default expiry
+        session = self.backend()
+        session['foo'] = 'bar'
+        session.save()
+        old = datetime.now() - timedelta(seconds=settings.SESSION_COOKIE_AGE + 60)
+        old = time.mktime(old.timetuple())
+        os.utime(session._key_to_file(), (old, old))
+        counts = []
+        self.assertEqual(self.backend.clear_expired(batch_size=2, progress=counts.append), 3)
+        self.assertEqual(counts, [2, 3])
+        self.assertEqual(len(os.listdir(self.temp_session_store)), 1)
+
     @override_settings(
         SESSION_FILE_PATH="/if/this/directory/exists/you/have/a/weird/computer")
     def test_configuration_check(self):
@@ -1,6 +1,14 @@
 "Base Cache class."
 
+import math
+import random
+import time
 import warnings
+import zlib
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
 
 from django.core.exceptions import ImproperlyConfigured, DjangoRuntimeWarning
 from django.utils.encoding import smart_str
@@ -15,6 +23,61 @@ class CacheKeyWarning(DjangoRuntimeWarning):
 # Memcached does not accept keys longer than this.
 MEMCACHE_MAX_KEY_LENGTH = 250
 
+# Errors raised by the serializers and compressors for values they can't
+# encode or data they can't decode, e.g. because it was truncated.
+SERIALIZATION_ERRORS = (pickle.PickleError, EOFError, TypeError, ValueError, zlib.error)
+
+# Flags prepended to encoded values when a compressor is configured.
+COMPRESSED = 'z'
+UNCOMPRESSED = '-'
+
+# Number of seconds a recomputation lock taken by get_or_set() is held before
+# another client may take it over, e.g. because the holder died.
+DEFAULT_LOCK_TIMEOUT = 30
+
+# Number of seconds tag generation counters are kept. A value stored with a
+# tag whose counter has expired is treated as invalidated.
+TAG_TIMEOUT = 60 * 60 * 24 * 30
+
+class RefreshableValue(object):
+    """
+    A cached value along with the metadata needed to refresh it before it
+    expires. Stored by BaseCache.get_or_set() and by the cache middleware.
+    """
+    def __init__(self, value, expires, delta=0):
+        self.value = value
+        # Timestamp after which the value is considered stale.
+        self.expires = expires
+        # Number of seconds it took to compute the value.
+        self.delta = delta
+
+    def needs_refresh(self, beta=1.0, now=None):
+        """
+        Returns True if the value should be recomputed.
+
+        The decision is probabilistic: the closer the value is to its expiry
+        time, and the longer it took to compute, the likelier a refresh is.
+        This spreads recomputations out instead of having every client miss
+        at the same instant. A ``beta`` of 0 disables early refreshes.
+        """
+        if now is None:
+            now = time.time()
+        if beta <= 0 or not self.delta:
+            return now >= self.expires
+        # 1.0 - random() lies in (0, 1], so the logarithm is always defined.
+        return now - self.delta * beta * math.log(1.0 - random.random()) >= self.expires
+
+class TaggedValue(object):
+    """
+    A cached value along with the generation of each of its tags at the time
+    it was stored. Stored by the cache backends when set() is given tags.
+    """
+    def __init__(self, value, tags):
+        self.value = value
+        # Maps each tag to its generation.
+        self.tags = tags
+
+
 def default_key_func(key, key_prefix, version):
     """
     Default function to generate keys.
@@ -40,6 +103,22 @@ def get_key_func(key_func):
             return getattr(key_func_module, key_func_name)
     return default_key_func
 
+def get_instance(path, default):
+    """
+    Instantiates the class with the given dotted path, or ``default`` if no
+    path is given. Used to load cache serializers and compressors.
+    """
+    if path is None:
+        path = default
+    if path is None:
+        return None
+    try:
+        module_path, class_name = path.rsplit('.', 1)
+        cls = getattr(import_module(module_path), class_name)
+    except (AttributeError, ImportError, ValueError), e:
+        raise InvalidCacheBackendError("Could not load '%s': %s" % (path, e))
+    return cls()
+
 class BaseCache(object):
     def __init__(self, params):
         timeout = params.get('timeout', params.get('TIMEOUT', 300))
@@ -66,6 +145,15 @@ class BaseCache(object):
         self.version = params.get('VERSION', 1)
         self.key_func = get_key_func(params.get('KEY_FUNCTION', None))
 
+        self.serializer = get_instance(params.get('SERIALIZER', None),
+            'django.core.cache.serializers.PickleSerializer')
+        self.compressor = get_instance(params.get('COMPRESSOR', None), None)
+        compress_min_length = options.get('COMPRESS_MIN_LENGTH', 1024)
+        try:
+            self.compress_min_length = int(compress_min_length)
+        except (ValueError, TypeError):
+            self.compress_min_length = 1024
+
     def make_key(self, key, version=None):
         """Constructs the key used by all other methods. By default it
         uses the key_func to generate a key (which, by default,
@@ -80,11 +168,34 @@ class BaseCache(object):
         new_key = self.key_func(key, self.key_prefix, version)
         return new_key
 
-    def add(self, key, value, timeout=None, version=None):
+    def encode(self, value):
+        """
+        Serializes a value to a string, compressing it if a compressor is
+        configured and the serialized value is at least compress_min_length
+        bytes long.
+        """
+        data = self.serializer.dumps(value)
+        if self.compressor is None:
+            return data
+        if len(data) >= self.compress_min_length:
+            return COMPRESSED + self.compressor.compress(data)
+        return UNCOMPRESSED + data
+
+    def decode(self, data):
+        """
+        Restores a value encoded by encode().
+        """
+        if self.compressor is not None:
+            flag, data = data[:1], data[1:]
+            if flag == COMPRESSED:
+                data = self.compressor.decompress(data)
+        return self.serializer.loads(data)
+
+    def add(self, key, value, timeout=None, version=None, tags=None):
         """
         Set a value in the cache if the key does not already exist. If
         timeout is given, that timeout will be used for the key; otherwise
-        the default cache timeout will be used.
+        the default cache timeout will be used. See set() for tags.
 
         Returns True if the value was stored, False otherwise.
         """
@@ -97,10 +208,13 @@ class BaseCache(object):
         """
         raise NotImplementedError
 
-    def set(self, key, value, timeout=None, version=None):
+    def set(self, key, value, timeout=None, version=None, tags=None):
         """
         Set a value in the cache. If timeout is given, that timeout will be
         used for the key; otherwise the default cache timeout will be used.
+
+        If a list of tags is given, the value is expired as soon as
+        invalidate_tag() is called for one of them.
         """
         raise NotImplementedError
 
@@ -125,6 +239,160 @@ class BaseCache(object):
                 d[k] = val
         return d
 
+    def get_or_set(self, key, default, timeout=None, version=None,
+                   stale_timeout=0, lock_timeout=DEFAULT_LOCK_TIMEOUT, beta=1.0,
+                   tags=None):
+        """
+        Fetch a given key from the cache. If the key does not exist or is due
+        for a refresh, set it to default (calling it first if it is a
+        callable) and return the new value.
+
+        Only the client holding the refresh lock recomputes the value; the
+        others keep being served the previous value, for up to stale_timeout
+        seconds past its expiry. When there's no previous value at all, every
+        client missing on the key computes it. beta tunes how early refreshes may start
+        (see RefreshableValue.needs_refresh). tags are passed on to set().
+
+        Values stored by this method carry refresh metadata, so they should
+        only be read back through get_or_set().
+        """
+        if timeout is None:
+            timeout = self.default_timeout
+        lock_key = self.get_refresh_lock_key(key)
+        entry = self.get(key, version=version)
+        if isinstance(entry, RefreshableValue):
+            if not entry.needs_refresh(beta):
+                return entry.value
+            if not self.add(lock_key, True, lock_timeout, version=version):
+                # Somebody else is already recomputing this value.
+                return entry.value
+            locked = True
+        else:
+            # Nothing to fall back on; compute the value even if another
+            # client holds the lock.
+            locked = self.add(lock_key, True, lock_timeout, version=version)
+        try:
+            start = time.time()
+            if callable(default):
+                value = default()
+            else:
+                value = default
+            now = time.time()
+            entry = RefreshableValue(value, now + timeout, now - start)
+            self.set(key, entry, timeout + stale_timeout, version=version, tags=tags)
+        finally:
+            if locked:
+                self.delete(lock_key, version=version)
+        return value
+
+    def get_refresh_lock_key(self, key):
+        """
+        Returns the key of the lock guarding recomputation of ``key``.
+        """
+        return 'refresh-lock:%s' % key
+
+    def get_tag_key(self, tag):
+        """
+        Returns the key of the generation counter of ``tag``.
+        """
+        return 'tag:%s' % tag
+
+    def get_tag_generations(self, tags, version=None):
+        """
+        Returns a dict mapping each of the given tags to its current
+        generation, starting a counter for the tags which have none.
+        """
+        tag_keys = dict((self.get_tag_key(tag), tag) for tag in tags)
+        found = self.get_many(tag_keys.keys(), version=version)
+        generations = {}
+        for tag_key, tag in tag_keys.items():
+            generation = found.get(tag_key)
+            if generation is None:
+                # Counters start from a random number, so that values stored
+                # before a counter was evicted don't become valid again.
+                generation = random.randint(1, 2 ** 31)
+                if not self.add(tag_key, generation, TAG_TIMEOUT, version=version):
+                    generation = self.get(tag_key, generation, version=version)
+            generations[tag] = generation
+        return generations
+
+    def invalidate_tag(self, tag, version=None):
+        """
+        Expire every value stored with the given tag. This doesn't touch the
+        values themselves, so it takes constant time.
+        """
+        tag_key = self.get_tag_key(tag)
+        generation = self.get(tag_key, version=version)
+        # Without a counter, all the values stored with the tag are invalid
+        # already. incr() isn't used as it may store the counter with the
+        # default timeout. Concurrent invalidations may bump the counter only
+        # once, which expires the values all the same.
+        if generation is not None:
+            self.set(tag_key, generation + 1, TAG_TIMEOUT, version=version)
+
+    def _tag_value(self, value, tags, version=None):
+        """
+        Wraps a value about to be stored with the current generations of the
+        given tags, if any.
+        """
+        if not tags:
+            return value
+        return TaggedValue(value, self.get_tag_generations(tags, version))
+
+    def _tag_values(self, data, tags, version=None):
+        """
+        Like _tag_value(), for a dict of values. The generations of the tags
+        are looked up once for all of them.
+        """
+        if not tags:
+            return data
+        generations = self.get_tag_generations(tags, version)
+        return dict((key, TaggedValue(value, generations))
+                    for key, value in data.items())
+
+    def _check_tags(self, values, version=None):
+        """
+        Unwraps the tagged values of a dict of values fetched from the cache,
+        dropping those with an invalidated tag. The generations of all the
+        tags involved are fetched with a single get_many().
+        """
+        tagged = [(key, value) for key, value in values.items()
+                  if isinstance(value, TaggedValue)]
+        if not tagged:
+            return values
+        tag_keys = {}
+        for key, value in tagged:
+            for tag in value.tags:
+                tag_keys[self.get_tag_key(tag)] = tag
+        generations = {}
+        for tag_key, generation in self.get_many(tag_keys.keys(), version=version).items():
+            generations[tag_keys[tag_key]] = generation
+        for key, value in tagged:
+            for tag, generation in value.tags.items():
+                if generations.get(tag) != generation:
+                    del values[key]
+                    break
+            else:
+                values[key] = value.value
+        return values
+
+    def _check_tagged_value(self, value, default=None, version=None):
+        """
+        Like _check_tags(), for a single value. Returns default if the value
+        has been invalidated.
+        """
+        if not isinstance(value, TaggedValue):
+            return value
+        return self._check_tags({None: value}, version).get(None, default)
+
+    def _is_invalidated(self, value, version=None):
+        """
+        Returns True if value is a tagged value one of whose tags has been
+        invalidated since it was stored. Such a value counts as missing.
+        """
+        return (isinstance(value, TaggedValue) and
+                not self._check_tags({None: value}, version))
+
     def has_key(self, key, version=None):
         """
         Returns True if the key is in the cache and has not expired.
@@ -159,15 +427,17 @@ class BaseCache(object):
         # if a subclass overrides it.
         return self.has_key(key)
 
-    def set_many(self, data, timeout=None, version=None):
+    def set_many(self, data, timeout=None, version=None, tags=None):
         """
         Set a bunch of values in the cache at once from a dict of key/value
         pairs.  For certain backends (memcached), this is much more efficient
         than calling set() multiple times.
 
         If timeout is given, that timeout will be used for the key; otherwise
-        the default cache timeout will be used.
+        the default cache timeout will be used. The tags, if any, apply to
+        every value.
         """
+        data = self._tag_values(data, tags, version)
         for key, value in data.items():
             self.set(key, value, timeout=timeout, version=version)
 
@@ -1,13 +1,9 @@
 "Database cache backend."
 import base64
+import random
 import time
 from datetime import datetime
 
-try:
-    import cPickle as pickle
-except ImportError:
-    import pickle
-
 from django.conf import settings
 from django.core.cache.backends.base import BaseCache
 from django.db import connections, router, transaction, DatabaseError
@@ -30,11 +26,23 @@ class Options(object):
         self.managed = True
         self.proxy = False
 
+# Maximum number of keys passed in a single IN clause. Stays below the 999
+# parameters SQLite accepts in a query and the 1000 items Oracle accepts in a
+# list.
+MAX_KEYS_PER_QUERY = 500
+
 class BaseDatabaseCache(BaseCache):
     def __init__(self, table, params):
         BaseCache.__init__(self, params)
         self._table = table
 
+        options = params.get('OPTIONS', {})
+        cull_probability = params.get('cull_probability', options.get('CULL_PROBABILITY', 1))
+        try:
+            self._cull_probability = float(cull_probability)
+        except (ValueError, TypeError):
+            self._cull_probability = 1.0
+
         class CacheEntry(object):
             _meta = Options(table)
         self.cache_model_class = CacheEntry
@@ -72,44 +80,110 @@ class DatabaseCache(BaseDatabaseCache):
             transaction.commit_unless_managed(using=db)
             return default
         value = connections[db].ops.process_clob(row[1])
-        return pickle.loads(base64.decodestring(value))
+        value = self.decode(base64.decodestring(value))
+        return self._check_tagged_value(value, default, version)
+
+    def get_many(self, keys, version=None):
+        key_map = {}
+        for key in keys:
+            new_key = self.make_key(key, version=version)
+            self.validate_key(new_key)
+            key_map[new_key] = key
+        if not key_map:
+            return {}
+        db = router.db_for_read(self.cache_model_class)
+        table = connections[db].ops.quote_name(self._table)
+        cursor = connections[db].cursor()
+
+        rows = []
+        for chunk in self._chunks(key_map.keys()):
+            cursor.execute("SELECT cache_key, value, expires FROM %s "
+                           "WHERE cache_key IN (%s)" % (table, ', '.join(['%s'] * len(chunk))),
+                           chunk)
+            rows.extend(cursor.fetchall())
+        now = timezone.now()
+        result = {}
+        expired = []
+        for cache_key, value, expires in rows:
+            if expires < now:
+                expired.append(cache_key)
+            else:
+                value = connections[db].ops.process_clob(value)
+                result[key_map[cache_key]] = self.decode(base64.decodestring(value))
+        if expired:
+            self._delete_many(expired)
+        return self._check_tags(result, version)
 
-    def set(self, key, value, timeout=None, version=None):
+    def set(self, key, value, timeout=None, version=None, tags=None):
+        value = self._tag_value(value, tags, version)
         key = self.make_key(key, version=version)
         self.validate_key(key)
         self._base_set('set', key, value, timeout)
 
-    def add(self, key, value, timeout=None, version=None):
+    def set_many(self, data, timeout=None, version=None, tags=None):
+        if timeout is None:
+            timeout = self.default_timeout
+        data = self._tag_values(data, tags, version)
+        values = {}
+        for key, value in data.items():
+            key = self.make_key(key, version=version)
+            self.validate_key(key)
+            values[key] = base64.encodestring(self.encode(value)).strip()
+        if not values:
+            return
+        db = router.db_for_write(self.cache_model_class)
+        table = connections[db].ops.quote_name(self._table)
+        cursor = connections[db].cursor()
+
+        now = timezone.now().replace(microsecond=0)
+        exp = connections[db].ops.value_to_db_datetime(self._get_expiry(timeout))
+        self._maybe_cull(db, cursor, now)
+        try:
+            existing = set()
+            for chunk in self._chunks(values.keys()):
+                cursor.execute("SELECT cache_key FROM %s "
+                               "WHERE cache_key IN (%s)" % (table, ', '.join(['%s'] * len(chunk))),
+                               chunk)
+                existing.update(row[0] for row in cursor.fetchall())
+            updates = [[encoded, exp, key] for key, encoded in values.items() if key in existing]
+            inserts = [[key, encoded, exp] for key, encoded in values.items() if key not in existing]
+            if updates:
+                cursor.executemany("UPDATE %s SET value = %%s, expires = %%s "
+                                   "WHERE cache_key = %%s" % table, updates)
+            if inserts:
+                cursor.executemany("INSERT INTO %s (cache_key, value, expires) "
+                                   "VALUES (%%s, %%s, %%s)" % table, inserts)
+        except DatabaseError:
+            # To be threadsafe, updates/inserts are allowed to fail silently
+            transaction.rollback_unless_managed(using=db)
+        else:
+            transaction.commit_unless_managed(using=db)
+
+    def add(self, key, value, timeout=None, version=None, tags=None):
+        value = self._tag_value(value, tags, version)
         key = self.make_key(key, version=version)
         self.validate_key(key)
-        return self._base_set('add', key, value, timeout)
+        return self._base_set('add', key, value, timeout, version)
 
-    def _base_set(self, mode, key, value, timeout=None):
+    def _base_set(self, mode, key, value, timeout=None, version=None):
         if timeout is None:
             timeout = self.default_timeout
         db = router.db_for_write(self.cache_model_class)
         table = connections[db].ops.quote_name(self._table)
         cursor = connections[db].cursor()
 
-        cursor.execute("SELECT COUNT(*) FROM %s" % table)
-        num = cursor.fetchone()[0]
         now = timezone.now()
         now = now.replace(microsecond=0)
-        if settings.USE_TZ:
-            exp = datetime.utcfromtimestamp(time.time() + timeout)
-        else:
-            exp = datetime.fromtimestamp(time.time() + timeout)
-        exp = exp.replace(microsecond=0)
-        if num > self._max_entries:
-            self._cull(db, cursor, now)
-        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
-        encoded = base64.encodestring(pickled).strip()
-        cursor.execute("SELECT cache_key, expires FROM %s "
+        exp = self._get_expiry(timeout)
+        self._maybe_cull(db, cursor, now)
+        encoded = base64.encodestring(self.encode(value)).strip()
+        cursor.execute("SELECT cache_key, expires, value FROM %s "
                        "WHERE cache_key = %%s" % table, [key])
         try:
             result = cursor.fetchone()
             if result and (mode == 'set' or
-                    (mode == 'add' and result[1] < now)):
+                    (mode == 'add' and (result[1] < now or
+                                        self._is_invalidated_row(db, result[2], version)))):
                 cursor.execute("UPDATE %s SET value = %%s, expires = %%s "
                                "WHERE cache_key = %%s" % table,
                                [encoded, connections[db].ops.value_to_db_datetime(exp), key])
@@ -125,6 +199,26 @@ class DatabaseCache(BaseDatabaseCache):
             transaction.commit_unless_managed(using=db)
             return True
 
+    def _is_invalidated_row(self, db, value, version):
+        """
+        Returns True if the value column of a row holds an invalidated tagged
+        value, which add() may replace.
+        """
+        value = connections[db].ops.process_clob(value)
+        return self._is_invalidated(self.decode(base64.decodestring(value)), version)
+
+    def _get_expiry(self, timeout):
+        if settings.USE_TZ:
+            exp = datetime.utcfromtimestamp(time.time() + timeout)
+        else:
+            exp = datetime.fromtimestamp(time.time() + timeout)
+        return exp.replace(microsecond=0)
+
+    def _chunks(self, keys):
+        keys = list(keys)
+        for i in range(0, len(keys), MAX_KEYS_PER_QUERY):
+            yield keys[i:i + MAX_KEYS_PER_QUERY]
+
     def delete(self, key, version=None):
         key = self.make_key(key, version=version)
         self.validate_key(key)
@@ -136,6 +230,26 @@ class DatabaseCache(BaseDatabaseCache):
         cursor.execute("DELETE FROM %s WHERE cache_key = %%s" % table, [key])
         transaction.commit_unless_managed(using=db)
 
+    def delete_many(self, keys, version=None):
+        new_keys = []
+        for key in keys:
+            key = self.make_key(key, version=version)
+            self.validate_key(key)
+            new_keys.append(key)
+        self._delete_many(new_keys)
+
+    def _delete_many(self, keys):
+        if not keys:
+            return
+        db = router.db_for_write(self.cache_model_class)
+        table = connections[db].ops.quote_name(self._table)
+        cursor = connections[db].cursor()
+
+        for chunk in self._chunks(keys):
+            cursor.execute("DELETE FROM %s WHERE cache_key IN (%s)" %
+                           (table, ', '.join(['%s'] * len(chunk))), chunk)
+        transaction.commit_unless_managed(using=db)
+
     def has_key(self, key, version=None):
         key = self.make_key(key, version=version)
         self.validate_key(key)
@@ -149,10 +263,28 @@ class DatabaseCache(BaseDatabaseCache):
         else:
             now = datetime.now()
         now = now.replace(microsecond=0)
-        cursor.execute("SELECT cache_key FROM %s "
+        cursor.execute("SELECT value FROM %s "
                        "WHERE cache_key = %%s and expires > %%s" % table,
                        [key, connections[db].ops.value_to_db_datetime(now)])
-        return cursor.fetchone() is not None
+        row = cursor.fetchone()
+        if row is None:
+            return False
+        value = connections[db].ops.process_clob(row[0])
+        return not self._is_invalidated(self.decode(base64.decodestring(value)), version)
+
+    def _maybe_cull(self, db, cursor, now):
+        """
+        Culls the cache table if it holds too many entries. Counting the rows
+        isn't free, so on busy sites the check can be limited to a random
+        fraction of the writes with the CULL_PROBABILITY option.
+        """
+        if self._cull_probability < 1 and random.random() >= self._cull_probability:
+            return
+        table = connections[db].ops.quote_name(self._table)
+        cursor.execute("SELECT COUNT(*) FROM %s" % table)
+        num = cursor.fetchone()[0]
+        if num > self._max_entries:
+            self._cull(db, cursor, now)
 
     def _cull(self, db, cursor, now):
         if self._cull_frequency == 0:
@@ -4,12 +4,17 @@ import hashlib
 import os
 import shutil
 import time
+import uuid
 try:
     import cPickle as pickle
 except ImportError:
     import pickle
 
-from django.core.cache.backends.base import BaseCache
+from django.core.cache.backends.base import BaseCache, SERIALIZATION_ERRORS
+
+# Errors meaning that a cache file can't be read, e.g. because it was removed
+# or is corrupt; the entry is then missing.
+READ_ERRORS = (IOError, OSError) + SERIALIZATION_ERRORS
 
 class FileBasedCache(BaseCache):
     def __init__(self, dir, params):
@@ -17,12 +22,16 @@ class FileBasedCache(BaseCache):
         self._dir = dir
         if not os.path.exists(self._dir):
             self._createdir()
+        # Number of entries in the cache directory, counted lazily and kept
+        # up to date by this instance. Entries written by other processes are
+        # only picked up on the next cull, so this is an estimate.
+        self._entry_count = None
 
-    def add(self, key, value, timeout=None, version=None):
+    def add(self, key, value, timeout=None, version=None, tags=None):
         if self.has_key(key, version=version):
             return False
 
-        self.set(key, value, timeout, version=version)
+        self.set(key, value, timeout, version=version, tags=tags)
         return True
 
     def get(self, key, default=None, version=None):
@@ -38,14 +47,16 @@ class FileBasedCache(BaseCache):
                 if exp < now:
                     self._delete(fname)
                 else:
-                    return pickle.load(f)
+                    value = self.decode(f.read())
+                    return self._check_tagged_value(value, default, version)
             finally:
                 f.close()
-        except (IOError, OSError, EOFError, pickle.PickleError):
+        except READ_ERRORS:
             pass
         return default
 
-    def set(self, key, value, timeout=None, version=None):
+    def set(self, key, value, timeout=None, version=None, tags=None):
+        value = self._tag_value(value, tags, version)
         key = self.make_key(key, version=version)
         self.validate_key(key)
 
@@ -61,16 +72,40 @@ class FileBasedCache(BaseCache):
             if not os.path.exists(dirname):
                 os.makedirs(dirname)
 
-            f = open(fname, 'wb')
+            # Write to a temporary file and move it into place, so that
+            # concurrent readers never see a partially written entry.
+            # Unlike tempfile.mkstemp(), this honors the umask.
+            tmp_path = '%s.%s.tmp' % (fname, uuid.uuid4().hex)
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL |
+                         getattr(os, 'O_BINARY', 0), 0666)
             try:
-                now = time.time()
-                pickle.dump(now + timeout, f, pickle.HIGHEST_PROTOCOL)
-                pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
-            finally:
-                f.close()
+                f = os.fdopen(fd, 'wb')
+                try:
+                    now = time.time()
+                    pickle.dump(now + timeout, f, pickle.HIGHEST_PROTOCOL)
+                    f.write(self.encode(value))
+                finally:
+                    f.close()
+                existed = os.path.exists(fname)
+                self._rename(tmp_path, fname)
+            except:
+                os.remove(tmp_path)
+                raise
+            if not existed and self._entry_count is not None:
+                self._entry_count += 1
         except (IOError, OSError):
             pass
 
+    def _rename(self, src, dst):
+        try:
+            os.rename(src, dst)
+        except OSError:
+            # Windows doesn't allow renaming over an existing file.
+            if not os.path.exists(dst):
+                raise
+            os.remove(dst)
+            os.rename(src, dst)
+
     def delete(self, key, version=None):
         key = self.make_key(key, version=version)
         self.validate_key(key)
@@ -81,6 +116,8 @@ class FileBasedCache(BaseCache):
 
     def _delete(self, fname):
         os.remove(fname)
+        if self._entry_count:
+            self._entry_count -= 1
         try:
             # Remove the 2 subdirs if they're empty
             dirname = os.path.dirname(fname)
@@ -102,31 +139,40 @@ class FileBasedCache(BaseCache):
                     self._delete(fname)
                     return False
                 else:
-                    return True
+                    value = self.decode(f.read())
+                    return not self._is_invalidated(value, version)
             finally:
                 f.close()
-        except (IOError, OSError, EOFError, pickle.PickleError):
+        except READ_ERRORS:
             return False
 
     def _cull(self):
-        if int(self._num_entries) < self._max_entries:
-            return
-
-        try:
-            filelist = sorted(os.listdir(self._dir))
-        except (IOError, OSError):
+        if self._entry_count is None:
+            self._entry_count = self._get_num_entries()
+        if self._entry_count < self._max_entries:
             return
 
         if self._cull_frequency == 0:
-            doomed = filelist
-        else:
-            doomed = [os.path.join(self._dir, k) for (i, k) in enumerate(filelist) if i % self._cull_frequency == 0]
+            self.clear()
+            return
 
-        for topdir in doomed:
+        # Index all entries by modification time and remove the oldest ones.
+        entries = []
+        for root, _, files in os.walk(self._dir):
+            for f in files:
+                if f.endswith('.tmp'):
+                    # Being written by set().
+                    continue
+                fname = os.path.join(root, f)
+                try:
+                    entries.append((os.path.getmtime(fname), fname))
+                except (IOError, OSError):
+                    pass
+        self._entry_count = len(entries)
+        entries.sort()
+        for _, fname in entries[:len(entries) // self._cull_frequency]:
             try:
-                for root, _, files in os.walk(topdir):
-                    for f in files:
-                        self._delete(os.path.join(root, f))
+                self._delete(fname)
             except (IOError, OSError):
                 pass
 
@@ -152,7 +198,7 @@ class FileBasedCache(BaseCache):
     def _get_num_entries(self):
         count = 0
         for _,_,files in os.walk(self._dir):
-            count += len(files)
+            count += len([f for f in files if not f.endswith('.tmp')])
         return count
     _num_entries = property(_get_num_entries)
 
@@ -161,6 +207,7 @@ class FileBasedCache(BaseCache):
             shutil.rmtree(self._dir)
         except (IOError, OSError):
             pass
+        self._entry_count = 0
 
 # For backwards compatibility
 class CacheClass(FileBasedCache):
@@ -1,12 +1,8 @@
 "Thread-safe in-memory cache backend."
 
 import time
-try:
-    import cPickle as pickle
-except ImportError:
-    import pickle
 
-from django.core.cache.backends.base import BaseCache
+from django.core.cache.backends.base import BaseCache, SERIALIZATION_ERRORS
 from django.utils.synch import RWLock
 
 # Global in-memory store of cache data. Keyed by name, to provide
@@ -23,21 +19,47 @@ class LocMemCache(BaseCache):
         self._expire_info = _expire_info.setdefault(name, {})
         self._lock = _locks.setdefault(name, RWLock())
 
-    def add(self, key, value, timeout=None, version=None):
+    def add(self, key, value, timeout=None, version=None, tags=None):
+        value = self._tag_value(value, tags, version)
         key = self.make_key(key, version=version)
         self.validate_key(key)
+        # Checking the tags of the current value queries the cache, so it's
+        # done before taking the lock; the value mustn't change meanwhile.
+        invalidated = self._get_invalidated(key, version)
         with self._lock.writer():
             exp = self._expire_info.get(key)
-            if exp is None or exp <= time.time():
+            if (exp is None or exp <= time.time() or
+                    (invalidated is not None and self._cache.get(key) is invalidated)):
                 try:
-                    pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+                    pickled = self.encode(value)
                     self._set(key, pickled, timeout)
                     return True
-                except pickle.PickleError:
+                except SERIALIZATION_ERRORS:
                     pass
             return False
 
+    def _get_invalidated(self, key, version=None):
+        """
+        Returns the encoded value stored under key if it's a tagged value
+        that has been invalidated, None otherwise.
+        """
+        with self._lock.reader():
+            pickled = self._cache.get(key)
+        if pickled is None:
+            return None
+        try:
+            value = self.decode(pickled)
+        except SERIALIZATION_ERRORS:
+            return None
+        if self._is_invalidated(value, version):
+            return pickled
+        return None
+
     def get(self, key, default=None, version=None):
+        value = self._get(key, default, version)
+        return self._check_tagged_value(value, default, version)
+
+    def _get(self, key, default=None, version=None):
         key = self.make_key(key, version=version)
         self.validate_key(key)
         with self._lock.reader():
@@ -47,8 +69,8 @@ class LocMemCache(BaseCache):
             elif exp > time.time():
                 try:
                     pickled = self._cache[key]
-                    return pickle.loads(pickled)
-                except pickle.PickleError:
+                    return self.decode(pickled)
+                except SERIALIZATION_ERRORS:
                     return default
         with self._lock.writer():
             try:
@@ -66,14 +88,15 @@ class LocMemCache(BaseCache):
         self._cache[key] = value
         self._expire_info[key] = time.time() + timeout
 
-    def set(self, key, value, timeout=None, version=None):
+    def set(self, key, value, timeout=None, version=None, tags=None):
+        value = self._tag_value(value, tags, version)
         key = self.make_key(key, version=version)
         self.validate_key(key)
         with self._lock.writer():
             try:
-                pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+                pickled = self.encode(value)
                 self._set(key, pickled, timeout)
-            except pickle.PickleError:
+            except SERIALIZATION_ERRORS:
                 pass
 
     def incr(self, key, delta=1, version=None):
@@ -84,9 +107,9 @@ class LocMemCache(BaseCache):
         key = self.make_key(key, version=version)
         with self._lock.writer():
             try:
-                pickled = pickle.dumps(new_value, pickle.HIGHEST_PROTOCOL)
+                pickled = self.encode(new_value)
                 self._cache[key] = pickled
-            except pickle.PickleError:
+            except SERIALIZATION_ERRORS:
                 pass
         return new_value
 
@@ -98,7 +121,11 @@ class LocMemCache(BaseCache):
             if exp is None:
                 return False
             elif exp > time.time():
-                return True
+                live = True
+            else:
+                live = False
+        if live:
+            return self._get_invalidated(key, version) is None
 
         with self._lock.writer():
             try:
@@ -1,10 +1,46 @@
 "Memcached cache backend"
 
 import time
-from threading import local
+from threading import local, Lock
 
 from django.core.cache.backends.base import BaseCache, InvalidCacheBackendError
 
+# Default number of idle clients kept by a ClientPool.
+DEFAULT_POOL_SIZE = 10
+
+class ClientPool(object):
+    """
+    A pool of pylibmc clients, shared by the threads of a process.
+
+    Clients are handed out one thread at a time. Up to ``size`` idle clients
+    are kept, along with their connections, for reuse; clients returned to a
+    full pool are disconnected.
+    """
+    def __init__(self, create_client, size=DEFAULT_POOL_SIZE):
+        self._create_client = create_client
+        self._size = size
+        self._clients = []
+        self._lock = Lock()
+
+    def get(self):
+        """
+        Returns an idle client, or a new one if there is none.
+        """
+        with self._lock:
+            if self._clients:
+                return self._clients.pop()
+        return self._create_client()
+
+    def put(self, client):
+        """
+        Returns a client obtained from get() to the pool.
+        """
+        with self._lock:
+            if len(self._clients) < self._size:
+                self._clients.append(client)
+                return
+        client.disconnect_all()
+
 class BaseMemcachedCache(BaseCache):
     def __init__(self, server, params, library, value_not_found_exception):
         super(BaseMemcachedCache, self).__init__(params)
@@ -22,13 +58,21 @@ class BaseMemcachedCache(BaseCache):
         self._lib = library
         self._options = params.get('OPTIONS', None)
 
+        # The memcached libraries pickle values themselves, so values only
+        # need to be encoded if a custom serializer or a compressor is used.
+        self._encode_values = (params.get('SERIALIZER', None) is not None or
+                               self.compressor is not None)
+
+    def _create_client(self):
+        return self._lib.Client(self._servers)
+
     @property
     def _cache(self):
         """
         Implements transparent thread-safe access to a memcached client.
         """
         if getattr(self, '_client', None) is None:
-            self._client = self._lib.Client(self._servers)
+            self._client = self._create_client()
 
         return self._client
 
@@ -48,20 +92,40 @@ class BaseMemcachedCache(BaseCache):
             timeout += int(time.time())
         return int(timeout)
 
-    def add(self, key, value, timeout=0, version=None):
+    def _encode(self, value):
+        # Integers are stored natively so that incr() and decr() keep working.
+        if not self._encode_values or isinstance(value, (int, long)):
+            return value
+        return self.encode(value)
+
+    def _decode(self, value):
+        if not self._encode_values or not isinstance(value, str):
+            return value
+        return self.decode(value)
+
+    def add(self, key, value, timeout=0, version=None, tags=None):
+        value = self._tag_value(value, tags, version)
         key = self.make_key(key, version=version)
-        return self._cache.add(key, value, self._get_memcache_timeout(timeout))
+        timeout = self._get_memcache_timeout(timeout)
+        if self._cache.add(key, self._encode(value), timeout):
+            return True
+        # An invalidated tagged value counts as missing.
+        if self._is_invalidated(self._decode(self._cache.get(key)), version):
+            self._cache.set(key, self._encode(value), timeout)
+            return True
+        return False
 
     def get(self, key, default=None, version=None):
         key = self.make_key(key, version=version)
         val = self._cache.get(key)
         if val is None:
             return default
-        return val
+        return self._check_tagged_value(self._decode(val), default, version)
 
-    def set(self, key, value, timeout=0, version=None):
+    def set(self, key, value, timeout=0, version=None, tags=None):
+        value = self._tag_value(value, tags, version)
         key = self.make_key(key, version=version)
-        self._cache.set(key, value, self._get_memcache_timeout(timeout))
+        self._cache.set(key, self._encode(value), self._get_memcache_timeout(timeout))
 
     def delete(self, key, version=None):
         key = self.make_key(key, version=version)
@@ -74,8 +138,8 @@ class BaseMemcachedCache(BaseCache):
             _ = {}
             m = dict(zip(new_keys, keys))
             for k, v in ret.items():
-                _[m[k]] = v
-            ret = _
+                _[m[k]] = self._decode(v)
+            ret = self._check_tags(_, version)
         return ret
 
     def close(self, **kwargs):
@@ -96,6 +160,13 @@ class BaseMemcachedCache(BaseCache):
             raise ValueError("Key '%s' not found" % key)
         return val
 
+    def invalidate_tag(self, tag, version=None):
+        # memcached increments atomically and keeps the counter's expiry.
+        try:
+            self.incr(self.get_tag_key(tag), version=version)
+        except ValueError:
+            pass
+
     def decr(self, key, delta=1, version=None):
         key = self.make_key(key, version=version)
         try:
@@ -111,11 +182,12 @@ class BaseMemcachedCache(BaseCache):
             raise ValueError("Key '%s' not found" % key)
         return val
 
-    def set_many(self, data, timeout=0, version=None):
+    def set_many(self, data, timeout=0, version=None, tags=None):
+        data = self._tag_values(data, tags, version)
         safe_data = {}
         for key, value in data.items():
             key = self.make_key(key, version=version)
-            safe_data[key] = value
+            safe_data[key] = self._encode(value)
         self._cache.set_multi(safe_data, self._get_memcache_timeout(timeout))
 
     def delete_many(self, keys, version=None):
@@ -151,27 +223,50 @@ class MemcachedCache(BaseMemcachedCache):
                                              value_not_found_exception=ValueError)
 
 class PyLibMCCache(BaseMemcachedCache):
-    "An implementation of a cache binding using pylibmc"
+    """
+    An implementation of a cache binding using pylibmc.
+
+    Unlike python-memcached clients, which keep separate connections for each
+    thread, pylibmc clients can't be used by several threads at once. They're
+    pooled, so that connections are reused across requests.
+    """
     def __init__(self, server, params):
         import pylibmc
-        self._local = local()
         super(PyLibMCCache, self).__init__(server, params,
                                            library=pylibmc,
                                            value_not_found_exception=pylibmc.NotFound)
+        pool_size = (self._options or {}).get('POOL_SIZE', DEFAULT_POOL_SIZE)
+        try:
+            pool_size = int(pool_size)
+        except (ValueError, TypeError):
+            pool_size = DEFAULT_POOL_SIZE
+        self._pool = ClientPool(self._create_client, pool_size)
+        self._local = local()
 
     @property
     def _cache(self):
-        # PylibMC uses cache options as the 'behaviors' attribute.
-        # It also needs to use threadlocals, because some versions of
-        # PylibMC don't play well with the GIL.
+        """
+        Each thread borrows a client from the pool until close() is called,
+        typically at the end of the request.
+        """
         client = getattr(self._local, 'client', None)
-        if client:
-            return client
+        if client is None:
+            client = self._local.client = self._pool.get()
+        return client
+
+    def close(self, **kwargs):
+        # Hand the client back to the pool rather than disconnecting it, so
+        # that the next request can reuse its connections.
+        client = getattr(self._local, 'client', None)
+        if client is not None:
+            self._local.client = None
+            self._pool.put(client)
 
+    def _create_client(self):
+        # PylibMC uses cache options as the 'behaviors' attribute.
         client = self._lib.Client(self._servers)
         if self._options:
-            client.behaviors = self._options
-
-        self._local.client = client
-
+            client.behaviors = dict(
+                (k, v) for k, v in self._options.items()
+                if k not in ('POOL_SIZE', 'COMPRESS_MIN_LENGTH'))
         return client
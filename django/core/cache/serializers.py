@@ -0,0 +1,74 @@
+"""
+Serializers and compressors for cache values.
+
+A serializer turns a value into a string and back with its ``dumps()`` and
+``loads()`` methods; a compressor shrinks such a string with ``compress()``
+and restores it with ``decompress()``. Use the dotted path to a class in the
+``SERIALIZER`` and ``COMPRESSOR`` entries of the CACHES setting.
+"""
+import zlib
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from django.core.cache.backends.base import InvalidCacheBackendError
+from django.utils import simplejson
+
+
+class PickleSerializer(object):
+    """
+    Serializes values with pickle, using the highest protocol available.
+    Supports any picklable object; this is the default.
+    """
+    def dumps(self, value):
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data):
+        return pickle.loads(data)
+
+
+class JSONSerializer(object):
+    """
+    Serializes values as JSON. Only supports basic data types, and returns
+    strings as unicode, but the result can be read by non-Python clients.
+    """
+    def dumps(self, value):
+        return simplejson.dumps(value, separators=(',', ':'))
+
+    def loads(self, data):
+        return simplejson.loads(data)
+
+
+class MsgPackSerializer(object):
+    """
+    Serializes values with MessagePack, a compact binary format. Supports the
+    same data types as JSONSerializer. Requires the msgpack library.
+    """
+    def __init__(self):
+        try:
+            import msgpack
+        except ImportError, e:
+            raise InvalidCacheBackendError(
+                "MsgPackSerializer requires the msgpack library: %s" % e)
+        self._msgpack = msgpack
+
+    def dumps(self, value):
+        return self._msgpack.packb(value)
+
+    def loads(self, data):
+        return self._msgpack.unpackb(data)
+
+
+class ZlibCompressor(object):
+    """
+    Compresses values with zlib.
+    """
+    def __init__(self, level=6):
+        self.level = level
+
+    def compress(self, data):
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data):
+        return zlib.decompress(data)
@@ -203,6 +203,18 @@ class WSGIRequest(http.HttpRequest):
     REQUEST = property(_get_request)
 
 
+class RequestFinished(object):
+    """
+    Sends the request_finished signal when the streaming response it's
+    attached to is closed.
+    """
+    def __init__(self, sender):
+        self.sender = sender
+
+    def close(self):
+        signals.request_finished.send(sender=self.sender)
+
+
 class WSGIHandler(base.BaseHandler):
     initLock = Lock()
     request_class = WSGIRequest
@@ -226,6 +238,7 @@ class WSGIHandler(base.BaseHandler):
 
         set_script_prefix(base.get_script_name(environ))
         signals.request_started.send(sender=self.__class__)
+        response = None
         try:
             try:
                 request = self.request_class(environ)
@@ -240,7 +253,13 @@ class WSGIHandler(base.BaseHandler):
             else:
                 response = self.get_response(request)
         finally:
-            signals.request_finished.send(sender=self.__class__)
+            # The content of streaming responses is produced while the server
+            # iterates over them, so the request only finishes when the
+            # server closes the response.
+            if response is not None and response.streaming:
+                response._closable_objects.append(RequestFinished(self.__class__))
+            else:
+                signals.request_finished.send(sender=self.__class__)
 
         try:
             status_text = STATUS_CODE_TEXT[response.status_code]
@@ -1,3 +1,5 @@
+import warnings
+
 from django.core.management.base import NoArgsCommand
 from django.utils import timezone
 
@@ -5,6 +7,9 @@ class Command(NoArgsCommand):
     help = "Can be run as a cronjob or directly to clean out old data from the database (only expired sessions at the moment)."
 
     def handle_noargs(self, **options):
+        warnings.warn(
+            "The `cleanup` command has been deprecated in favor of `clearsessions`.",
+            PendingDeprecationWarning)
         from django.db import transaction
         from django.contrib.sessions.models import Session
         Session.objects.filter(expire_date__lt=timezone.now()).delete()
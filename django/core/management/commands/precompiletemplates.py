@@ -0,0 +1,88 @@
+import os
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import NoArgsCommand, CommandError
+from django.template.base import TemplateDoesNotExist
+from django.template.loader import find_template_loader
+from django.template.loaders import persistent
+from django.template.loaders.app_directories import app_template_dirs
+
+
+class Command(NoArgsCommand):
+    option_list = NoArgsCommand.option_list + (
+        make_option('--ignore', '-i', action='append', dest='ignore_patterns',
+            default=[], metavar='PATTERN',
+            help='Ignore template files whose name ends with PATTERN. '
+                 'Use multiple times to ignore more.'),
+    )
+    help = ("Parses all the templates found in TEMPLATE_DIRS and in the "
+            "'templates' directories of installed apps, and stores them in "
+            "TEMPLATE_CACHE_DIR for the persistent template loader.")
+
+    def handle_noargs(self, **options):
+        verbosity = int(options.get('verbosity', 1))
+        ignore_patterns = options.get('ignore_patterns') or []
+        if not settings.TEMPLATE_CACHE_DIR:
+            raise CommandError("The TEMPLATE_CACHE_DIR setting must be set.")
+        if settings.TEMPLATE_DEBUG:
+            raise CommandError("Templates aren't cached on disk when "
+                               "TEMPLATE_DEBUG is True.")
+        loader = self.get_loader()
+
+        stored = cached = skipped = 0
+        for name in self.find_templates(ignore_patterns):
+            try:
+                source, origin = loader.find_template(name)
+            except TemplateDoesNotExist:
+                # The configured loaders don't look in this directory.
+                continue
+            try:
+                path = loader.get_cache_path(source, name)
+                if loader.read(path) is not None:
+                    cached += 1
+                    continue
+                loader.make_template(source, origin, name)
+            except Exception, e:
+                if verbosity >= 1:
+                    self.stderr.write("Skipped %s: %s\n" % (name, e))
+                skipped += 1
+                continue
+            if os.path.exists(path):
+                if verbosity >= 2:
+                    self.stdout.write("Stored %s\n" % name)
+                stored += 1
+            else:
+                if verbosity >= 1:
+                    self.stderr.write("Skipped %s: it can't be pickled.\n" % name)
+                skipped += 1
+        if verbosity >= 1:
+            self.stdout.write("%d templates stored, %d already up to date, "
+                              "%d skipped.\n" % (stored, cached, skipped))
+
+    def get_loader(self):
+        for loader in settings.TEMPLATE_LOADERS:
+            loader = find_template_loader(loader)
+            if isinstance(loader, persistent.Loader):
+                return loader
+        raise CommandError("The TEMPLATE_LOADERS setting doesn't include "
+                           "django.template.loaders.persistent.Loader.")
+
+    def find_templates(self, ignore_patterns):
+        """
+        Yields the names of the templates found in the template directories,
+        each one once.
+        """
+        seen = set()
+        for template_dir in list(settings.TEMPLATE_DIRS) + list(app_template_dirs):
+            for root, dirs, files in os.walk(template_dir):
+                dirs[:] = [d for d in dirs if not d.startswith('.')]
+                for filename in files:
+                    if filename.startswith('.'):
+                        continue
+                    path = os.path.join(root, filename)
+                    name = os.path.relpath(path, template_dir).replace(os.sep, '/')
+                    if name in seen or name.endswith(tuple(ignore_patterns)):
+                        continue
+                    seen.add(name)
+                    yield name
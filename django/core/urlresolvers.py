@@ -14,11 +14,11 @@ from django.http import Http404
 from django.core.exceptions import ImproperlyConfigured, ViewDoesNotExist
 from django.utils.datastructures import MultiValueDict
 from django.utils.encoding import iri_to_uri, force_unicode, smart_str
-from django.utils.functional import memoize, lazy
+from django.utils.functional import memoize, lazy, lru_cache
 from django.utils.importlib import import_module
 from django.utils.module_loading import module_has_submodule
-from django.utils.regex_helper import normalize
-from django.utils.translation import get_language
+from django.utils.regex_helper import literal_prefix, normalize
+from django.utils.translation import get_language, override
 
 
 _resolver_cache = {} # Maps URLconf modules to RegexURLResolver instances.
@@ -34,6 +34,20 @@ _prefixes = local()
 _urlconfs = local()
 
 
+# The key of the values cached for all languages by URL resolvers, rather than
+# the active one, when they don't depend on translated regexes.
+ALL_LANGUAGES = None
+
+
+def is_translated(pattern):
+    """
+    Returns True if the regex of the URL pattern or resolver depends upon the
+    activated language-code. Patterns that can't tell are assumed to.
+    """
+    method = getattr(pattern, 'is_translated', None)
+    return method is None or method()
+
+
 class ResolverMatch(object):
     def __init__(self, func, args, kwargs, url_name=None, app_name=None, namespaces=None):
         self.func = func
@@ -71,6 +85,34 @@ class ResolverMatch(object):
 class Resolver404(Http404):
     pass
 
+class ResolverFailure(dict):
+    """
+    The argument of the Resolver404 raised by RegexURLResolver.resolve().
+
+    Its 'tried' item, the list of the patterns that were tried, is only built
+    when it's looked up, e.g. for the technical 404 page, since a failure to
+    resolve a URL in an included URLconf doesn't need it when a later pattern
+    matches.
+    """
+    def __init__(self, get_tried, **kwargs):
+        super(ResolverFailure, self).__init__(**kwargs)
+        self.get_tried = get_tried
+
+    def __missing__(self, key):
+        if key != 'tried':
+            raise KeyError(key)
+        tried = self['tried'] = self.get_tried()
+        return tried
+
+    def __contains__(self, key):
+        return key == 'tried' or super(ResolverFailure, self).__contains__(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
 class NoReverseMatch(Exception):
     # Don't make this raise an error when used in a template.
     silent_variable_failure = True
@@ -150,13 +192,21 @@ class LocaleRegexProvider(object):
         self._regex_dict = {}
 
 
+    def is_translated(self):
+        """
+        Returns True if the regular expression depends upon the activated
+        language-code.
+        """
+        return not isinstance(self._regex, basestring)
+
     @property
     def regex(self):
         """
         Returns a compiled regular expression, depending upon the activated
         language-code.
         """
-        language_code = get_language()
+        # Untranslated regular expressions are compiled once for all languages.
+        language_code = self.is_translated() and get_language() or None
         if language_code not in self._regex_dict:
             if isinstance(self._regex, basestring):
                 compiled_regex = re.compile(self._regex, re.UNICODE)
@@ -230,80 +280,149 @@ class RegexURLResolver(LocaleRegexProvider):
         self._reverse_dict = {}
         self._namespace_dict = {}
         self._app_dict = {}
+        self._prefix_index = {}
+        self._reverse_compiled = {}
+        self._reverse_regexes = {}
 
     def __repr__(self):
         return smart_str(u'<%s %s (%s:%s) %s>' % (self.__class__.__name__, self.urlconf_name, self.app_name, self.namespace, self.regex.pattern))
 
     def _populate(self):
         lookups = MultiValueDict()
-        namespaces = {}
-        apps = {}
-        language_code = get_language()
+        translated = False
         for pattern in reversed(self.url_patterns):
+            translated = translated or is_translated(pattern)
             p_pattern = pattern.regex.pattern
             if p_pattern.startswith('^'):
                 p_pattern = p_pattern[1:]
             if isinstance(pattern, RegexURLResolver):
-                if pattern.namespace:
-                    namespaces[pattern.namespace] = (p_pattern, pattern)
-                    if pattern.app_name:
-                        apps.setdefault(pattern.app_name, []).append(pattern.namespace)
-                else:
+                if not pattern.namespace:
                     parent = normalize(pattern.regex.pattern)
-                    for name in pattern.reverse_dict:
-                        for matches, pat, defaults in pattern.reverse_dict.getlist(name):
+                    reverse_dict = pattern.reverse_dict
+                    translated = translated or ALL_LANGUAGES not in pattern._reverse_dict
+                    for name in reverse_dict:
+                        for matches, pat, defaults in reverse_dict.getlist(name):
                             new_matches = []
                             for piece, p_args in parent:
                                 new_matches.extend([(piece + suffix, p_args + args) for (suffix, args) in matches])
                             lookups.appendlist(name, (new_matches, p_pattern + pat, dict(defaults, **pattern.default_kwargs)))
-                    for namespace, (prefix, sub_pattern) in pattern.namespace_dict.items():
-                        namespaces[namespace] = (p_pattern + prefix, sub_pattern)
-                    for app_name, namespace_list in pattern.app_dict.items():
-                        apps.setdefault(app_name, []).extend(namespace_list)
             else:
                 bits = normalize(p_pattern)
                 lookups.appendlist(pattern.callback, (bits, p_pattern, pattern.default_args))
                 if pattern.name is not None:
                     lookups.appendlist(pattern.name, (bits, p_pattern, pattern.default_args))
+        language_code = translated and get_language() or ALL_LANGUAGES
         self._reverse_dict[language_code] = lookups
+
+    def _populate_namespaces(self):
+        """
+        Populates namespace_dict and app_dict. Unlike reverse_dict, they only
+        depend on the included URLconfs, not on the URL patterns of views.
+        """
+        namespaces = {}
+        apps = {}
+        translated = False
+        for pattern in reversed(self.url_patterns):
+            if not isinstance(pattern, RegexURLResolver):
+                continue
+            translated = translated or is_translated(pattern)
+            p_pattern = pattern.regex.pattern
+            if p_pattern.startswith('^'):
+                p_pattern = p_pattern[1:]
+            if pattern.namespace:
+                namespaces[pattern.namespace] = (p_pattern, pattern)
+                if pattern.app_name:
+                    apps.setdefault(pattern.app_name, []).append(pattern.namespace)
+            else:
+                namespace_dict = pattern.namespace_dict
+                app_dict = pattern.app_dict
+                translated = translated or ALL_LANGUAGES not in pattern._namespace_dict
+                for namespace, (prefix, sub_pattern) in namespace_dict.items():
+                    namespaces[namespace] = (p_pattern + prefix, sub_pattern)
+                for app_name, namespace_list in app_dict.items():
+                    apps.setdefault(app_name, []).extend(namespace_list)
+        language_code = translated and get_language() or ALL_LANGUAGES
         self._namespace_dict[language_code] = namespaces
         self._app_dict[language_code] = apps
 
+    def _get_populated(self, cache, populate):
+        """
+        Returns the value of cache for the active language, or for all of them
+        if it doesn't depend on translated regexes, calling populate() to
+        build it first if needed.
+        """
+        try:
+            return cache[ALL_LANGUAGES]
+        except KeyError:
+            pass
+        language_code = get_language()
+        if language_code not in cache:
+            populate()
+            if ALL_LANGUAGES in cache:
+                return cache[ALL_LANGUAGES]
+        return cache[language_code]
+
     @property
     def reverse_dict(self):
-        language_code = get_language()
-        if language_code not in self._reverse_dict:
-            self._populate()
-        return self._reverse_dict[language_code]
+        return self._get_populated(self._reverse_dict, self._populate)
 
     @property
     def namespace_dict(self):
-        language_code = get_language()
-        if language_code not in self._namespace_dict:
-            self._populate()
-        return self._namespace_dict[language_code]
+        return self._get_populated(self._namespace_dict, self._populate_namespaces)
 
     @property
     def app_dict(self):
+        return self._get_populated(self._app_dict, self._populate_namespaces)
+
+    def _populate_prefix_index(self):
+        """
+        Builds a trie of the literal prefixes of the regexes of the patterns,
+        mapping each prefix to the positions of the patterns it starts.
+        """
+        patterns = self.url_patterns
+        root = ({}, [])
+        for position, pattern in enumerate(patterns):
+            regex = getattr(pattern, 'regex', None)
+            prefix = regex is not None and literal_prefix(regex.pattern) or u''
+            node = root
+            for char in prefix:
+                node = node[0].setdefault(char, ({}, []))
+            node[1].append(position)
+        self._prefix_index[get_language()] = (patterns, len(patterns), root)
+
+    def candidate_patterns(self, path):
+        """
+        Returns the patterns, and the positions in order of those whose regex
+        may match path: those whose literal prefix path starts with.
+        """
         language_code = get_language()
-        if language_code not in self._app_dict:
-            self._populate()
-        return self._app_dict[language_code]
+        index = self._prefix_index.get(language_code)
+        patterns = self.url_patterns
+        if index is None or index[0] is not patterns or index[1] != len(patterns):
+            self._populate_prefix_index()
+            index = self._prefix_index[language_code]
+        patterns, length, node = index
+        positions = list(node[1])
+        for char in path:
+            node = node[0].get(char)
+            if node is None:
+                break
+            positions.extend(node[1])
+        positions.sort()
+        return patterns, positions
 
     def resolve(self, path):
-        tried = []
         match = self.regex.search(path)
         if match:
             new_path = path[match.end():]
-            for pattern in self.url_patterns:
+            patterns, positions = self.candidate_patterns(new_path)
+            failures = {}
+            for position in positions:
+                pattern = patterns[position]
                 try:
                     sub_match = pattern.resolve(new_path)
                 except Resolver404, e:
-                    sub_tried = e.args[0].get('tried')
-                    if sub_tried is not None:
-                        tried.extend([[pattern] + t for t in sub_tried])
-                    else:
-                        tried.append([pattern])
+                    failures[position] = e
                 else:
                     if sub_match:
                         sub_match_dict = dict([(smart_str(k), v) for k, v in match.groupdict().items()])
@@ -311,8 +430,19 @@ class RegexURLResolver(LocaleRegexProvider):
                         for k, v in sub_match.kwargs.iteritems():
                             sub_match_dict[smart_str(k)] = v
                         return ResolverMatch(sub_match.func, sub_match.args, sub_match_dict, sub_match.url_name, self.app_name or sub_match.app_name, [self.namespace] + sub_match.namespaces)
-                    tried.append([pattern])
-            raise Resolver404({'tried': tried, 'path': new_path})
+
+            def get_tried():
+                tried = []
+                for position, pattern in enumerate(patterns):
+                    sub_tried = None
+                    if position in failures:
+                        sub_tried = failures[position].args[0].get('tried')
+                    if sub_tried is not None:
+                        tried.extend([[pattern] + t for t in sub_tried])
+                    else:
+                        tried.append([pattern])
+                return tried
+            raise Resolver404(ResolverFailure(get_tried, path=new_path))
         raise Resolver404({'path' : path})
 
     @property
@@ -353,6 +483,30 @@ class RegexURLResolver(LocaleRegexProvider):
     def reverse(self, lookup_view, *args, **kwargs):
         return self._reverse_with_prefix(lookup_view, '', *args, **kwargs)
 
+    def _reverse_candidates(self, lookup_view, _prefix):
+        """
+        Returns the ways to reverse lookup_view with the _prefix regex, in
+        order: tuples of the format string of the URL, the names of its
+        parameters, the default arguments of the pattern, the names of all
+        its arguments, and the regex the URL must match.
+        """
+        language_code = get_language()
+        compiled = self._reverse_compiled.setdefault(language_code, {})
+        try:
+            return compiled[lookup_view, _prefix]
+        except KeyError:
+            pass
+        prefix_norm, prefix_args = normalize(_prefix)[0]
+        candidates = []
+        for possibility, pattern, defaults in self.reverse_dict.getlist(lookup_view):
+            regex = u'^%s%s' % (_prefix, pattern)
+            for result, params in possibility:
+                params = prefix_args + params
+                candidates.append((prefix_norm + result, params, defaults,
+                                   set(params).union(defaults), regex))
+        compiled[lookup_view, _prefix] = candidates
+        return candidates
+
     def _reverse_with_prefix(self, lookup_view, _prefix, *args, **kwargs):
         if args and kwargs:
             raise ValueError("Don't mix *args and **kwargs in call to reverse()!")
@@ -360,29 +514,32 @@ class RegexURLResolver(LocaleRegexProvider):
             lookup_view = get_callable(lookup_view, True)
         except (ImportError, AttributeError), e:
             raise NoReverseMatch("Error importing '%s': %s." % (lookup_view, e))
-        possibilities = self.reverse_dict.getlist(lookup_view)
-        prefix_norm, prefix_args = normalize(_prefix)[0]
-        for possibility, pattern, defaults in possibilities:
-            for result, params in possibility:
-                if args:
-                    if len(args) != len(params) + len(prefix_args):
-                        continue
+        unicode_args = unicode_kwargs = None
+        for candidate_format, params, defaults, param_names, regex in self._reverse_candidates(lookup_view, _prefix):
+            if args:
+                if len(args) != len(params):
+                    continue
+                if unicode_args is None:
                     unicode_args = [force_unicode(val) for val in args]
-                    candidate =  (prefix_norm + result) % dict(zip(prefix_args + params, unicode_args))
-                else:
-                    if set(kwargs.keys() + defaults.keys()) != set(params + defaults.keys() + prefix_args):
-                        continue
-                    matches = True
-                    for k, v in defaults.items():
-                        if kwargs.get(k, v) != v:
-                            matches = False
-                            break
-                    if not matches:
-                        continue
+                candidate = candidate_format % dict(zip(params, unicode_args))
+            else:
+                if param_names != set(kwargs).union(defaults):
+                    continue
+                matches = True
+                for k, v in defaults.items():
+                    if kwargs.get(k, v) != v:
+                        matches = False
+                        break
+                if not matches:
+                    continue
+                if unicode_kwargs is None:
                     unicode_kwargs = dict([(k, force_unicode(v)) for (k, v) in kwargs.items()])
-                    candidate = (prefix_norm + result) % unicode_kwargs
-                if re.search(u'^%s%s' % (_prefix, pattern), candidate, re.UNICODE):
-                    return candidate
+                candidate = candidate_format % unicode_kwargs
+            compiled_regex = self._reverse_regexes.get(regex)
+            if compiled_regex is None:
+                compiled_regex = self._reverse_regexes[regex] = re.compile(regex, re.UNICODE)
+            if compiled_regex.search(candidate):
+                return candidate
         # lookup_view can be URL label, or dotted path, or callable, Any of
         # these can be passed in at the top, but callables are not friendly in
         # error messages.
@@ -406,6 +563,9 @@ class LocaleRegexURLResolver(RegexURLResolver):
         super(LocaleRegexURLResolver, self).__init__(
             None, urlconf_name, default_kwargs, app_name, namespace)
 
+    def is_translated(self):
+        return True
+
     @property
     def regex(self):
         language_code = get_language()
@@ -422,13 +582,44 @@ def resolve(path, urlconf=None):
 def reverse(viewname, urlconf=None, args=None, kwargs=None, prefix=None, current_app=None):
     if urlconf is None:
         urlconf = get_urlconf()
-    resolver = get_resolver(urlconf)
     args = args or []
     kwargs = kwargs or {}
 
     if prefix is None:
         prefix = get_script_prefix()
 
+    # Only the URLs reversed from strings and integers are cached: the text of
+    # other objects, e.g. model instances, may change while they're equal. The
+    # types are part of the key since e.g. True == 1.
+    if (isinstance(viewname, basestring) or callable(viewname)) and \
+            not [v for v in args if not isinstance(v, _reverse_cache_types)] and \
+            not [v for v in kwargs.itervalues() if not isinstance(v, _reverse_cache_types)]:
+        key = (viewname, urlconf, tuple([(type(v), v) for v in args]),
+               tuple(sorted([(k, type(v), v) for k, v in kwargs.iteritems()])),
+               prefix, current_app, get_language())
+        try:
+            hash(key)
+        except TypeError:
+            # E.g. an unhashable callable or urlconf.
+            pass
+        else:
+            return _cached_reverse(*key)
+    return _reverse(viewname, urlconf, args, kwargs, prefix, current_app)
+
+_reverse_cache_types = (basestring, int, long)
+
+@lru_cache(maxsize=1000)
+def _cached_reverse(viewname, urlconf, args, kwargs, prefix, current_app, language_code):
+    """
+    Returns the result of _reverse(), keeping the most recently used ones.
+    Cleared by clear_url_caches().
+    """
+    return _reverse(viewname, urlconf, [v for t, v in args],
+                    dict([(k, v) for k, t, v in kwargs]), prefix, current_app)
+
+def _reverse(viewname, urlconf, args, kwargs, prefix, current_app):
+    resolver = get_resolver(urlconf)
+
     if not isinstance(viewname, basestring):
         view = viewname
     else:
@@ -484,6 +675,40 @@ def clear_url_caches():
     _resolver_cache.clear()
     _ns_resolver_cache.clear()
     _callable_cache.clear()
+    _cached_reverse.cache_clear()
+
+def populate_url_caches(urlconf=None, languages=None):
+    """
+    Imports the URLconf and the views it refers to and populates the caches
+    used to resolve and reverse its URLs, in each of the given languages
+    (by default, those of the LANGUAGES setting if USE_I18N is True).
+
+    Calling it before a server forks its worker processes, e.g. from a WSGI
+    file loaded in the parent process, spares each worker the work.
+    """
+    from django.conf import settings
+    if languages is None:
+        if settings.USE_I18N:
+            languages = [code for code, name in settings.LANGUAGES]
+        else:
+            languages = [settings.LANGUAGE_CODE]
+    if urlconf is None:
+        urlconf = get_urlconf()
+    resolver = get_resolver(urlconf)
+    for language in languages:
+        with override(language):
+            _populate_resolver(resolver)
+
+def _populate_resolver(resolver):
+    resolver.reverse_dict
+    resolver.namespace_dict
+    resolver.app_dict
+    resolver.candidate_patterns('')
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, RegexURLResolver):
+            _populate_resolver(pattern)
+        else:
+            pattern.callback
 
 def set_script_prefix(prefix):
     """
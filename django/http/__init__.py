@@ -1,6 +1,7 @@
 from __future__ import absolute_import
 
 import datetime
+import itertools
 import os
 import re
 import sys
@@ -520,13 +521,17 @@ def parse_cookie(cookie):
 class BadHeaderError(ValueError):
     pass
 
-class HttpResponse(object):
-    """A basic HTTP response, with content and dictionary-accessed headers."""
+class HttpResponseBase(object):
+    """
+    An HTTP response base class with dictionary-accessed headers.
+
+    This class doesn't handle content. It should not be used directly.
+    Use the HttpResponse and StreamingHttpResponse subclasses instead.
+    """
 
     status_code = 200
 
-    def __init__(self, content='', mimetype=None, status=None,
-            content_type=None):
+    def __init__(self, mimetype=None, status=None, content_type=None):
         # _headers is a mapping of the lower-case name to the original case of
         # the header (required for working with legacy systems) and the header
         # value. Both the name of the header and its value are ASCII strings.
@@ -537,18 +542,16 @@ class HttpResponse(object):
         if not content_type:
             content_type = "%s; charset=%s" % (settings.DEFAULT_CONTENT_TYPE,
                     self._charset)
-        self.content = content
         self.cookies = SimpleCookie()
         if status:
             self.status_code = status
 
         self['Content-Type'] = content_type
 
-    def __str__(self):
-        """Full HTTP message, including headers."""
+    def serialize_headers(self):
+        """HTTP headers as a string."""
         return '\n'.join(['%s: %s' % (key, value)
-            for key, value in self._headers.values()]) \
-            + '\n\n' + self.content
+            for key, value in self._headers.values()])
 
     def _convert_to_ascii(self, *values):
         """Converts all values to ascii strings."""
@@ -651,7 +654,51 @@ class HttpResponse(object):
         self.set_cookie(key, max_age=0, path=path, domain=domain,
                         expires='Thu, 01-Jan-1970 00:00:00 GMT')
 
+    def make_bytes(self, value):
+        """Turns a chunk of content into a bytestring."""
+        if isinstance(value, unicode):
+            return value.encode(self._charset)
+        return str(value)
+
+    # The remaining methods partially implement the file-like object interface.
+    # See http://docs.python.org/lib/bltin-file-objects.html
+
+    def close(self):
+        pass
+
+    def flush(self):
+        pass
+
+class HttpResponse(HttpResponseBase):
+    """
+    An HTTP response class with a string as content.
+
+    This content can be read, appended to or replaced.
+    """
+
+    streaming = False
+
+    def __init__(self, content='', *args, **kwargs):
+        super(HttpResponse, self).__init__(*args, **kwargs)
+        self.content = content
+
+    def __str__(self):
+        """Full HTTP message, including headers."""
+        return self.serialize_headers() + '\n\n' + self.content
+
+    def _consume_content(self):
+        # Reading the content of a response created with an iterator exhausts
+        # the iterator: keep what it produced, so that the content can be
+        # read again and the response still sent. Use StreamingHttpResponse
+        # to avoid holding the content in memory.
+        if self._base_content_is_iter and not isinstance(self._container, (list, tuple)):
+            container = self._container
+            self._container = list(container)
+            if hasattr(container, 'close'):
+                container.close()
+
     def _get_content(self):
+        self._consume_content()
         if self.has_header('Content-Encoding'):
             return ''.join([str(e) for e in self._container])
         return ''.join([smart_str(e, self._charset) for e in self._container])
@@ -671,30 +718,65 @@ class HttpResponse(object):
         return self
 
     def next(self):
-        chunk = self._iterator.next()
-        if isinstance(chunk, unicode):
-            chunk = chunk.encode(self._charset)
-        return str(chunk)
+        return self.make_bytes(self._iterator.next())
 
     def close(self):
         if hasattr(self._container, 'close'):
             self._container.close()
 
-    # The remaining methods partially implement the file-like object interface.
-    # See http://docs.python.org/lib/bltin-file-objects.html
     def write(self, content):
         if self._base_content_is_iter:
             raise Exception("This %s instance is not writable" % self.__class__)
         self._container.append(content)
 
-    def flush(self):
-        pass
-
     def tell(self):
         if self._base_content_is_iter:
             raise Exception("This %s instance cannot tell its position" % self.__class__)
         return sum([len(str(chunk)) for chunk in self._container])
 
+class StreamingHttpResponse(HttpResponseBase):
+    """
+    A streaming HTTP response class with an iterator as content.
+
+    The content is never held in memory as a whole: each chunk is encoded and
+    sent to the client as the iterator produces it, so it can only be read
+    once, through ``streaming_content``. Middleware may replace it with an
+    iterator wrapping the original one.
+    """
+
+    streaming = True
+
+    def __init__(self, streaming_content=(), *args, **kwargs):
+        super(StreamingHttpResponse, self).__init__(*args, **kwargs)
+        self._closable_objects = []
+        # `streaming_content` should be an iterable of strings, unicode
+        # chunks being encoded with the charset of the response.
+        self.streaming_content = streaming_content
+
+    @property
+    def content(self):
+        raise AttributeError("This %s instance has no `content` attribute. "
+            "Use `streaming_content` instead." % self.__class__.__name__)
+
+    def _get_streaming_content(self):
+        return itertools.imap(self.make_bytes, self._iterator)
+
+    def _set_streaming_content(self, value):
+        # Ensure the original iterator is closed when the response is, even
+        # if middleware wrapped it in another iterator.
+        if hasattr(value, 'close'):
+            self._closable_objects.append(value)
+        self._iterator = iter(value)
+
+    streaming_content = property(_get_streaming_content, _set_streaming_content)
+
+    def __iter__(self):
+        return self.streaming_content
+
+    def close(self):
+        for closable in self._closable_objects:
+            closable.close()
+
 class HttpResponseRedirect(HttpResponse):
     status_code = 302
 
@@ -46,11 +46,34 @@ More details about how the caching works:
 * This middleware also sets ETag, Last-Modified, Expires and Cache-Control
   headers on the response object.
 
+* Shortly before a cached page expires, a single request is let through to
+  regenerate it (see ``RefreshableValue.needs_refresh``) while concurrent
+  requests keep being served the cached copy, so that a popular page doesn't
+  get regenerated by every worker at once. If CACHE_MIDDLEWARE_STALE_SECONDS
+  is set, expired pages are kept that much longer, and served to the other
+  requests while one of them regenerates the page.
+
+* The ETag and Last-Modified headers of cached pages are stored separately,
+  so that conditional GET requests matching them are answered with a 304
+  Not Modified response without fetching the page itself from the cache.
+
 """
 
+import time
+
 from django.conf import settings
 from django.core.cache import get_cache, DEFAULT_CACHE_ALIAS
-from django.utils.cache import get_cache_key, learn_cache_key, patch_response_headers, get_max_age
+from django.core.cache.backends.base import RefreshableValue, DEFAULT_LOCK_TIMEOUT
+from django.http import HttpResponseNotModified
+from django.utils.cache import (get_cache_key, learn_cache_key,
+    patch_response_headers, get_max_age, is_not_modified)
+
+# Headers of a cached page that are kept apart from it to answer conditional
+# GET requests.
+CONDITIONAL_HEADERS = ('ETag', 'Last-Modified', 'Expires', 'Cache-Control', 'Vary')
+
+def _get_headers_key(cache_key):
+    return '%s.headers' % cache_key
 
 
 class UpdateCacheMiddleware(object):
@@ -67,6 +90,7 @@ class UpdateCacheMiddleware(object):
         self.key_prefix = settings.CACHE_MIDDLEWARE_KEY_PREFIX
         self.cache_anonymous_only = getattr(settings, 'CACHE_MIDDLEWARE_ANONYMOUS_ONLY', False)
         self.cache_alias = settings.CACHE_MIDDLEWARE_ALIAS
+        self.stale_timeout = settings.CACHE_MIDDLEWARE_STALE_SECONDS
         self.cache = get_cache(self.cache_alias)
 
     def _session_accessed(self, request):
@@ -88,12 +112,39 @@ class UpdateCacheMiddleware(object):
                 return False
         return True
 
+    def _release_refresh_lock(self, request):
+        lock_key = getattr(request, '_cache_refresh_lock', None)
+        if lock_key is not None:
+            self.cache.delete(lock_key)
+            request._cache_refresh_lock = None
+
+    def _store_response(self, request, cache_key, response, timeout):
+        now = time.time()
+        delta = now - getattr(request, '_cache_fetch_started', now)
+        headers = dict((header, response[header]) for header in CONDITIONAL_HEADERS
+                       if response.has_header(header))
+        self.cache.set_many({
+            cache_key: RefreshableValue(response, now + timeout, delta),
+            _get_headers_key(cache_key): RefreshableValue(headers, now + timeout, delta),
+        }, timeout + self.stale_timeout)
+        self._release_refresh_lock(request)
+
+    def process_exception(self, request, exception):
+        """
+        Releases the refresh lock of the request, if any, so that another
+        request can regenerate the page.
+        """
+        self._release_refresh_lock(request)
+
     def process_response(self, request, response):
         """Sets the cache, if needed."""
         if not self._should_update_cache(request, response):
             # We don't need to update the cache, just return.
+            self._release_refresh_lock(request)
             return response
-        if not response.status_code == 200:
+        if response.streaming or not response.status_code == 200:
+            # Streaming responses can't be stored without reading them.
+            self._release_refresh_lock(request)
             return response
         # Try to get the timeout from the "max-age" section of the "Cache-
         # Control" header before reverting to using the default cache_timeout
@@ -103,16 +154,20 @@ class UpdateCacheMiddleware(object):
             timeout = self.cache_timeout
         elif timeout == 0:
             # max-age was set to 0, don't bother caching.
+            self._release_refresh_lock(request)
             return response
         patch_response_headers(response, timeout)
         if timeout:
-            cache_key = learn_cache_key(request, response, timeout, self.key_prefix, cache=self.cache)
+            cache_key = learn_cache_key(request, response, timeout + self.stale_timeout,
+                                        self.key_prefix, cache=self.cache)
             if hasattr(response, 'render') and callable(response.render):
                 response.add_post_render_callback(
-                    lambda r: self.cache.set(cache_key, r, timeout)
+                    lambda r: self._store_response(request, cache_key, r, timeout)
                 )
             else:
-                self.cache.set(cache_key, response, timeout)
+                self._store_response(request, cache_key, response, timeout)
+        else:
+            self._release_refresh_lock(request)
         return response
 
 class FetchFromCacheMiddleware(object):
@@ -139,11 +194,25 @@ class FetchFromCacheMiddleware(object):
             request._cache_update_cache = False
             return None # Don't bother checking the cache.
 
+        request._cache_fetch_started = time.time()
         # try and get the cached GET response
         cache_key = get_cache_key(request, self.key_prefix, 'GET', cache=self.cache)
         if cache_key is None:
             request._cache_update_cache = True
             return None # No cache information available, need to rebuild.
+
+        if ('HTTP_IF_NONE_MATCH' in request.META or
+                'HTTP_IF_MODIFIED_SINCE' in request.META):
+            # Try to answer from the cached headers, without fetching the page.
+            headers = self.cache.get(_get_headers_key(cache_key), None)
+            if isinstance(headers, RefreshableValue):
+                if self._start_refresh(request, cache_key, headers):
+                    return None
+                response = self._get_not_modified_response(request, headers.value)
+                if response is not None:
+                    request._cache_update_cache = False
+                    return response
+
         response = self.cache.get(cache_key, None)
         # if it wasn't found and we are looking for a HEAD, try looking just for that
         if response is None and request.method == 'HEAD':
@@ -154,10 +223,40 @@ class FetchFromCacheMiddleware(object):
             request._cache_update_cache = True
             return None # No cache information available, need to rebuild.
 
+        if isinstance(response, RefreshableValue):
+            if self._start_refresh(request, cache_key, response):
+                return None
+            response = response.value
+
         # hit, return cached response
         request._cache_update_cache = False
         return response
 
+    def _start_refresh(self, request, cache_key, entry):
+        """
+        Decides whether this request should regenerate the cached page.
+        Concurrent requests keep being served the cached copy meanwhile.
+        """
+        lock_key = self.cache.get_refresh_lock_key(cache_key)
+        if (entry.needs_refresh() and
+                self.cache.add(lock_key, True, DEFAULT_LOCK_TIMEOUT)):
+            request._cache_refresh_lock = lock_key
+            request._cache_update_cache = True
+            return True
+        return False
+
+    def _get_not_modified_response(self, request, headers):
+        """
+        Returns a 304 Not Modified response if the request's conditions match
+        the given headers of the cached page.
+        """
+        if not is_not_modified(request, headers.get('ETag'), headers.get('Last-Modified')):
+            return None
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
 class CacheMiddleware(UpdateCacheMiddleware, FetchFromCacheMiddleware):
     """
     Cache middleware that provides basic behavior for many simple sites.
@@ -201,5 +300,7 @@ class CacheMiddleware(UpdateCacheMiddleware, FetchFromCacheMiddleware):
         else:
             self.cache_anonymous_only = cache_anonymous_only
 
+        self.stale_timeout = settings.CACHE_MIDDLEWARE_STALE_SECONDS
+
         self.cache = get_cache(self.cache_alias, **cache_kwargs)
         self.cache_timeout = self.cache.default_timeout
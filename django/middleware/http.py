@@ -1,4 +1,5 @@
-from django.utils.http import http_date, parse_http_date_safe
+from django.utils.cache import is_not_modified
+from django.utils.http import http_date
 
 class ConditionalGetMiddleware(object):
     """
@@ -6,30 +7,18 @@ class ConditionalGetMiddleware(object):
     Last-Modified header, and the request has If-None-Match or
     If-Modified-Since, the response is replaced by an HttpNotModified.
 
-    Also sets the Date and Content-Length response-headers.
+    Also sets the Date and Content-Length response-headers, the latter only
+    for non-streaming responses.
     """
     def process_response(self, request, response):
         response['Date'] = http_date()
-        if not response.has_header('Content-Length'):
+        if not response.streaming and not response.has_header('Content-Length'):
             response['Content-Length'] = str(len(response.content))
 
-        if response.has_header('ETag'):
-            if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
-            if if_none_match == response['ETag']:
-                # Setting the status is enough here. The response handling path
-                # automatically removes content for this status code (in
-                # http.conditional_content_removal()).
-                response.status_code = 304
-
-        if response.has_header('Last-Modified'):
-            if_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE')
-            if if_modified_since is not None:
-                if_modified_since = parse_http_date_safe(if_modified_since)
-            if if_modified_since is not None:
-                last_modified = parse_http_date_safe(response['Last-Modified'])
-                if last_modified is not None and last_modified <= if_modified_since:
-                    # Setting the status code is enough here (same reasons as
-                    # above).
-                    response.status_code = 304
+        if is_not_modified(request, response.get('ETag'), response.get('Last-Modified')):
+            # Setting the status is enough here. The response handling path
+            # automatically removes content for this status code (in
+            # http.conditional_content_removal()).
+            response.status_code = 304
 
         return response
@@ -53,6 +53,17 @@ ALLOWED_VARIABLE_CHARS = ('abcdefghijklmnopqrstuvwxyz'
 # (e.g. strings)
 UNKNOWN_SOURCE = '<unknown source>'
 
+# Lookups remembered by Variable._resolve_lookup(), which performs them right
+# away when the dictionary lookup (and the attribute lookup, for the latter)
+# can't succeed.
+ATTRIBUTE_LOOKUP = 1
+INDEX_LOOKUP = 2
+# Types whose instances only support list-index lookups with integer keys.
+INDEXED_TYPES = (list, tuple, str, unicode)
+
+# Minimum length of the chunks yielded by Template.stream(), in characters.
+STREAM_BUFFER_SIZE = 4096
+
 # match a variable or block tag and capture the entire tag, including start/end
 # delimiters
 tag_re = (re.compile('(%s.*?%s|%s.*?%s|%s.*?%s)' %
@@ -124,6 +135,9 @@ class Template(object):
             origin = StringOrigin(template_string)
         self.nodelist = compile_string(template_string, origin)
         self.name = name
+        if settings.TEMPLATE_COMPILE and not settings.TEMPLATE_DEBUG:
+            from django.template.compiler import compile_template
+            compile_template(self)
 
     def __iter__(self):
         for node in self.nodelist:
@@ -135,12 +149,56 @@ class Template(object):
 
     def render(self, context):
         "Display stage -- can be called many times"
+        profile = context.render_context.profile
+        if profile is None and settings.TEMPLATE_PROFILING:
+            from django.template.profiling import profile_render
+            return profile_render(self, context)
         context.render_context.push()
         try:
+            if profile is not None:
+                return profile.call(self, self._render, context)
             return self._render(context)
         finally:
             context.render_context.pop()
 
+    def _stream(self, context):
+        return self.nodelist.stream(context)
+
+    def stream(self, context, buffer_size=STREAM_BUFFER_SIZE):
+        """
+        Renders the template like render(), but returns an iterator yielding
+        the output in unicode chunks as it's produced: at node boundaries and
+        after every iteration of a {% for %} loop. Consecutive chunks are
+        joined until they're at least buffer_size characters long; set it to
+        0 to get every chunk as soon as it's rendered.
+        """
+        if context.render_context.profile is None and settings.TEMPLATE_PROFILING:
+            from django.template.profiling import profile_stream
+            return profile_stream(self, context, buffer_size)
+        return self._buffered_stream(context, buffer_size)
+
+    def _buffered_stream(self, context, buffer_size):
+        context.render_context.push()
+        try:
+            profile = context.render_context.profile
+            if profile is not None:
+                stream = profile.call_iter(self, self._stream, context)
+            else:
+                stream = self._stream(context)
+            bits, length = [], 0
+            for bit in stream:
+                if not bit:
+                    continue
+                bits.append(bit)
+                length += len(bit)
+                if length >= buffer_size:
+                    yield u''.join(bits)
+                    bits, length = [], 0
+            if bits:
+                yield u''.join(bits)
+        finally:
+            context.render_context.pop()
+
 def compile_string(template_string, origin):
     "Compiles template_string into NodeList ready for rendering"
     if settings.TEMPLATE_DEBUG:
@@ -651,6 +709,12 @@ def resolve_variable(path, context):
     """
     return Variable(path).resolve(context)
 
+def _int_or_none(bit):
+    try:
+        return int(bit)
+    except ValueError:
+        return None
+
 class Variable(object):
     """
     A template variable, resolvable against a given context. The variable may
@@ -674,8 +738,12 @@ class Variable(object):
         self.var = var
         self.literal = None
         self.lookups = None
+        self.int_lookups = None
         self.translate = False
         self.message_context = None
+        # Maps (bit, type of the object it's looked up on) to the kind of
+        # lookup known to succeed first, see _resolve_lookup().
+        self.lookup_strategies = {}
 
         try:
             # First try to treat this variable as a number.
@@ -713,6 +781,8 @@ class Variable(object):
                                               "not begin with underscores: '%s'" %
                                               var)
                 self.lookups = tuple(var.split(VARIABLE_ATTRIBUTE_SEPARATOR))
+                # Maps each bit to the key of its list-index lookup, or None.
+                self.int_lookups = dict((bit, _int_or_none(bit)) for bit in self.lookups)
 
     def resolve(self, context):
         """Resolve this variable against a given context."""
@@ -735,6 +805,12 @@ class Variable(object):
     def __str__(self):
         return self.var
 
+    def __getstate__(self):
+        # The remembered lookups refer to types that may not be picklable.
+        state = self.__dict__.copy()
+        state['lookup_strategies'] = {}
+        return state
+
     def _resolve_lookup(self, context):
         """
         Performs resolution of a real variable (i.e. not a literal) against the
@@ -745,23 +821,40 @@ class Variable(object):
         instead.
         """
         current = context
+        strategies = self.lookup_strategies
         try:  # catch-all for silent variable failures
             for bit in self.lookups:
-                try:  # dictionary lookup
-                    current = current[bit]
-                except (TypeError, AttributeError, KeyError):
-                    try:  # attribute lookup
+                # Dictionary, attribute and list-index lookups are tried in
+                # turn. When the earlier ones can't succeed on objects of a
+                # given type, the lookup that did is remembered and performed
+                # right away the next time, sparing the exceptions.
+                if strategies:
+                    strategy = strategies.get((bit, type(current)))
+                else:
+                    strategy = None
+                if strategy is None:
+                    try:  # dictionary lookup
+                        current = current[bit]
+                    except (TypeError, AttributeError, KeyError):
+                        current_type = type(current)
+                        try:  # attribute lookup
+                            current = getattr(current, bit)
+                        except (TypeError, AttributeError):
+                            current = self._resolve_index(current, bit)
+                            if current_type in INDEXED_TYPES:
+                                strategies[bit, current_type] = INDEX_LOOKUP
+                        else:
+                            if not hasattr(current_type, '__getitem__'):
+                                strategies[bit, current_type] = ATTRIBUTE_LOOKUP
+                elif strategy == ATTRIBUTE_LOOKUP:
+                    try:
                         current = getattr(current, bit)
                     except (TypeError, AttributeError):
-                        try:  # list-index lookup
-                            current = current[int(bit)]
-                        except (IndexError,  # list index out of range
-                                ValueError,  # invalid literal for int()
-                                KeyError,    # current is a dict without `int(bit)` key
-                                TypeError):  # unsubscriptable object
-                            raise VariableDoesNotExist("Failed lookup for key "
-                                                       "[%s] in %r",
-                                                       (bit, current))  # missing attribute
+                        raise VariableDoesNotExist("Failed lookup for key "
+                                                   "[%s] in %r",
+                                                   (bit, current))  # missing attribute
+                else:
+                    current = self._resolve_index(current, bit)
                 if callable(current):
                     if getattr(current, 'do_not_call_in_templates', False):
                         pass
@@ -782,6 +875,23 @@ class Variable(object):
 
         return current
 
+    def _resolve_index(self, current, bit):
+        """
+        Performs the list-index lookup of a bit of the variable.
+        """
+        index = self.int_lookups[bit]
+        try:
+            if index is None:
+                raise ValueError  # invalid literal for int()
+            return current[index]
+        except (IndexError,  # list index out of range
+                ValueError,  # invalid literal for int()
+                KeyError,    # current is a dict without `int(bit)` key
+                TypeError):  # unsubscriptable object
+            raise VariableDoesNotExist("Failed lookup for key "
+                                       "[%s] in %r",
+                                       (bit, current))  # missing attribute
+
 class Node(object):
     # Set this to True for nodes that must be first in the template (although
     # they can be preceded by text nodes.
@@ -794,6 +904,13 @@ class Node(object):
         """
         pass
 
+    def stream(self, context):
+        """
+        Return an iterator over the rendered node, in chunks. Nodes that may
+        produce a lot of output override this to yield it as it's rendered.
+        """
+        yield self.render(context)
+
     def __iter__(self):
         yield self
 
@@ -815,12 +932,27 @@ class NodeList(list):
     # Set to True the first time a non-TextNode is inserted by
     # extend_nodelist().
     contains_nontext = False
+    # Set by django.template.compiler to a function rendering the nodes.
+    compiled = None
+
+    def __getstate__(self):
+        # Compiled functions can't be pickled; the unpickled nodelist is
+        # interpreted until it's compiled again.
+        state = self.__dict__.copy()
+        state.pop('compiled', None)
+        return state
 
     def render(self, context):
+        profile = context.render_context.profile
+        if self.compiled is not None and profile is None:
+            return self.compiled(context)
         bits = []
         for node in self:
             if isinstance(node, Node):
-                bit = self.render_node(node, context)
+                if profile is None or isinstance(node, TextNode):
+                    bit = self.render_node(node, context)
+                else:
+                    bit = profile.call(node, self.render_node, node, context)
             else:
                 bit = node
             bits.append(force_unicode(bit))
@@ -836,6 +968,22 @@ class NodeList(list):
     def render_node(self, node, context):
         return node.render(context)
 
+    def stream(self, context):
+        profile = context.render_context.profile
+        for node in self:
+            if isinstance(node, Node):
+                if profile is None or isinstance(node, TextNode):
+                    bits = self.stream_node(node, context)
+                else:
+                    bits = profile.call_iter(node, self.stream_node, node, context)
+                for bit in bits:
+                    yield force_unicode(bit)
+            else:
+                yield force_unicode(node)
+
+    def stream_node(self, node, context):
+        return node.stream(context)
+
 class TextNode(Node):
     def __init__(self, s):
         self.s = s
@@ -853,8 +1001,10 @@ def _render_value_in_context(value, context):
     means escaping, if required, and conversion to a unicode object. If value
     is a string, it is expected to have already been translated.
     """
-    value = localtime(value, use_tz=context.use_tz)
-    value = localize(value, use_l10n=context.use_l10n)
+    if not isinstance(value, basestring):
+        # Strings are neither converted nor localized.
+        value = localtime(value, use_tz=context.use_tz)
+        value = localize(value, use_l10n=context.use_l10n)
     value = force_unicode(value)
     if ((context.autoescape and not isinstance(value, SafeData)) or
             isinstance(value, EscapeData)):
@@ -1028,6 +1178,77 @@ class TagHelperNode(Node):
                                 for k, v in self.kwargs.items())
         return resolved_args, resolved_kwargs
 
+class SimpleNode(TagHelperNode):
+    """
+    Renders the return value of a function registered with
+    Library.simple_tag().
+    """
+
+    def __init__(self, func, takes_context, args, kwargs):
+        super(SimpleNode, self).__init__(takes_context, args, kwargs)
+        self.func = func
+
+    def render(self, context):
+        resolved_args, resolved_kwargs = self.get_resolved_arguments(context)
+        return self.func(*resolved_args, **resolved_kwargs)
+
+class AssignmentNode(TagHelperNode):
+    """
+    Stores the return value of a function registered with
+    Library.assignment_tag() in the context.
+    """
+
+    def __init__(self, func, takes_context, args, kwargs, target_var):
+        super(AssignmentNode, self).__init__(takes_context, args, kwargs)
+        self.func = func
+        self.target_var = target_var
+
+    def render(self, context):
+        resolved_args, resolved_kwargs = self.get_resolved_arguments(context)
+        context[self.target_var] = self.func(*resolved_args, **resolved_kwargs)
+        return ''
+
+class InclusionNode(TagHelperNode):
+    """
+    Renders a template with the context returned by a function registered with
+    Library.inclusion_tag().
+    """
+
+    def __init__(self, func, file_name, context_class, takes_context, args, kwargs):
+        super(InclusionNode, self).__init__(takes_context, args, kwargs)
+        self.func = func
+        self.file_name = file_name
+        self.context_class = context_class
+
+    def render(self, context):
+        resolved_args, resolved_kwargs = self.get_resolved_arguments(context)
+        _dict = self.func(*resolved_args, **resolved_kwargs)
+
+        if not getattr(self, 'nodelist', False):
+            from django.template.loader import get_template, select_template
+            file_name = self.file_name
+            if isinstance(file_name, Template):
+                t = file_name
+            elif not isinstance(file_name, basestring) and is_iterable(file_name):
+                t = select_template(file_name)
+            else:
+                t = get_template(file_name)
+            self.nodelist = t.nodelist
+        new_context = self.context_class(_dict, **{
+            'autoescape': context.autoescape,
+            'current_app': context.current_app,
+            'use_l10n': context.use_l10n,
+            'use_tz': context.use_tz,
+        })
+        # Copy across the CSRF token, if present, because
+        # inclusion tags are often used for forms, and we need
+        # instructions for using CSRF protection to be as simple
+        # as possible.
+        csrf_token = context.get('csrf_token', None)
+        if csrf_token is not None:
+            new_context['csrf_token'] = csrf_token
+        return self.nodelist.render(new_context)
+
 class Library(object):
     def __init__(self):
         self.filters = {}
@@ -1100,18 +1321,12 @@ class Library(object):
         def dec(func):
             params, varargs, varkw, defaults = getargspec(func)
 
-            class SimpleNode(TagHelperNode):
-
-                def render(self, context):
-                    resolved_args, resolved_kwargs = self.get_resolved_arguments(context)
-                    return func(*resolved_args, **resolved_kwargs)
-
             function_name = (name or
                 getattr(func, '_decorated_function', func).__name__)
             compile_func = partial(generic_tag_compiler,
                 params=params, varargs=varargs, varkw=varkw,
                 defaults=defaults, name=function_name,
-                takes_context=takes_context, node_class=SimpleNode)
+                takes_context=takes_context, node_class=partial(SimpleNode, func))
             compile_func.__doc__ = func.__doc__
             self.tag(function_name, compile_func)
             return func
@@ -1129,16 +1344,6 @@ class Library(object):
         def dec(func):
             params, varargs, varkw, defaults = getargspec(func)
 
-            class AssignmentNode(TagHelperNode):
-                def __init__(self, takes_context, args, kwargs, target_var):
-                    super(AssignmentNode, self).__init__(takes_context, args, kwargs)
-                    self.target_var = target_var
-
-                def render(self, context):
-                    resolved_args, resolved_kwargs = self.get_resolved_arguments(context)
-                    context[self.target_var] = func(*resolved_args, **resolved_kwargs)
-                    return ''
-
             function_name = (name or
                 getattr(func, '_decorated_function', func).__name__)
 
@@ -1152,7 +1357,7 @@ class Library(object):
                 bits = bits[:-2]
                 args, kwargs = parse_bits(parser, bits, params,
                     varargs, varkw, defaults, takes_context, function_name)
-                return AssignmentNode(takes_context, args, kwargs, target_var)
+                return AssignmentNode(func, takes_context, args, kwargs, target_var)
 
             compile_func.__doc__ = func.__doc__
             self.tag(function_name, compile_func)
@@ -1171,42 +1376,13 @@ class Library(object):
         def dec(func):
             params, varargs, varkw, defaults = getargspec(func)
 
-            class InclusionNode(TagHelperNode):
-
-                def render(self, context):
-                    resolved_args, resolved_kwargs = self.get_resolved_arguments(context)
-                    _dict = func(*resolved_args, **resolved_kwargs)
-
-                    if not getattr(self, 'nodelist', False):
-                        from django.template.loader import get_template, select_template
-                        if isinstance(file_name, Template):
-                            t = file_name
-                        elif not isinstance(file_name, basestring) and is_iterable(file_name):
-                            t = select_template(file_name)
-                        else:
-                            t = get_template(file_name)
-                        self.nodelist = t.nodelist
-                    new_context = context_class(_dict, **{
-                        'autoescape': context.autoescape,
-                        'current_app': context.current_app,
-                        'use_l10n': context.use_l10n,
-                        'use_tz': context.use_tz,
-                    })
-                    # Copy across the CSRF token, if present, because
-                    # inclusion tags are often used for forms, and we need
-                    # instructions for using CSRF protection to be as simple
-                    # as possible.
-                    csrf_token = context.get('csrf_token', None)
-                    if csrf_token is not None:
-                        new_context['csrf_token'] = csrf_token
-                    return self.nodelist.render(new_context)
-
             function_name = (name or
                 getattr(func, '_decorated_function', func).__name__)
             compile_func = partial(generic_tag_compiler,
                 params=params, varargs=varargs, varkw=varkw,
                 defaults=defaults, name=function_name,
-                takes_context=takes_context, node_class=InclusionNode)
+                takes_context=takes_context,
+                node_class=partial(InclusionNode, func, file_name, context_class))
             compile_func.__doc__ = func.__doc__
             self.tag(function_name, compile_func)
             return func
@@ -0,0 +1,205 @@
+"""
+Compiles parsed templates to Python functions.
+
+The interpreter renders a template by walking its NodeList and calling
+render() on every node. The compiler turns a NodeList into the source code of
+a single Python function instead, with text, variables and the {% for %} and
+{% if %} tags inlined in it, and compiles that. Other nodes, e.g. custom tags,
+are rendered by calling their render() method from the generated code, and
+their own nodelists are compiled in turn.
+
+Compiled templates produce the same output as interpreted ones. Set
+TEMPLATE_COMPILE to True to compile every template as it's loaded; this is
+ignored when TEMPLATE_DEBUG is True, because the interpreter is needed to
+annotate errors with the template source.
+"""
+from django.template.base import (Node, NodeList, TextNode, VariableNode,
+    VariableDoesNotExist, _render_value_in_context)
+from django.template.defaulttags import ForNode, IfNode
+from django.utils.encoding import force_unicode, smart_str
+from django.utils.safestring import mark_safe
+
+
+class NodeListCompiler(object):
+    """
+    Generates and compiles the code of a function rendering a NodeList.
+
+    Objects the generated code needs, like nodes and filter expressions, are
+    passed to it as globals, named after their role and a serial number.
+    """
+    def __init__(self, name='<template>'):
+        self.name = name
+        self.lines = []
+        self.namespace = {
+            'VariableDoesNotExist': VariableDoesNotExist,
+            'force_unicode': force_unicode,
+            'mark_safe': mark_safe,
+            'render_value': _render_value_in_context,
+        }
+        self.counter = 0
+
+    def compile(self, nodelist):
+        """
+        Returns a function taking a context and rendering nodelist in it.
+        """
+        self.emit(0, 'def render(context):')
+        self.emit(1, 'bits = []')
+        self.emit(1, 'append = bits.append')
+        self.compile_nodelist(nodelist, 1)
+        self.emit(1, "return mark_safe(u''.join(bits))")
+        code = compile('\n'.join(self.lines) + '\n', self.name, 'exec')
+        exec code in self.namespace
+        return self.namespace['render']
+
+    def emit(self, indent, line):
+        self.lines.append('    ' * indent + line)
+
+    def add_constant(self, prefix, value):
+        """
+        Makes value available to the generated code and returns its name.
+        """
+        self.counter += 1
+        name = '%s_%d' % (prefix, self.counter)
+        self.namespace[name] = value
+        return name
+
+    def compile_nodelist(self, nodelist, indent):
+        if not len(nodelist):
+            self.emit(indent, 'pass')
+        for node in nodelist:
+            if not isinstance(node, Node):
+                self.emit(indent, 'append(force_unicode(%s))' % self.add_constant('bit', node))
+                continue
+            # Subclasses may render differently, so only the exact classes
+            # are inlined.
+            handler = self.handlers.get(type(node))
+            if handler is None or not handler(self, node, indent):
+                self.compile_fallback(node, indent)
+
+    def compile_fallback(self, node, indent):
+        """
+        Renders node with the interpreter, compiling its nodelists.
+        """
+        for attr in node.child_nodelists:
+            child = getattr(node, attr, None)
+            if isinstance(child, NodeList):
+                compile_nodelist(child, self.name)
+        name = self.add_constant('node', node)
+        self.emit(indent, 'append(force_unicode(%s.render(context)))' % name)
+
+    def compile_text(self, node, indent):
+        self.emit(indent, 'append(%s)' % self.add_constant('text', force_unicode(node.s)))
+        return True
+
+    def compile_variable(self, node, indent):
+        name = self.add_constant('var', node.filter_expression)
+        self.emit(indent, 'try:')
+        self.emit(indent + 1, 'append(render_value(%s.resolve(context), context))' % name)
+        # See VariableNode.render().
+        self.emit(indent, 'except UnicodeDecodeError:')
+        self.emit(indent + 1, 'pass')
+        return True
+
+    def compile_if(self, node, indent):
+        for condition, nodelist in node.conditions_nodelists:
+            if condition is None:
+                self.compile_nodelist(nodelist, indent)
+                return True
+            name = self.add_constant('condition', condition)
+            match = 'match_%d' % self.counter
+            self.emit(indent, 'try:')
+            self.emit(indent + 1, '%s = %s.eval(context)' % (match, name))
+            self.emit(indent, 'except VariableDoesNotExist:')
+            self.emit(indent + 1, '%s = None' % match)
+            self.emit(indent, 'if %s:' % match)
+            self.compile_nodelist(nodelist, indent + 1)
+            self.emit(indent, 'else:')
+            indent += 1
+        self.emit(indent, 'pass')
+        return True
+
+    def compile_for(self, node, indent):
+        """
+        Inlines a {% for %} loop; see ForNode.render(). Loops whose body
+        prefetches are left to the interpreter.
+        """
+        if node.get_prefetch_nodes():
+            return False
+        n = self.counter + 1
+        sequence = self.add_constant('sequence', node.sequence)
+        parentloop, values, length, loop, i, item, popped = [
+            '%s_%d' % (var, n) for var in
+            ('parentloop', 'values', 'len_values', 'loop', 'i', 'item', 'pop_context')]
+        emit = self.emit
+        emit(indent, "if 'forloop' in context:")
+        emit(indent + 1, "%s = context['forloop']" % parentloop)
+        emit(indent, 'else:')
+        emit(indent + 1, '%s = {}' % parentloop)
+        emit(indent, 'context.push()')
+        emit(indent, 'try:')
+        emit(indent + 1, '%s = %s.resolve(context, True)' % (values, sequence))
+        emit(indent, 'except VariableDoesNotExist:')
+        emit(indent + 1, '%s = []' % values)
+        emit(indent, 'if %s is None:' % values)
+        emit(indent + 1, '%s = []' % values)
+        emit(indent, "if not hasattr(%s, '__len__'):" % values)
+        emit(indent + 1, '%s = list(%s)' % (values, values))
+        emit(indent, '%s = len(%s)' % (length, values))
+        emit(indent, 'if %s < 1:' % length)
+        emit(indent + 1, 'context.pop()')
+        self.compile_nodelist(node.nodelist_empty, indent + 1)
+        emit(indent, 'else:')
+        indent += 1
+        if node.is_reversed:
+            emit(indent, '%s = reversed(%s)' % (values, values))
+        emit(indent, "%s = context['forloop'] = {'parentloop': %s}" % (loop, parentloop))
+        emit(indent, 'for %s, %s in enumerate(%s):' % (i, item, values))
+        indent += 1
+        emit(indent, "%s['counter0'] = %s" % (loop, i))
+        emit(indent, "%s['counter'] = %s + 1" % (loop, i))
+        emit(indent, "%s['revcounter'] = %s - %s" % (loop, length, i))
+        emit(indent, "%s['revcounter0'] = %s - %s - 1" % (loop, length, i))
+        emit(indent, "%s['first'] = (%s == 0)" % (loop, i))
+        emit(indent, "%s['last'] = (%s == %s - 1)" % (loop, i, length))
+        if len(node.loopvars) > 1:
+            loopvars = self.add_constant('loopvars', node.loopvars)
+            emit(indent, 'try:')
+            emit(indent + 1, 'unpacked_vars = dict(zip(%s, %s))' % (loopvars, item))
+            emit(indent, 'except TypeError:')
+            emit(indent + 1, '%s = False' % popped)
+            emit(indent, 'else:')
+            emit(indent + 1, '%s = True' % popped)
+            emit(indent + 1, 'context.update(unpacked_vars)')
+            self.compile_nodelist(node.nodelist_loop, indent)
+            emit(indent, 'if %s:' % popped)
+            emit(indent + 1, 'context.pop()')
+        else:
+            loopvar = self.add_constant('loopvar', node.loopvars[0])
+            emit(indent, 'context[%s] = %s' % (loopvar, item))
+            self.compile_nodelist(node.nodelist_loop, indent)
+        emit(indent - 1, 'context.pop()')
+        return True
+
+    handlers = {
+        TextNode: compile_text,
+        VariableNode: compile_variable,
+        IfNode: compile_if,
+        ForNode: compile_for,
+    }
+
+
+def compile_nodelist(nodelist, name='<template>'):
+    """
+    Compiles nodelist in place: its render() method calls the compiled
+    function from then on.
+    """
+    nodelist.compiled = NodeListCompiler(name).compile(nodelist)
+    return nodelist
+
+
+def compile_template(template):
+    """
+    Compiles the nodelist of a Template in place, and returns the template.
+    """
+    compile_nodelist(template.nodelist, '<template %s>' % smart_str(template.name))
+    return template
@@ -13,6 +13,29 @@ class ContextPopException(Exception):
     "pop() has been called more times than push()"
     pass
 
+class LazyValue(object):
+    """
+    A context variable whose value is computed by calling func(*args,
+    **kwargs) the first time it's looked up, rather than when it's added to
+    the context. Context processors use it for values that are expensive to
+    compute and that most templates don't use.
+    """
+    def __init__(self, func, *args, **kwargs):
+        self.func, self.args, self.kwargs = func, args, kwargs
+        self.evaluated = False
+
+    def __repr__(self):
+        if self.evaluated:
+            return repr(self.value)
+        return '<LazyValue: %r>' % self.func
+
+    def evaluate(self):
+        if not self.evaluated:
+            self.value = self.func(*self.args, **self.kwargs)
+            self.evaluated = True
+            del self.func, self.args, self.kwargs
+        return self.value
+
 class BaseContext(object):
     def __init__(self, dict_=None):
         self._reset_dicts(dict_)
@@ -53,7 +76,10 @@ class BaseContext(object):
         "Get a variable's value, starting at the current context and going upward"
         for d in reversed(self.dicts):
             if key in d:
-                return d[key]
+                value = d[key]
+                if isinstance(value, LazyValue):
+                    return value.evaluate()
+                return value
         raise KeyError(key)
 
     def __delitem__(self, key):
@@ -72,7 +98,10 @@ class BaseContext(object):
     def get(self, key, otherwise=None):
         for d in reversed(self.dicts):
             if key in d:
-                return d[key]
+                value = d[key]
+                if isinstance(value, LazyValue):
+                    return value.evaluate()
+                return value
         return otherwise
 
     def new(self, values=None):
@@ -80,7 +109,8 @@ class BaseContext(object):
         Returns a new context with the same properties, but with only the
         values given in 'values' stored.
         """
-        new_context = copy(self)
+        # Skip __copy__(), the dicts would be thrown away.
+        new_context = copy(super(BaseContext, self))
         new_context._reset_dicts(values)
         return new_context
 
@@ -100,6 +130,11 @@ class Context(BaseContext):
         duplicate.render_context = copy(self.render_context)
         return duplicate
 
+    def new(self, values=None):
+        new_context = super(Context, self).new(values)
+        new_context.render_context = copy(self.render_context)
+        return new_context
+
     def update(self, other_dict):
         "Pushes other_dict to the stack of dictionaries in the Context"
         if not hasattr(other_dict, '__getitem__'):
@@ -121,7 +156,17 @@ class RenderContext(BaseContext):
     stack. Thus, variables are local to a specific template and don't affect the
     rendering of other templates as they would if they were stored in the normal
     template context.
+
+    Templates loaded by name while rendering, e.g. by {% include %} and
+    {% extends %} tags, are stored in the 'templates' dictionary, which isn't
+    scoped, so that they're loaded once per render. 'profile' is the
+    django.template.profiling.RenderProfile recording the render, if any.
     """
+    def __init__(self, dict_=None):
+        super(RenderContext, self).__init__(dict_)
+        self.templates = {}
+        self.profile = None
+
     def __iter__(self):
         for d in self.dicts[-1]:
             yield d
@@ -77,13 +77,23 @@ class DebugNodeList(NodeList):
                 e.django_template_source = node.source
             raise
 
+    def stream_node(self, node, context):
+        try:
+            for bit in node.stream(context):
+                yield bit
+        except Exception, e:
+            if not hasattr(e, 'django_template_source'):
+                e.django_template_source = node.source
+            raise
+
 
 class DebugVariableNode(VariableNode):
     def render(self, context):
         try:
             output = self.filter_expression.resolve(context)
-            output = localtime(output, use_tz=context.use_tz)
-            output = localize(output, use_l10n=context.use_l10n)
+            if not isinstance(output, basestring):
+                output = localtime(output, use_tz=context.use_tz)
+                output = localize(output, use_l10n=context.use_l10n)
             output = force_unicode(output)
         except UnicodeDecodeError:
             return ''
@@ -6,7 +6,7 @@ from datetime import datetime
 from itertools import groupby, cycle as itertools_cycle
 
 from django.conf import settings
-from django.template.base import (Node, NodeList, Template, Library,
+from django.template.base import (Node, NodeList, TextNode, Template, Library,
     TemplateSyntaxError, VariableDoesNotExist, InvalidTemplateLibrary,
     BLOCK_TAG_START, BLOCK_TAG_END, VARIABLE_TAG_START, VARIABLE_TAG_END,
     SINGLE_BRACE_START, SINGLE_BRACE_END, COMMENT_TAG_START, COMMENT_TAG_END,
@@ -34,6 +34,13 @@ class AutoEscapeControlNode(Node):
         else:
             return output
 
+    def stream(self, context):
+        old_setting = context.autoescape
+        context.autoescape = self.setting
+        for bit in self.nodelist.stream(context):
+            yield bit
+        context.autoescape = old_setting
+
 class CommentNode(Node):
     def render(self, context):
         return ''
@@ -105,6 +112,12 @@ class FirstOfNode(Node):
         return u''
 
 class ForNode(Node):
+    """
+    Nodes in the loop body that define ``prefetch(context)`` can batch work
+    across iterations: ``prefetch()`` is called for every iteration, with the
+    loop variables set, before anything is rendered, and
+    ``finish_prefetch(context)`` once the whole loop has been rendered.
+    """
     child_nodelists = ('nodelist_loop', 'nodelist_empty')
 
     def __init__(self, loopvars, sequence, is_reversed, nodelist_loop, nodelist_empty=None):
@@ -115,6 +128,7 @@ class ForNode(Node):
             self.nodelist_empty = NodeList()
         else:
             self.nodelist_empty = nodelist_empty
+        self._prefetch_nodes = None
 
     def __repr__(self):
         reversed_text = self.is_reversed and ' reversed' or ''
@@ -128,31 +142,32 @@ class ForNode(Node):
         for node in self.nodelist_empty:
             yield node
 
-    def render(self, context):
-        if 'forloop' in context:
-            parentloop = context['forloop']
-        else:
-            parentloop = {}
-        context.push()
-        try:
-            values = self.sequence.resolve(context, True)
-        except VariableDoesNotExist:
-            values = []
-        if values is None:
-            values = []
-        if not hasattr(values, '__len__'):
-            values = list(values)
-        len_values = len(values)
-        if len_values < 1:
-            context.pop()
-            return self.nodelist_empty.render(context)
-        nodelist = NodeList()
-        if self.is_reversed:
-            values = reversed(values)
+    def get_prefetch_nodes(self):
+        """
+        Returns the nodes of the loop body that support prefetching, leaving
+        out those of nested loops, which prefetch on their own.
+        """
+        if getattr(self, '_prefetch_nodes', None) is None:
+            def find(nodelist):
+                nodes = []
+                for node in nodelist:
+                    if hasattr(node, 'prefetch'):
+                        nodes.append(node)
+                    elif not isinstance(node, ForNode):
+                        for attr in node.child_nodelists:
+                            child = getattr(node, attr, None)
+                            if child:
+                                nodes.extend(find(child))
+                return nodes
+            self._prefetch_nodes = find(self.nodelist_loop)
+        return self._prefetch_nodes
+
+    def iterate(self, context, values, len_values, loop_dict):
+        """
+        Sets the loop variables in the context for each item of values in
+        turn, yielding after each step.
+        """
         unpack = len(self.loopvars) > 1
-        # Create a forloop value in the context.  We'll update counters on each
-        # iteration just below.
-        loop_dict = context['forloop'] = {'parentloop': parentloop}
         for i, item in enumerate(values):
             # Shortcuts for current loop iteration number.
             loop_dict['counter0'] = i
@@ -177,29 +192,118 @@ class ForNode(Node):
                     context.update(unpacked_vars)
             else:
                 context[self.loopvars[0]] = item
+            yield item
+            if pop_context:
+                # The loop variables were pushed on to the context so pop them
+                # off again. This is necessary because the tag lets the length
+                # of loopvars differ to the length of each set of items and we
+                # don't want to leave any vars from the previous loop on the
+                # context.
+                context.pop()
+
+    def resolve_values(self, context):
+        try:
+            values = self.sequence.resolve(context, True)
+        except VariableDoesNotExist:
+            values = []
+        if values is None:
+            values = []
+        if not hasattr(values, '__len__'):
+            values = list(values)
+        return values
+
+    def prepare_values(self, values, prefetch_nodes):
+        """
+        Returns the values in the order of the loop. When nodes of the loop
+        body prefetch, the values are iterated over twice, so they're
+        materialized as a list first.
+        """
+        if prefetch_nodes:
+            values = list(values)
+            if self.is_reversed:
+                values.reverse()
+        elif self.is_reversed:
+            values = reversed(values)
+        return values
+
+    def render(self, context):
+        if 'forloop' in context:
+            parentloop = context['forloop']
+        else:
+            parentloop = {}
+        context.push()
+        values = self.resolve_values(context)
+        len_values = len(values)
+        if len_values < 1:
+            context.pop()
+            return self.nodelist_empty.render(context)
+        nodelist = NodeList()
+        prefetch_nodes = self.get_prefetch_nodes()
+        values = self.prepare_values(values, prefetch_nodes)
+        # Create a forloop value in the context.  We'll update counters on each
+        # iteration just below.
+        loop_dict = context['forloop'] = {'parentloop': parentloop}
+        if prefetch_nodes:
+            for item in self.iterate(context, values, len_values, loop_dict):
+                for node in prefetch_nodes:
+                    node.prefetch(context)
+        profile = context.render_context.profile
+        for item in self.iterate(context, values, len_values, loop_dict):
             # In TEMPLATE_DEBUG mode provide source of the node which
             # actually raised the exception
             if settings.TEMPLATE_DEBUG:
                 for node in self.nodelist_loop:
                     try:
-                        nodelist.append(node.render(context))
+                        if profile is None or isinstance(node, TextNode):
+                            nodelist.append(node.render(context))
+                        else:
+                            # Let the profile record the node.
+                            nodelist.append(profile.call(node, node.render, context))
                     except Exception, e:
                         if not hasattr(e, 'django_template_source'):
                             e.django_template_source = node.source
                         raise
+            elif profile is not None:
+                # Let the nodelist record the nodes.
+                nodelist.append(self.nodelist_loop.render(context))
             else:
                 for node in self.nodelist_loop:
                     nodelist.append(node.render(context))
-            if pop_context:
-                # The loop variables were pushed on to the context so pop them
-                # off again. This is necessary because the tag lets the length
-                # of loopvars differ to the length of each set of items and we
-                # don't want to leave any vars from the previous loop on the
-                # context.
-                context.pop()
+        for node in prefetch_nodes:
+            node.finish_prefetch(context)
         context.pop()
         return nodelist.render(context)
 
+    def stream(self, context):
+        """
+        Yields the output of every iteration of the loop as soon as it's
+        rendered. See render().
+        """
+        if 'forloop' in context:
+            parentloop = context['forloop']
+        else:
+            parentloop = {}
+        context.push()
+        values = self.resolve_values(context)
+        len_values = len(values)
+        if len_values < 1:
+            context.pop()
+            for bit in self.nodelist_empty.stream(context):
+                yield bit
+            return
+        prefetch_nodes = self.get_prefetch_nodes()
+        values = self.prepare_values(values, prefetch_nodes)
+        loop_dict = context['forloop'] = {'parentloop': parentloop}
+        if prefetch_nodes:
+            for item in self.iterate(context, values, len_values, loop_dict):
+                for node in prefetch_nodes:
+                    node.prefetch(context)
+        for item in self.iterate(context, values, len_values, loop_dict):
+            yield self.nodelist_loop.render(context)
+        for node in prefetch_nodes:
+            node.finish_prefetch(context)
+        context.pop()
+
 class IfChangedNode(Node):
     child_nodelists = ('nodelist_true', 'nodelist_false')
 
@@ -266,7 +370,11 @@ class IfNode(Node):
     def nodelist(self):
         return NodeList(node for _, nodelist in self.conditions_nodelists for node in nodelist)
 
-    def render(self, context):
+    def select_nodelist(self, context):
+        """
+        Returns the nodelist of the first clause whose condition is true, or
+        None if there's none.
+        """
         for condition, nodelist in self.conditions_nodelists:
 
             if condition is not None:           # if / elif clause
@@ -278,9 +386,21 @@ class IfNode(Node):
                 match = True
 
             if match:
-                return nodelist.render(context)
+                return nodelist
 
-        return ''
+        return None
+
+    def render(self, context):
+        nodelist = self.select_nodelist(context)
+        if nodelist is None:
+            return ''
+        return nodelist.render(context)
+
+    def stream(self, context):
+        nodelist = self.select_nodelist(context)
+        if nodelist is None:
+            return iter(())
+        return nodelist.stream(context)
 
 class RegroupNode(Node):
     def __init__(self, target, expression, var_name):
@@ -477,6 +597,14 @@ class WithNode(Node):
         context.pop()
         return output
 
+    def stream(self, context):
+        values = dict([(key, val.resolve(context)) for key, val in
+                       self.extra_context.iteritems()])
+        context.update(values)
+        for bit in self.nodelist.stream(context):
+            yield bit
+        context.pop()
+
 @register.tag
 def autoescape(parser, token):
     """
@@ -177,6 +177,28 @@ def render_to_string(template_name, dictionary=None, context_instance=None):
     finally:
         context_instance.pop()
 
+def render_to_iterator(template_name, dictionary=None, context_instance=None):
+    """
+    Like render_to_string(), but returns an iterator yielding the output in
+    chunks as it's rendered, e.g. to be passed to a StreamingHttpResponse.
+    """
+    dictionary = dictionary or {}
+    if isinstance(template_name, (list, tuple)):
+        t = select_template(template_name)
+    else:
+        t = get_template(template_name)
+    if not context_instance:
+        return t.stream(Context(dictionary))
+    return _stream_in_context(t, dictionary, context_instance)
+
+def _stream_in_context(template, dictionary, context_instance):
+    context_instance.update(dictionary)
+    try:
+        for chunk in template.stream(context_instance):
+            yield chunk
+    finally:
+        context_instance.pop()
+
 def select_template(template_name_list):
     "Given a list of template names, returns the first that can be loaded."
     if not template_name_list:
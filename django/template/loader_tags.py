@@ -38,6 +38,21 @@ class BlockContext(object):
         except (IndexError, KeyError):
             return None
 
+def get_template_for_render(context, template_name):
+    """
+    Returns the template named template_name, loading it only the first time
+    it's requested while rendering in context.
+    """
+    templates = context.render_context.templates
+    try:
+        return templates[template_name]
+    except KeyError:
+        template = templates[template_name] = get_template(template_name)
+        return template
+    except TypeError:
+        # The name isn't hashable; let the loaders complain about it.
+        return get_template(template_name)
+
 class BlockNode(Node):
     def __init__(self, name, nodelist, parent=None):
         self.name, self.nodelist, self.parent = name, nodelist, parent
@@ -65,6 +80,26 @@ class BlockNode(Node):
         context.pop()
         return result
 
+    def stream(self, context):
+        block_context = context.render_context.get(BLOCK_CONTEXT_KEY)
+        context.push()
+        if block_context is None:
+            context['block'] = self
+            for bit in self.nodelist.stream(context):
+                yield bit
+        else:
+            push = block = block_context.pop(self.name)
+            if block is None:
+                block = self
+            block = BlockNode(block.name, block.nodelist)
+            block.context = context
+            context['block'] = block
+            for bit in block.nodelist.stream(context):
+                yield bit
+            if push is not None:
+                block_context.push(self.name, push)
+        context.pop()
+
     def super(self):
         render_context = self.context.render_context
         if (BLOCK_CONTEXT_KEY in render_context and
@@ -95,9 +130,14 @@ class ExtendsNode(Node):
             raise TemplateSyntaxError(error_msg)
         if hasattr(parent, 'render'):
             return parent # parent is a Template object
-        return get_template(parent)
-
-    def render(self, context):
+        return get_template_for_render(context, parent)
+
+    def prepare_parent(self, context):
+        """
+        Returns the parent template, after adding the blocks of this template
+        and, if the parent is the root template, its blocks to the block
+        context.
+        """
         compiled_parent = self.get_parent(context)
 
         if BLOCK_CONTEXT_KEY not in context.render_context:
@@ -118,9 +158,15 @@ class ExtendsNode(Node):
                     block_context.add_blocks(blocks)
                 break
 
+        return compiled_parent
+
+    def render(self, context):
         # Call Template._render explicitly so the parser context stays
         # the same.
-        return compiled_parent._render(context)
+        return self.prepare_parent(context)._render(context)
+
+    def stream(self, context):
+        return self.prepare_parent(context)._stream(context)
 
 class BaseIncludeNode(Node):
     def __init__(self, *args, **kwargs):
@@ -138,6 +184,18 @@ class BaseIncludeNode(Node):
         context.pop()
         return output
 
+    def stream_template(self, template, context):
+        values = dict([(name, var.resolve(context)) for name, var
+                       in self.extra_context.iteritems()])
+        if self.isolated_context:
+            context = context.new(values)
+        else:
+            context.update(values)
+        for bit in template.stream(context, buffer_size=0):
+            yield bit
+        if not self.isolated_context:
+            context.pop()
+
 class ConstantIncludeNode(BaseIncludeNode):
     def __init__(self, template_path, *args, **kwargs):
         super(ConstantIncludeNode, self).__init__(*args, **kwargs)
@@ -154,6 +212,11 @@ class ConstantIncludeNode(BaseIncludeNode):
             return ''
         return self.render_template(self.template, context)
 
+    def stream(self, context):
+        if not self.template:
+            return iter(())
+        return self.stream_template(self.template, context)
+
 class IncludeNode(BaseIncludeNode):
     def __init__(self, template_name, *args, **kwargs):
         super(IncludeNode, self).__init__(*args, **kwargs)
@@ -162,13 +225,25 @@ class IncludeNode(BaseIncludeNode):
     def render(self, context):
         try:
             template_name = self.template_name.resolve(context)
-            template = get_template(template_name)
+            template = get_template_for_render(context, template_name)
             return self.render_template(template, context)
         except:
             if settings.TEMPLATE_DEBUG:
                 raise
             return ''
 
+    def stream(self, context):
+        # Like render(), errors only cut the output of the included template
+        # short, unless TEMPLATE_DEBUG is True.
+        try:
+            template_name = self.template_name.resolve(context)
+            template = get_template_for_render(context, template_name)
+            for bit in self.stream_template(template, context):
+                yield bit
+        except:
+            if settings.TEMPLATE_DEBUG:
+                raise
+
 @register.tag('block')
 def do_block(parser, token):
     """
@@ -1,9 +1,19 @@
 """
 Wrapper class that takes a list of template loaders as an argument and attempts
 to load templates from them in order, caching the result.
+
+If the TEMPLATE_CACHE_CHECK_INTERVAL setting isn't None, the source files of
+the cached templates are checked for changes at most once per that number of
+seconds. Changed templates are loaded again, along with the templates that
+loaded them while being parsed, e.g. through a constant {% include %}.
 """
 
 import hashlib
+import os
+import threading
+import time
+
+from django.conf import settings
 from django.template.base import TemplateDoesNotExist
 from django.template.loader import BaseLoader, get_template_from_string, find_template_loader, make_origin
 
@@ -14,6 +24,13 @@ class Loader(BaseLoader):
         self.template_cache = {}
         self._loaders = loaders
         self._cached_loaders = []
+        # Map the keys of cached templates to the path of their source file
+        # and its modification time and size, and to the keys of the
+        # templates loaded while parsing them.
+        self.source_stats = {}
+        self.dependencies = {}
+        self.last_check = time.time()
+        self._local = threading.local()
 
     @property
     def loaders(self):
@@ -27,35 +44,122 @@ class Loader(BaseLoader):
             self._cached_loaders = cached_loaders
         return self._cached_loaders
 
-    def find_template(self, name, dirs=None):
+    def get_source_loader(self, loader):
+        """
+        Returns the function loading the source of templates from loader.
+        Loaders which override load_template(), e.g. to return templates of
+        another engine, are called as usual: they return Templates.
+        """
+        load_template = getattr(type(loader), 'load_template', None)
+        if getattr(load_template, 'im_func', None) is BaseLoader.load_template.im_func:
+            return loader.load_template_source
+        return loader
+
+    def find_template_source(self, name, dirs=None):
+        """
+        Returns the source of the template, its display name and the function
+        that loaded it, rather than the Template the loaders would parse,
+        unless they override load_template().
+        """
         for loader in self.loaders:
+            load_template_source = self.get_source_loader(loader)
             try:
-                template, display_name = loader(name, dirs)
-                return (template, make_origin(display_name, loader, name, dirs))
+                source, display_name = load_template_source(name, dirs)
             except TemplateDoesNotExist:
-                pass
+                continue
+            return source, display_name, load_template_source
         raise TemplateDoesNotExist(name)
 
+    def find_template(self, name, dirs=None):
+        source, display_name, load_template_source = self.find_template_source(name, dirs)
+        return source, make_origin(display_name, load_template_source, name, dirs)
+
     def load_template(self, template_name, template_dirs=None):
         key = template_name
         if template_dirs:
             # If template directories were specified, use a hash to differentiate
             key = '-'.join([template_name, hashlib.sha1('|'.join(template_dirs)).hexdigest()])
 
+        check_interval = settings.TEMPLATE_CACHE_CHECK_INTERVAL
+        if check_interval is not None and time.time() >= self.last_check + check_interval:
+            self.check_sources()
+
+        parsing = self.parsing
+        if parsing:
+            # Another template is loading this one while being parsed.
+            parsing[-1].add(key)
+
         if key not in self.template_cache:
-            template, origin = self.find_template(template_name, template_dirs)
+            template, display_name, load_template_source = self.find_template_source(
+                template_name, template_dirs)
+            origin = make_origin(display_name, load_template_source, template_name, template_dirs)
+            dependencies = set()
             if not hasattr(template, 'render'):
+                parsing.append(dependencies)
                 try:
-                    template = get_template_from_string(template, origin, template_name)
+                    template = self.make_template(template, origin, template_name)
                 except TemplateDoesNotExist:
                     # If compiling the template we found raises TemplateDoesNotExist,
                     # back off to returning the source and display name for the template
                     # we were asked to load. This allows for correct identification (later)
                     # of the actual template that does not exist.
                     return template, origin
+                finally:
+                    parsing.pop()
+            if check_interval is not None:
+                self.source_stats[key] = (display_name, self.get_source_stat(display_name))
+                self.dependencies[key] = dependencies
             self.template_cache[key] = template
         return self.template_cache[key], None
 
+    @property
+    def parsing(self):
+        """
+        The stack of the sets of dependencies of the templates being parsed
+        in this thread.
+        """
+        try:
+            return self._local.parsing
+        except AttributeError:
+            self._local.parsing = []
+            return self._local.parsing
+
+    def get_source_stat(self, path):
+        """
+        Returns the modification time and size of the file at path, or None if
+        it isn't a file, e.g. because the template was loaded from an egg.
+        """
+        try:
+            stat = os.stat(path)
+        except (OSError, TypeError, ValueError):
+            return None
+        return stat.st_mtime, stat.st_size
+
+    def check_sources(self):
+        """
+        Removes the templates whose source file changed from the cache, along
+        with the templates that depend on them.
+        """
+        self.last_check = time.time()
+        stale = []
+        for key, (path, stat) in self.source_stats.items():
+            if stat is not None and self.get_source_stat(path) != stat:
+                stale.append(key)
+        while stale:
+            key = stale.pop()
+            self.template_cache.pop(key, None)
+            self.source_stats.pop(key, None)
+            self.dependencies.pop(key, None)
+            for other, dependencies in self.dependencies.items():
+                if key in dependencies:
+                    stale.append(other)
+
+    def make_template(self, source, origin, template_name):
+        "Returns a Template object parsed from source."
+        return get_template_from_string(source, origin, template_name)
+
     def reset(self):
         "Empty the template cache."
         self.template_cache.clear()
+        self.source_stats.clear()
+        self.dependencies.clear()
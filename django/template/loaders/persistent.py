@@ -0,0 +1,157 @@
+"""
+Wrapper class that takes a list of template loaders as an argument, like the
+cached loader, and also stores the parsed templates in the directory named by
+the TEMPLATE_CACHE_DIR setting, so that other processes don't parse them again.
+
+Cached templates are keyed by a hash of their name, their source and the
+version of Django, so a changed template is parsed again. They're stored with
+a hash of the source of each template loaded while parsing them, e.g. through
+a constant {% include %}, since the parsed template contains them: if one of
+them changed, the template is parsed again too. The ``precompiletemplates``
+management command fills the directory in advance.
+"""
+
+import hashlib
+import os
+import tempfile
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+import django
+from django.conf import settings
+from django.template.base import TemplateDoesNotExist
+from django.template.loaders import cached
+from django.utils.encoding import smart_str
+
+# Bump this when the structure of parsed templates changes.
+CACHE_FORMAT = 2
+
+CACHE_VERSION = '%d:%s' % (CACHE_FORMAT, django.get_version())
+
+
+class Loader(cached.Loader):
+    def __init__(self, loaders):
+        super(Loader, self).__init__(loaders)
+        # Map the names of the templates this loader parsed or read to the
+        # names of the templates loaded, directly or not, while parsing them.
+        self.template_dependencies = {}
+
+    @property
+    def loading(self):
+        """
+        The stack of the sets of the names of the templates loaded while
+        parsing templates in this thread.
+        """
+        try:
+            return self._local.loading
+        except AttributeError:
+            self._local.loading = []
+            return self._local.loading
+
+    def load_template(self, template_name, template_dirs=None):
+        result = super(Loader, self).load_template(template_name, template_dirs)
+        loading = self.loading
+        if loading:
+            loading[-1].add(template_name)
+            loading[-1].update(self.template_dependencies.get(template_name, ()))
+        return result
+
+    def get_source_hash(self, template_name):
+        """
+        Returns a hash of the source of the template, or None if it doesn't
+        exist or its loader returns a Template rather than its source.
+        """
+        try:
+            source = self.find_template_source(template_name)[0]
+        except TemplateDoesNotExist:
+            return None
+        if hasattr(source, 'render'):
+            return None
+        return hashlib.sha1(smart_str(source)).hexdigest()
+
+    def get_cache_path(self, source, template_name):
+        """
+        Returns the path of the file storing the template parsed from source.
+        """
+        key = hashlib.sha1('|'.join([CACHE_VERSION, smart_str(template_name),
+                                     smart_str(source)])).hexdigest()
+        return os.path.join(settings.TEMPLATE_CACHE_DIR, key[:2], key + '.pickle')
+
+    def make_template(self, source, origin, template_name):
+        # In debug mode, nodes keep a reference to the loader they come from.
+        if not settings.TEMPLATE_CACHE_DIR or settings.TEMPLATE_DEBUG:
+            return super(Loader, self).make_template(source, origin, template_name)
+        path = self.get_cache_path(source, template_name)
+        stored = self.read(path)
+        if stored is None:
+            self.loading.append(set())
+            try:
+                template = super(Loader, self).make_template(source, origin, template_name)
+            finally:
+                dependencies = self.loading.pop()
+            self.write(path, (dict([(name, self.get_source_hash(name))
+                                    for name in dependencies]), template))
+        else:
+            dependencies, template = stored
+            if settings.TEMPLATE_COMPILE:
+                from django.template.compiler import compile_template
+                compile_template(template)
+        self.template_dependencies[template_name] = dependencies
+        return template
+
+    def read(self, path):
+        """
+        Returns the names of the templates loaded while parsing the template
+        stored in path and the template, or None if there's none or one of
+        these templates changed since.
+        """
+        try:
+            f = open(path, 'rb')
+        except IOError:
+            return None
+        try:
+            try:
+                source_hashes, template = pickle.load(f)
+            except Exception:
+                # The file may be truncated or refer to code that has
+                # changed since; it's overwritten by write().
+                return None
+        finally:
+            f.close()
+        for name, source_hash in source_hashes.items():
+            if self.get_source_hash(name) != source_hash:
+                return None
+        return set(source_hashes), template
+
+    def write(self, path, data):
+        """
+        Stores data, the hashes of the sources of the templates loaded while
+        parsing a template and the template, in path, unless it can't be
+        pickled, e.g. because it contains a node class defined in a function.
+        """
+        try:
+            data = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return False
+        dirname = os.path.dirname(path)
+        try:
+            if not os.path.exists(dirname):
+                os.makedirs(dirname)
+            # Write to a temporary file first, so that other processes never
+            # read an incomplete file.
+            fd, tmp_path = tempfile.mkstemp(dir=dirname)
+            try:
+                f = os.fdopen(fd, 'wb')
+                try:
+                    f.write(data)
+                finally:
+                    f.close()
+                os.rename(tmp_path, path)
+            except:
+                os.remove(tmp_path)
+                raise
+        except (IOError, OSError):
+            return False
+        return True
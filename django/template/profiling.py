@@ -0,0 +1,224 @@
+"""
+Profiling of template rendering, node by node.
+
+When the TEMPLATE_PROFILING setting is True, rendering a template with
+Template.render() or Template.stream() records, for every template, block
+and tag rendered in the process, including those of extended and included
+templates, how many times it was rendered, the time it took and the number
+of database queries it made.
+Queries are only counted when the database connections record them, i.e.
+when DEBUG is True.
+
+The records are sent, as a RenderProfile, with the template_profiled signal
+once the outermost template is rendered. RenderProfile.folded() formats them
+as "folded stacks", the input of flame graph tools like FlameGraph's
+flamegraph.pl. Tags are labelled with their source and line number when
+TEMPLATE_DEBUG is True, and with their class name otherwise.
+"""
+import re
+import time
+
+from django.db import connections
+from django.dispatch import Signal
+from django.template.base import Template, VariableNode
+from django.utils.datastructures import SortedDict
+from django.utils.encoding import smart_str
+
+template_profiled = Signal(providing_args=["template", "context", "profile"])
+
+whitespace_re = re.compile(r'\s+')
+
+
+class Frame(object):
+    """
+    The records of a template or node, rendered from the same parent frame.
+    """
+    def __init__(self, key):
+        self.key = key
+        self.calls = 0
+        self.time = 0.0
+        self.queries = 0
+        self.children = SortedDict()
+
+    def __repr__(self):
+        return '<Frame: %r, %d calls, %.6fs, %d queries>' % (
+            self.key, self.calls, self.time, self.queries)
+
+    @property
+    def own_time(self):
+        "Time spent in this frame but not in its children."
+        return max(self.time - sum([c.time for c in self.children.values()]), 0.0)
+
+    @property
+    def own_queries(self):
+        "Queries made in this frame but not in its children."
+        return self.queries - sum([c.queries for c in self.children.values()])
+
+
+class RenderProfile(object):
+    """
+    The records of the rendering of a template.
+
+    'root' is a Frame without key whose only child is the frame of the
+    template; the frames of the nodes of a template are the children of its
+    frame, and so on.
+    """
+    def __init__(self, template):
+        self.template = template
+        self.root = Frame(None)
+        self.stack = [self.root]
+        self.sources = {}
+
+    def count_queries(self):
+        return sum([len(connection.queries) for connection in connections.all()])
+
+    def call(self, key, func, *args):
+        """
+        Calls func(*args) and adds its duration and the queries it made to
+        the frame of key, in the current frame.
+        """
+        parent = self.stack[-1]
+        frame = parent.children.get(key)
+        if frame is None:
+            frame = parent.children[key] = Frame(key)
+        self.stack.append(frame)
+        queries = self.count_queries()
+        start = time.time()
+        try:
+            return func(*args)
+        finally:
+            frame.time += time.time() - start
+            frame.queries += self.count_queries() - queries
+            frame.calls += 1
+            self.stack.pop()
+
+    def call_iter(self, key, func, *args):
+        """
+        Like call(), for a func returning an iterator, which is consumed:
+        the time spent and the queries made producing each of its items are
+        added to the frame of key, in the current frame. The items are
+        yielded as they're produced.
+        """
+        parent = self.stack[-1]
+        frame = parent.children.get(key)
+        if frame is None:
+            frame = parent.children[key] = Frame(key)
+        iterator = None
+        try:
+            while True:
+                self.stack.append(frame)
+                queries = self.count_queries()
+                start = time.time()
+                try:
+                    if iterator is None:
+                        iterator = iter(func(*args))
+                    item = iterator.next()
+                except StopIteration:
+                    return
+                finally:
+                    frame.time += time.time() - start
+                    frame.queries += self.count_queries() - queries
+                    self.stack.pop()
+                yield item
+        finally:
+            frame.calls += 1
+
+    @property
+    def time(self):
+        "Total rendering time."
+        return sum([c.time for c in self.root.children.values()])
+
+    def label(self, key):
+        """
+        Returns a one-line description of the template or node key.
+        """
+        source = getattr(key, 'source', None)
+        if source is not None:
+            origin, (start, end) = source
+            if origin not in self.sources:
+                try:
+                    self.sources[origin] = origin.reload()
+                except Exception:
+                    self.sources[origin] = None
+            template_string = self.sources[origin]
+            if template_string is not None:
+                return '%s:%d %s' % (origin.name,
+                                     template_string.count('\n', 0, start) + 1,
+                                     template_string[start:end])
+        if isinstance(key, Template):
+            return key.name
+        if isinstance(key, VariableNode):
+            return '{{ %s }}' % key.filter_expression.token
+        name = getattr(key, 'name', None)
+        if isinstance(name, basestring):
+            # E.g. a BlockNode.
+            return '%s %s' % (key.__class__.__name__, name)
+        return key.__class__.__name__
+
+    def stacks(self, value='time'):
+        """
+        Yields the labels of the frames from the template down to each frame,
+        with the own time or queries of the frame.
+        """
+        def walk(frame, labels):
+            for child in frame.children.values():
+                child_labels = labels + [self.label(child.key)]
+                if value == 'queries':
+                    yield child_labels, child.own_queries
+                else:
+                    yield child_labels, child.own_time
+                for stack in walk(child, child_labels):
+                    yield stack
+        return walk(self.root, [])
+
+    def folded(self, value='time'):
+        """
+        Returns the records as folded stacks: a line per frame with the labels
+        from the template down to it, separated by semicolons, followed by its
+        own time in microseconds or, if value is 'queries', its own number of
+        queries. Frames with nothing to report are left out.
+        """
+        lines = []
+        for labels, amount in self.stacks(value):
+            if value != 'queries':
+                amount = int(round(amount * 1000000))
+            if amount <= 0:
+                continue
+            labels = [whitespace_re.sub(' ', smart_str(label)).replace(';', ',').strip()
+                      for label in labels]
+            lines.append('%s %d' % (';'.join(labels), amount))
+        return '\n'.join(lines) + '\n' if lines else ''
+
+
+def profile_render(template, context):
+    """
+    Renders template in context, recording a RenderProfile sent with the
+    template_profiled signal.
+    """
+    profile = RenderProfile(template)
+    render_context = context.render_context
+    render_context.profile = profile
+    try:
+        output = template.render(context)
+    finally:
+        render_context.profile = None
+    template_profiled.send(sender=template, template=template,
+                           context=context, profile=profile)
+    return output
+
+
+def profile_stream(template, context, buffer_size):
+    """
+    Like profile_render(), for Template.stream(). The profile is sent once
+    the output is consumed entirely.
+    """
+    profile = RenderProfile(template)
+    render_context = context.render_context
+    render_context.profile = profile
+    try:
+        for chunk in template.stream(context, buffer_size):
+            yield chunk
+    finally:
+        render_context.profile = None
+    template_profiled.send(sender=template, template=template,
+                           context=context, profile=profile)
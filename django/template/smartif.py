@@ -62,6 +62,9 @@ def infix(bp, func):
                 # %} where 'bar' does not support 'in', so default to False
                 return False
 
+        def __reduce__(self):
+            return (_operator, (self.id,), self.__dict__)
+
     return Operator
 
 
@@ -84,9 +87,19 @@ def prefix(bp, func):
             except Exception:
                 return False
 
+        def __reduce__(self):
+            return (_operator, (self.id,), self.__dict__)
+
     return Operator
 
 
+def _operator(id):
+    """
+    Creates an operator node from its id, when unpickling a parsed template.
+    """
+    return OPERATORS[id]()
+
+
 # Operator precedence follows Python.
 # NB - we can get slightly more accurate syntax error messages by not using the
 # same object for '==' and '='.
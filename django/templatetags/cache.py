@@ -1,17 +1,93 @@
 import hashlib
+import time
 from django.template import Library, Node, TemplateSyntaxError, Variable, VariableDoesNotExist
 from django.template import resolve_variable
-from django.core.cache import cache
+from django.core.cache import cache, get_cache
+from django.core.cache.backends.base import RefreshableValue
 from django.utils.http import urlquote
 
 register = Library()
 
+# Key of the cache instances, by alias, used by {% cache ... using="alias" %}
+# in the render context.
+CACHES_CONTEXT_KEY = 'cache_tag_caches'
+
+class FragmentBatch(object):
+    """
+    Fragments of a CacheNode rendered in a {% for %} loop. They are fetched
+    from the cache with a single get_many() and missing fragments are stored
+    with a single set_many() per timeout.
+    """
+    def __init__(self, cache):
+        self.cache = cache
+        self.keys = set()
+        self.pending = {}
+        self._entries = None
+
+    def get(self, key):
+        if self._entries is None:
+            self._entries = self.cache.get_many(list(self.keys))
+        return self._entries.get(key)
+
+    def add(self, key, value, timeout, delta):
+        now = time.time()
+        entry = RefreshableValue(value, now + timeout, delta)
+        self.pending.setdefault(timeout, {})[key] = entry
+        # Later iterations rendering the same fragment reuse it.
+        self._entries[key] = entry
+
+    def flush(self):
+        for timeout, data in self.pending.items():
+            self.cache.set_many(data, timeout)
+        self.pending = {}
+
 class CacheNode(Node):
-    def __init__(self, nodelist, expire_time_var, fragment_name, vary_on):
+    def __init__(self, nodelist, expire_time_var, fragment_name, vary_on, cache_name=None):
         self.nodelist = nodelist
         self.expire_time_var = Variable(expire_time_var)
         self.fragment_name = fragment_name
         self.vary_on = vary_on
+        self.cache_name = cache_name
+
+    def get_cache(self, context):
+        if self.cache_name is None:
+            return cache
+        try:
+            cache_name = self.cache_name.resolve(context)
+        except VariableDoesNotExist:
+            raise TemplateSyntaxError('"cache" tag got an unknown variable: %r' % self.cache_name.token)
+        caches = context.render_context.get(CACHES_CONTEXT_KEY)
+        if caches is None:
+            caches = context.render_context[CACHES_CONTEXT_KEY] = {}
+        if cache_name not in caches:
+            caches[cache_name] = get_cache(cache_name)
+        return caches[cache_name]
+
+    def get_cache_key(self, context):
+        # Build a unicode key for this fragment and all vary-on's.
+        args = hashlib.md5(u':'.join([urlquote(resolve_variable(var, context)) for var in self.vary_on]))
+        return 'template.cache.%s.%s' % (self.fragment_name, args.hexdigest())
+
+    def prefetch(self, context):
+        """
+        Records the key of the fragment for the current iteration of the
+        enclosing {% for %} loop, so that all of them are fetched at once.
+        """
+        try:
+            key = self.get_cache_key(context)
+            batch = context.render_context.get(self)
+            if batch is None:
+                batch = context.render_context[self] = FragmentBatch(self.get_cache(context))
+        except Exception:
+            # The error, if any, will be raised when rendering.
+            return
+        batch.keys.add(key)
+
+    def finish_prefetch(self, context):
+        batch = context.render_context.get(self)
+        if batch is not None:
+            batch.flush()
+            del context.render_context[self]
 
     def render(self, context):
         try:
@@ -22,14 +98,21 @@ class CacheNode(Node):
             expire_time = int(expire_time)
         except (ValueError, TypeError):
             raise TemplateSyntaxError('"cache" tag got a non-integer timeout value: %r' % expire_time)
-        # Build a unicode key for this fragment and all vary-on's.
-        args = hashlib.md5(u':'.join([urlquote(resolve_variable(var, context)) for var in self.vary_on]))
-        cache_key = 'template.cache.%s.%s' % (self.fragment_name, args.hexdigest())
-        value = cache.get(cache_key)
-        if value is None:
-            value = self.nodelist.render(context)
-            cache.set(cache_key, value, expire_time)
-        return value
+        cache_key = self.get_cache_key(context)
+        batch = context.render_context.get(self)
+        if batch is not None and cache_key in batch.keys:
+            entry = batch.get(cache_key)
+            if isinstance(entry, RefreshableValue) and not entry.needs_refresh():
+                return entry.value
+            if entry is None:
+                start = time.time()
+                value = self.nodelist.render(context)
+                batch.add(cache_key, value, expire_time, time.time() - start)
+                return value
+            # Stale values are refreshed one at a time, under a lock.
+        return self.get_cache(context).get_or_set(cache_key,
+                                                  lambda: self.nodelist.render(context),
+                                                  expire_time)
 
 @register.tag('cache')
 def do_cache(parser, token):
@@ -52,10 +135,22 @@ def do_cache(parser, token):
         {% endcache %}
 
     Each unique set of arguments will result in a unique cache entry.
+
+    By default the fragment is stored in the default cache. Another cache
+    can be selected with a final ``using`` argument::
+
+        {% cache [expire_time] [fragment_name] [var1] .. using="localcache" %}
+
+    Fragments cached inside a {% for %} loop are fetched from the cache
+    together, in a single round trip.
     """
     nodelist = parser.parse(('endcache',))
     parser.delete_first_token()
     tokens = token.contents.split()
     if len(tokens) < 3:
         raise TemplateSyntaxError(u"'%r' tag requires at least 2 arguments." % tokens[0])
-    return CacheNode(nodelist, tokens[1], tokens[2], tokens[3:])
+    cache_name = None
+    if len(tokens) > 3 and tokens[-1].startswith('using='):
+        cache_name = parser.compile_filter(tokens[-1][len('using='):])
+        tokens = tokens[:-1]
+    return CacheNode(nodelist, tokens[1], tokens[2], tokens[3:], cache_name)
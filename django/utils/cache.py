@@ -24,7 +24,7 @@ import time
 from django.conf import settings
 from django.core.cache import get_cache
 from django.utils.encoding import smart_str, iri_to_uri, force_unicode
-from django.utils.http import http_date
+from django.utils.http import http_date, parse_http_date_safe
 from django.utils.timezone import get_current_timezone_name
 from django.utils.translation import get_language
 
@@ -111,7 +111,8 @@ def patch_response_headers(response, cache_timeout=None):
         cache_timeout = settings.CACHE_MIDDLEWARE_SECONDS
     if cache_timeout < 0:
         cache_timeout = 0 # Can't have max-age negative
-    if settings.USE_ETAGS and not response.has_header('ETag'):
+    if (settings.USE_ETAGS and not response.has_header('ETag') and
+            not response.streaming):
         if hasattr(response, 'render') and callable(response.render):
             response.add_post_render_callback(_set_response_etag)
         else:
@@ -122,6 +123,26 @@ def patch_response_headers(response, cache_timeout=None):
         response['Expires'] = http_date(time.time() + cache_timeout)
     patch_cache_control(response, max_age=cache_timeout)
 
+def is_not_modified(request, etag=None, last_modified=None):
+    """
+    Returns True if the conditional GET request can be answered with a 304
+    Not Modified response for a resource with the given ETag and
+    Last-Modified header values (either of which may be None).
+    """
+    if etag is not None:
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match == etag:
+            return True
+    if last_modified is not None:
+        if_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE')
+        if if_modified_since is not None:
+            if_modified_since = parse_http_date_safe(if_modified_since)
+        if if_modified_since is not None:
+            last_modified = parse_http_date_safe(last_modified)
+            if last_modified is not None and last_modified <= if_modified_since:
+                return True
+    return False
+
 def add_never_cache_headers(response):
     """
     Adds headers to a response to indicate that a page should never be cached.
@@ -20,19 +20,38 @@ from django.utils.dates import MONTHS, MONTHS_3, MONTHS_ALT, MONTHS_AP, WEEKDAYS
 from django.utils.tzinfo import LocalTimezone
 from django.utils.translation import ugettext as _
 from django.utils.encoding import force_unicode
+from django.utils.functional import cached_property, lru_cache
 from django.utils.timezone import is_aware, is_naive
 
 re_formatchars = re.compile(r'(?<!\\)([aAbBcdDeEfFgGhHiIjlLmMnNoOPrsStTUuwWyYzZ])')
 re_escaped = re.compile(r'\\(.)')
 
+@lru_cache(maxsize=500)
+def compile_format(formatstr):
+    """
+    Parses a format string into a tuple of (is_format_char, piece) pairs,
+    where piece is either a format character, naming the Formatter method
+    that formats it, or literal text.
+
+    The parsing doesn't depend on the language, so the most recently used
+    format strings are kept parsed whatever the active language.
+    """
+    pieces = []
+    for i, piece in enumerate(re_formatchars.split(formatstr)):
+        if i % 2:
+            pieces.append((True, piece))
+        elif piece:
+            pieces.append((False, re_escaped.sub(r'\1', piece)))
+    return tuple(pieces)
+
 class Formatter(object):
     def format(self, formatstr):
         pieces = []
-        for i, piece in enumerate(re_formatchars.split(force_unicode(formatstr))):
-            if i % 2:
+        for is_format_char, piece in compile_format(force_unicode(formatstr)):
+            if is_format_char:
                 pieces.append(force_unicode(getattr(self, piece)()))
-            elif piece:
-                pieces.append(re_escaped.sub(r'\1', piece))
+            else:
+                pieces.append(piece)
         return u''.join(pieces)
 
 class TimeFormat(Formatter):
@@ -118,12 +137,16 @@ class DateFormat(TimeFormat):
     def __init__(self, dt):
         # Accepts either a datetime or date object.
         self.data = dt
-        self.timezone = None
-        if isinstance(dt, datetime.datetime):
-            if is_naive(dt):
-                self.timezone = LocalTimezone(dt)
-            else:
-                self.timezone = dt.tzinfo
+
+    @cached_property
+    def timezone(self):
+        # Creating a LocalTimezone is costly, and only a few format
+        # characters need it.
+        if isinstance(self.data, datetime.datetime):
+            if is_naive(self.data):
+                return LocalTimezone(self.data)
+            return self.data.tzinfo
+        return None
 
     def b(self):
         "Month, textual, 3 letters, lowercase; e.g. 'jan'"
@@ -1,5 +1,6 @@
 import copy
 import operator
+import threading
 from functools import wraps, update_wrapper
 
 
@@ -29,6 +30,56 @@ def memoize(func, cache, num_args):
         return result
     return wrapper
 
+def lru_cache(maxsize=100):
+    """
+    Decorator storing the results of a function for the maxsize argument
+    tuples it was most recently called with. The arguments must be
+    positional and usable as dictionary keys.
+
+    The decorated function's cache_clear() method empties the cache.
+    """
+    def decorator(func):
+        cache = {}
+        lock = threading.Lock()
+        # The cached results are the links of a circular doubly linked list,
+        # [previous, next, key, result], from the least recently used one
+        # (after root) to the most recently used one (before root).
+        root = []
+        root[:] = [root, root, None, None]
+
+        @wraps(func)
+        def wrapper(*args):
+            with lock:
+                link = cache.get(args)
+                if link is not None:
+                    previous, next, key, result = link
+                    previous[1] = next
+                    next[0] = previous
+                    last = root[0]
+                    last[1] = root[0] = link
+                    link[0] = last
+                    link[1] = root
+                    return result
+            result = func(*args)
+            with lock:
+                if args not in cache:
+                    if len(cache) >= maxsize:
+                        oldest = root[1]
+                        root[1] = oldest[1]
+                        oldest[1][0] = root
+                        del cache[oldest[2]]
+                    last = root[0]
+                    last[1] = root[0] = cache[args] = [last, root, args, result]
+            return result
+
+        def cache_clear():
+            with lock:
+                cache.clear()
+                root[:] = [root, root, None, None]
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
+
 class cached_property(object):
     """
     Decorator that creates converts a method with a single
@@ -169,11 +220,15 @@ def allow_lazy(func, *resultclasses):
     """
     @wraps(func)
     def wrapper(*args, **kwargs):
-        for arg in list(args) + kwargs.values():
+        for arg in args:
             if isinstance(arg, Promise):
                 break
         else:
-            return func(*args, **kwargs)
+            for arg in kwargs.itervalues():
+                if isinstance(arg, Promise):
+                    break
+            else:
+                return func(*args, **kwargs)
         return lazy(func, *resultclasses)(*args, **kwargs)
     return wrapper
 
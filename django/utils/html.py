@@ -33,7 +33,12 @@ def escape(html):
     """
     Returns the given HTML with ampersands, quotes and angle brackets encoded.
     """
-    return mark_safe(force_unicode(html).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;').replace("'", '&#39;'))
+    html = force_unicode(html)
+    # Most strings have nothing to escape; checking for each character is
+    # cheaper than building copies of the string.
+    if '&' in html or '<' in html or '>' in html or '"' in html or "'" in html:
+        html = html.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;').replace("'", '&#39;')
+    return mark_safe(html)
 escape = allow_lazy(escape, unicode)
 
 _base_js_escapes = (
@@ -1,10 +1,12 @@
 """
-Functions for reversing a regular expression (used in reverse URL resolving).
-Used internally by Django and not intended for external use.
+Functions for reversing a regular expression (used in reverse URL resolving)
+and for finding the literal prefix of a regular expression (used in forward
+URL resolving). Used internally by Django and not intended for external use.
 
 This is not, and is not intended to be, a complete reg-exp decompiler. It
 should be good enough for a large class of URLS, however.
 """
+import re
 
 # Mapping of an escape character to a representative of that class. So, e.g.,
 # "\w" is replaced by "x" in a reverse URL. A value of None means to ignore
@@ -22,6 +24,9 @@ ESCAPE_MAPPINGS = {
     "Z": None,
 }
 
+# Inline flags apply to the whole regular expression, wherever they appear.
+flags_re = re.compile(r'\(\?[iLmsux]+\)')
+
 class Choice(list):
     """
     Used to represent multiple possibilities at this point in a pattern string.
@@ -336,3 +341,72 @@ def flatten_result(source):
             result[i] += piece
     return result, result_args
 
+
+def literal_prefix(pattern):
+    """
+    Returns the text that any string matched by re.search() with the given
+    reg-exp pattern must start with, e.g. u'articles/' for
+    '^articles/(\d+)/$'. This is u'' for patterns that aren't anchored with
+    '^', that use inline flags or a top-level disjunction ('|').
+
+    It errs on the side of a shorter prefix: it stops at the first character
+    that isn't a plain ASCII literal, such as an escaped character class, a
+    group or a character that a quantifier makes optional.
+    """
+    if (not pattern.startswith('^') or flags_re.search(pattern)
+            or has_top_level_disjunction(pattern)):
+        return u''
+    prefix = []
+    i, end = 1, len(pattern)
+    while i < end:
+        ch = pattern[i]
+        if ch == '\\':
+            i += 1
+            if i == end:
+                break
+            ch = pattern[i]
+            if ord(ch) > 127 or ch.isalnum():
+                # A class (e.g. "\d"), an anchor or a back-reference.
+                break
+        elif ch in '.^$*+?{}[]|()':
+            break
+        if ord(ch) > 127:
+            break
+        i += 1
+        if i < end and pattern[i] in '*?{':
+            break
+        prefix.append(ch)
+        if i < end and pattern[i] == '+':
+            break
+    return u''.join(prefix)
+
+def has_top_level_disjunction(pattern):
+    """
+    Returns True if the pattern contains a '|' that isn't escaped, nor inside
+    a group or a character class.
+    """
+    nesting = 0
+    in_class = False
+    i, end = 0, len(pattern)
+    while i < end:
+        ch = pattern[i]
+        if ch == '\\':
+            i += 1
+        elif in_class:
+            if ch == ']':
+                in_class = False
+        elif ch == '[':
+            in_class = True
+            # A ']' at the start of a class is a member of the class.
+            if pattern[i + 1:i + 2] == '^':
+                i += 1
+            if pattern[i + 1:i + 2] == ']':
+                i += 1
+        elif ch == '(':
+            nesting += 1
+        elif ch == ')':
+            nesting -= 1
+        elif ch == '|' and not nesting:
+            return True
+        i += 1
+    return False
@@ -284,6 +284,45 @@ def compress_string(s):
     zfile.close()
     return zbuf.getvalue()
 
+class StreamingBuffer(object):
+    """
+    A file-like object that only keeps what was written to it since it was
+    last read.
+    """
+    def __init__(self):
+        self.vals = []
+
+    def write(self, val):
+        self.vals.append(val)
+
+    def read(self):
+        ret = ''.join(self.vals)
+        self.vals = []
+        return ret
+
+    def flush(self):
+        return
+
+    def close(self):
+        return
+
+def compress_sequence(sequence):
+    """
+    Like compress_string(), but for an iterable of bytestrings: yields the
+    gzipped content as the strings are produced, keeping only what the
+    compressor buffers in memory. Empty strings are never yielded.
+    """
+    buf = StreamingBuffer()
+    zfile = GzipFile(mode='wb', compresslevel=6, fileobj=buf)
+    # The gzip header is written when the GzipFile is created.
+    for item in sequence:
+        zfile.write(item)
+        data = buf.read()
+        if data:
+            yield data
+    zfile.close()
+    yield buf.read()
+
 ustring_re = re.compile(u"([\u0080-\uffff])")
 
 def javascript_quote(s, quote_double_quotes=False):
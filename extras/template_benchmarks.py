@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+"""
+Benchmarks for the template engine.
+
+Renders a few realistic pages with the interpreter and with the template
+compiler (TEMPLATE_COMPILE = True) and prints the time per render of each:
+
+    python extras/template_benchmarks.py [--repeat=5] [--number=20] [page ...]
+
+Run it from a Django checkout; it configures its own settings.
+"""
+import datetime
+import optparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from django.conf import settings
+
+settings.configure(
+    TEMPLATE_LOADERS=(
+        ('django.template.loaders.cached.Loader', ('__main__.DictLoader',)),
+    ),
+    TEMPLATE_DEBUG=False,
+    USE_I18N=False,
+    ROOT_URLCONF='__main__',
+)
+
+from django.conf.urls import patterns, url
+from django.template import Context, TemplateDoesNotExist, loader
+from django.template.loader import BaseLoader, get_template
+from django.utils.safestring import mark_safe
+
+TEMPLATES = {
+    'base.html': """<!DOCTYPE html>
+<html>
+<head><title>{% block title %}Site{% endblock %}</title></head>
+<body>
+<div id="header">{% block header %}<h1>{{ site_name }}</h1>{% endblock %}</div>
+<ul id="nav">{% for link in nav %}<li{% if link.active %} class="active"{% endif %}><a href="{{ link.url }}">{{ link.title }}</a></li>{% endfor %}</ul>
+<div id="content">{% block content %}{% endblock %}</div>
+<div id="footer">{% block footer %}&copy; {{ year }} {{ site_name }}{% endblock %}</div>
+</body>
+</html>""",
+    'entry.html': """<div class="entry{% if entry.featured %} featured{% endif %}">
+<h2><a href="{{ entry.url }}">{{ entry.title|title }}</a></h2>
+<p class="meta">By {{ entry.author.name|default:"anonymous" }} on {{ entry.published|date:"N j, Y" }}</p>
+<p>{{ entry.body|truncatewords:30 }}</p>
+{% if entry.tags %}<ul class="tags">{% for tag in entry.tags %}<li>{{ tag }}</li>{% endfor %}</ul>{% endif %}
+</div>""",
+    'blog.html': """{% extends "base.html" %}
+{% block title %}{{ title }} | {{ block.super }}{% endblock %}
+{% block content %}
+<h1>{{ title }}</h1>
+{% for entry in entries %}{% include "entry.html" %}{% empty %}<p>No entries.</p>{% endfor %}
+{% endblock %}""",
+    'table.html': """<table>
+{% for row in rows %}<tr class="{% cycle 'odd' 'even' %}">
+<th>{{ forloop.counter }}</th>{% for cell in row %}<td{% if forloop.first %} class="first"{% endif %}>{{ cell }}</td>{% endfor %}
+</tr>{% endfor %}
+</table>""",
+    'escape.html': """{% for comment in comments %}<div class="comment">
+<p class="author">{{ comment.author }}</p>
+<p>{{ comment.text }}</p>
+<p>{{ comment.html|safe }}</p>
+<p>{{ comment.score }} points, {{ comment.replies }} replies</p>
+</div>{% endfor %}""",
+    'filters.html': """{% for comment in comments %}<li title="{{ comment.author|escape }}">
+{{ comment.text|linebreaksbr }} {{ comment.html|safe|upper }} {{ comment.author|urlize }}
+{{ comment.score|add:1 }}/{{ comment.replies|stringformat:"03d" }} {{ comment.tags|join:", " }}
+</li>{% endfor %}""",
+    'urls.html': """{% load url from future %}{% for entry in entries %}<li>
+<a href="{% url 'entry' entry.published.year entry.slug %}">{{ entry.title }}</a>
+<a href="{% url 'archive' year=entry.published.year month=entry.published.month %}">archive</a>
+{% for tag in entry.tags %}<a href="{% url 'tag' tag %}">{{ tag }}</a>{% endfor %}
+</li>{% endfor %}""",
+}
+
+
+class DictLoader(BaseLoader):
+    is_usable = True
+
+    def load_template_source(self, template_name, template_dirs=None):
+        try:
+            return TEMPLATES[template_name], template_name
+        except KeyError:
+            raise TemplateDoesNotExist(template_name)
+
+
+class Author(object):
+    def __init__(self, name):
+        self.name = name
+
+
+class Entry(object):
+    def __init__(self, i):
+        self.title = 'entry number %d' % i
+        self.url = '/blog/%d/' % i
+        self.author = Author(i % 3 and 'Author %d' % i or '')
+        self.published = datetime.date(2012, 1, 1) + datetime.timedelta(days=i)
+        self.body = 'Lorem ipsum dolor sit amet, consectetur adipisicing elit. ' * 5
+        self.tags = ['tag%d' % j for j in range(i % 4)]
+        self.featured = i % 10 == 0
+        self.slug = 'entry-%d' % i
+
+
+def nav():
+    return [{'url': '/%d/' % i, 'title': 'Section %d' % i, 'active': i == 2} for i in range(8)]
+
+
+def comments():
+    return [{
+        'author': 'Jane <jane@example.com>',
+        'text': 'I think "a < b" & \'b > c\'.\n' * 4,
+        'html': mark_safe('<em>Safe</em> markup'),
+        'score': i,
+        'replies': i % 7,
+        'tags': ['<a>', 'b & c', 'plain'],
+    } for i in range(200)]
+
+
+PAGES = {
+    'blog': ('blog.html', lambda: {
+        'site_name': 'Example', 'year': 2012, 'nav': nav(), 'title': 'Blog',
+        'entries': [Entry(i) for i in range(50)],
+    }),
+    'table': ('table.html', lambda: {
+        'rows': [range(i, i + 20) for i in range(100)],
+    }),
+    'escape': ('escape.html', lambda: {
+        'comments': comments(),
+    }),
+    'filters': ('filters.html', lambda: {
+        'comments': comments(),
+    }),
+    'urls': ('urls.html', lambda: {
+        'entries': [Entry(i) for i in range(100)],
+    }),
+}
+
+
+def view(request, *args, **kwargs):
+    pass
+
+urlpatterns = patterns('',
+    url(r'^$', view, name='home'),
+    url(r'^about/$', view, name='about'),
+    url(r'^blog/(?P<year>\d{4})/$', view, name='year'),
+    url(r'^blog/(?P<year>\d{4})/(?P<month>\d{1,2})/$', view, name='archive'),
+    url(r'^blog/(\d{4})/([\w-]+)/$', view, name='entry'),
+    url(r'^tags/([\w-]+)/$', view, name='tag'),
+) + patterns('', *[
+    url(r'^section%d/(?P<slug>[\w-]+)/$' % i, view, name='section%d' % i)
+    for i in range(100)
+])
+
+
+def benchmark(name, compiled, repeat, number):
+    settings.TEMPLATE_COMPILE = compiled
+    # Start with an empty cached loader.
+    loader.template_source_loaders = None
+    template_name, get_context = PAGES[name]
+    template = get_template(template_name)
+    context = get_context()
+    timer = timeit.Timer(lambda: template.render(Context(context)))
+    return min(timer.repeat(repeat, number)) / number
+
+
+def main():
+    parser = optparse.OptionParser(usage='%prog [options] [page ...]')
+    parser.add_option('--repeat', type='int', default=5,
+                      help='Number of timing runs; the best one is kept.')
+    parser.add_option('--number', type='int', default=20,
+                      help='Number of renders per timing run.')
+    options, args = parser.parse_args()
+    pages = args or sorted(PAGES)
+    print '%-10s %14s %14s %8s' % ('page', 'interpreted', 'compiled', 'speedup')
+    for name in pages:
+        interpreted = benchmark(name, False, options.repeat, options.number)
+        compiled = benchmark(name, True, options.repeat, options.number)
+        print '%-10s %12.2fms %12.2fms %7.2fx' % (
+            name, interpreted * 1000, compiled * 1000, interpreted / compiled)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,7 @@ import hashlib
 import os
 import re
 import StringIO
+import sys
 import tempfile
 import time
 import warnings
@@ -16,12 +17,14 @@ from django.conf import settings
 from django.core import management
 from django.core.cache import get_cache, DEFAULT_CACHE_ALIAS
 from django.core.cache.backends.base import (CacheKeyWarning,
-    InvalidCacheBackendError)
+    InvalidCacheBackendError, RefreshableValue)
+from django.core.cache.serializers import JSONSerializer, ZlibCompressor
 from django.db import router
 from django.http import HttpResponse, HttpRequest, QueryDict
 from django.middleware.cache import (FetchFromCacheMiddleware,
     UpdateCacheMiddleware, CacheMiddleware)
-from django.template import Template
+from django.core.cache.backends.locmem import LocMemCache
+from django.template import Context, Template
 from django.template.response import TemplateResponse
 from django.test import TestCase, TransactionTestCase, RequestFactory
 from django.test.utils import (get_warnings_state, restore_warnings_state,
@@ -174,6 +177,17 @@ class DummyCacheTests(unittest.TestCase):
         self.assertRaises(ValueError, self.cache.decr_version, 'answer')
         self.assertRaises(ValueError, self.cache.decr_version, 'does_not_exist')
 
+    def test_get_or_set(self):
+        "get_or_set always computes the value for the dummy cache backend"
+        self.assertEqual(self.cache.get_or_set('answer', 42), 42)
+        self.assertEqual(self.cache.get_or_set('answer', lambda: 43), 43)
+
+    def test_tags(self):
+        "Tagged values are not cached by the dummy cache backend"
+        self.cache.set('answer', 42, tags=['numbers'])
+        self.assertEqual(self.cache.get('answer'), None)
+        self.cache.invalidate_tag('numbers')
+
 
 class BaseCacheTests(object):
     # A common set of tests to apply to all cache backends
@@ -783,6 +797,181 @@ class BaseCacheTests(object):
         self.assertEqual(get_cache_data.content, content)
         self.assertEqual(get_cache_data.cookies, response.cookies)
 
+    def _use_serializer(self, serializer=None, compressor=None):
+        if serializer is not None:
+            self.cache.serializer = serializer
+        self.cache.compressor = compressor
+        self.cache.compress_min_length = 100
+        self.cache._encode_values = True
+
+    def test_json_serializer(self):
+        self._use_serializer(serializer=JSONSerializer())
+        self.cache.set('json', {'a': [1, 2.5, None, True]})
+        self.assertEqual(self.cache.get('json'), {u'a': [1, 2.5, None, True]})
+        self.cache.set_many({'json1': 1, 'json2': 'two'})
+        self.assertEqual(self.cache.get_many(['json1', 'json2']),
+                         {'json1': 1, 'json2': u'two'})
+        self.cache.incr('json1')
+        self.assertEqual(self.cache.get('json1'), 2)
+
+    def test_compressor(self):
+        self._use_serializer(compressor=ZlibCompressor())
+        large = 'x' * 10000
+        self.assertTrue(len(self.cache.encode(large)) < 1000)
+        self.assertEqual(self.cache.encode('small')[0], '-')
+        self.cache.set('large', large)
+        self.cache.set('small', 'small')
+        self.assertEqual(self.cache.get('large'), large)
+        self.assertEqual(self.cache.get('small'), 'small')
+        self.assertEqual(self.cache.get_many(['large', 'small']),
+                         {'large': large, 'small': 'small'})
+
+    def test_get_or_set(self):
+        # A missing value is computed and stored, then served from the cache
+        calls = []
+        def compute():
+            calls.append(1)
+            return 'computed'
+        self.assertEqual(self.cache.get_or_set('getorset', compute), 'computed')
+        self.assertEqual(self.cache.get_or_set('getorset', compute), 'computed')
+        self.assertEqual(len(calls), 1)
+        # Non-callable defaults are stored as-is
+        self.assertEqual(self.cache.get_or_set('getorset2', 42), 42)
+        self.assertEqual(self.cache.get_or_set('getorset2', 43), 42)
+        # The refresh lock is released once the value is stored
+        self.assertFalse(self.cache.has_key(self.cache.get_refresh_lock_key('getorset')))
+
+    def test_get_or_set_stale(self):
+        # A stale value is refreshed by the client acquiring the lock...
+        self.cache.get_or_set('stale', 'old', timeout=1, stale_timeout=30)
+        time.sleep(1.1)
+        lock_key = self.cache.get_refresh_lock_key('stale')
+        self.cache.add(lock_key, True)
+        # ...and served as-is to everybody else.
+        self.assertEqual(self.cache.get_or_set('stale', 'new', timeout=1, stale_timeout=30), 'old')
+        self.cache.delete(lock_key)
+        self.assertEqual(self.cache.get_or_set('stale', 'new', timeout=1, stale_timeout=30), 'new')
+
+    def test_refreshable_value(self):
+        now = time.time()
+        value = RefreshableValue('value', now + 10, delta=0)
+        self.assertFalse(value.needs_refresh(now=now))
+        self.assertTrue(value.needs_refresh(now=now + 10))
+        # An expensive value is likely refreshed early
+        value = RefreshableValue('value', now + 10, delta=1000)
+        self.assertTrue(any(value.needs_refresh(now=now) for i in range(10)))
+        self.assertFalse(value.needs_refresh(beta=0, now=now))
+
+    def test_tags(self):
+        # Tagged values are read back as usual
+        self.cache.set('tagged1', 'value1', tags=['tag1', 'tag2'])
+        self.cache.set_many({'tagged2': 'value2', 'tagged3': 'value3'}, tags=['tag2'])
+        self.cache.add('tagged4', 'value4', tags=['tag3'])
+        self.cache.set('untagged', 'value')
+        self.assertEqual(self.cache.get('tagged1'), 'value1')
+        self.assertEqual(self.cache.get_many(['tagged1', 'tagged2', 'tagged4', 'untagged']),
+                         {'tagged1': 'value1', 'tagged2': 'value2',
+                          'tagged4': 'value4', 'untagged': 'value'})
+        # Invalidating a tag expires all the values carrying it
+        self.cache.invalidate_tag('tag2')
+        self.assertEqual(self.cache.get('tagged1'), None)
+        self.assertEqual(self.cache.get('tagged1', 'default'), 'default')
+        self.assertEqual(self.cache.get_many(['tagged1', 'tagged2', 'tagged3', 'tagged4', 'untagged']),
+                         {'tagged4': 'value4', 'untagged': 'value'})
+        # Values stored afterwards are valid again
+        self.cache.set('tagged1', 'new', tags=['tag2'])
+        self.assertEqual(self.cache.get('tagged1'), 'new')
+        # Invalidating an unknown tag is a no-op
+        self.cache.invalidate_tag('unknown')
+
+    def test_tags_has_key_and_add(self):
+        # Invalidated values count as missing
+        self.cache.set('tagged', 'old', tags=['tag'])
+        self.assertTrue(self.cache.has_key('tagged'))
+        self.assertFalse(self.cache.add('tagged', 'other', tags=['tag']))
+        self.cache.invalidate_tag('tag')
+        self.assertFalse(self.cache.has_key('tagged'))
+        self.assertFalse('tagged' in self.cache)
+        self.assertTrue(self.cache.add('tagged', 'new', tags=['tag']))
+        self.assertEqual(self.cache.get('tagged'), 'new')
+        self.assertTrue(self.cache.has_key('tagged'))
+        self.assertFalse(self.cache.add('tagged', 'newer'))
+
+    def test_tags_lost_counter(self):
+        # Values are invalidated when their tag counter is evicted, even if a
+        # new counter is started for the tag.
+        self.cache.set('tagged', 'value', tags=['tag'])
+        self.cache.delete(self.cache.get_tag_key('tag'))
+        self.cache.set('other', 'value', tags=['tag'])
+        self.assertEqual(self.cache.get('tagged'), None)
+        self.assertEqual(self.cache.get('other'), 'value')
+
+    def test_invalidate_tag_keeps_counter(self):
+        # Invalidating a tag doesn't store its counter with the default
+        # timeout, which would expire values stored for longer.
+        default_timeout = self.cache.default_timeout
+        self.cache.default_timeout = 1
+        try:
+            self.cache.set('tagged', 'old', 60, tags=['tag'])
+            self.cache.invalidate_tag('tag')
+            self.cache.set('tagged', 'new', 60, tags=['tag'])
+            time.sleep(2)
+            self.assertEqual(self.cache.get('tagged'), 'new')
+        finally:
+            self.cache.default_timeout = default_timeout
+
+    def test_get_or_set_tags(self):
+        self.assertEqual(self.cache.get_or_set('getorset', 'old', tags=['tag']), 'old')
+        self.cache.invalidate_tag('tag')
+        self.assertEqual(self.cache.get_or_set('getorset', 'new', tags=['tag']), 'new')
+
+    def test_middleware_refresh_is_single_flight(self):
+        update_middleware = UpdateCacheMiddleware()
+        update_middleware.cache = self.cache
+        fetch_middleware = FetchFromCacheMiddleware()
+        fetch_middleware.cache = self.cache
+
+        request = self._get_request_cache('/cache/refresh/')
+        self.assertEqual(fetch_middleware.process_request(request), None)
+        update_middleware.process_response(request, HttpResponse('first'))
+        cache_key = get_cache_key(request, cache=self.cache)
+        entry = self.cache.get(cache_key)
+        # Pretend the cached page is about to expire.
+        entry.expires = time.time()
+        self.cache.set(cache_key, entry)
+
+        # The first request is let through to regenerate the page...
+        request = self._get_request_cache('/cache/refresh/')
+        self.assertEqual(fetch_middleware.process_request(request), None)
+        # ...while concurrent requests get the cached copy.
+        other_request = self._get_request_cache('/cache/refresh/')
+        self.assertEqual(fetch_middleware.process_request(other_request).content, 'first')
+
+        update_middleware.process_response(request, HttpResponse('second'))
+        request = self._get_request_cache('/cache/refresh/')
+        self.assertEqual(fetch_middleware.process_request(request).content, 'second')
+
+    def test_middleware_refresh_lock_released_on_exception(self):
+        update_middleware = UpdateCacheMiddleware()
+        update_middleware.cache = self.cache
+        fetch_middleware = FetchFromCacheMiddleware()
+        fetch_middleware.cache = self.cache
+
+        request = self._get_request_cache('/cache/refresh/')
+        self.assertEqual(fetch_middleware.process_request(request), None)
+        update_middleware.process_response(request, HttpResponse('first'))
+        cache_key = get_cache_key(request, cache=self.cache)
+        entry = self.cache.get(cache_key)
+        entry.expires = time.time()
+        self.cache.set(cache_key, entry)
+
+        request = self._get_request_cache('/cache/refresh/')
+        self.assertEqual(fetch_middleware.process_request(request), None)
+        # The view raised: the next request regenerates the page.
+        update_middleware.process_exception(request, ValueError())
+        request = self._get_request_cache('/cache/refresh/')
+        self.assertEqual(fetch_middleware.process_request(request), None)
+
 def custom_key_func(key, key_prefix, version):
     "A customized cache key function"
     return 'CUSTOM-' + '-'.join([key_prefix, str(version), key])
@@ -823,6 +1012,42 @@ class DBCacheTests(BaseCacheTests, TransactionTestCase):
         management.call_command('createcachetable', self._table_name, verbosity=0, interactive=False, stderr=err)
         self.assertTrue("Cache table 'test cache table' could not be created" in err.getvalue())
 
+    def test_get_many_single_query(self):
+        self.cache.set_many({'a': 1, 'b': 2, 'c': 3})
+        with self.assertNumQueries(1):
+            self.assertEqual(self.cache.get_many(['a', 'b', 'c', 'd']),
+                             {'a': 1, 'b': 2, 'c': 3})
+
+    def test_set_many_updates_and_inserts(self):
+        self.cache.set('a', 1)
+        # One query to count the entries, one to find the existing keys, one
+        # to update them and one to insert the new ones.
+        with self.assertNumQueries(4):
+            self.cache.set_many({'a': 10, 'b': 20, 'c': 30})
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']),
+                         {'a': 10, 'b': 20, 'c': 30})
+
+    def test_delete_many_single_query(self):
+        self.cache.set_many({'a': 1, 'b': 2, 'c': 3})
+        with self.assertNumQueries(1):
+            self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']), {'c': 3})
+
+    def test_get_many_deletes_expired_entries(self):
+        self.cache.set('expired', 1, 1)
+        self.cache.set('fresh', 2)
+        time.sleep(2)
+        self.assertEqual(self.cache.get_many(['expired', 'fresh']), {'fresh': 2})
+        with self.assertNumQueries(1):
+            self.assertEqual(self.cache.get('expired'), None)
+
+    def test_cull_probability(self):
+        self.cache = get_cache(self.backend_name, LOCATION=self._table_name,
+                               OPTIONS={'MAX_ENTRIES': 30, 'CULL_PROBABILITY': 0})
+        self.perform_cull_test(50, 49)
+        with self.assertNumQueries(2):
+            self.cache.set('nocount', 1)
+
 
 @override_settings(USE_TZ=True)
 class DBCacheWithTimeZoneTests(DBCacheTests):
@@ -925,6 +1150,16 @@ class LocMemCacheTests(unittest.TestCase, BaseCacheTests):
         self.cache.decr(key)
         self.assertEqual(expire, self.cache._expire_info[_key])
 
+    def test_unserializable_value(self):
+        # Like unpicklable values, values the serializer can't encode aren't
+        # stored.
+        self._use_serializer(serializer=JSONSerializer())
+        self.cache.set('json', object())
+        self.assertEqual(self.cache.get('json'), None)
+        self.assertFalse(self.cache.add('json', object()))
+        self.cache._cache[self.cache.make_key('json')] = '{'
+        self.assertEqual(self.cache.get('json'), None)
+
 # memcached backend isn't guaranteed to be available.
 # To check the memcached backend, the test settings file will
 # need to contain a cache backend setting that points at
@@ -962,6 +1197,81 @@ class MemcachedCacheTests(unittest.TestCase, BaseCacheTests):
         self.assertRaises(Exception, self.cache.set, 'a' * 251, 'value')
 
 
+class FakeMemcachedClient(object):
+    def __init__(self, servers):
+        self.servers = servers
+        self.connected = True
+
+    def disconnect_all(self):
+        self.connected = False
+
+
+class FakeMemcachedLibrary(object):
+    Client = FakeMemcachedClient
+    NotFound = ValueError
+
+
+class MemcachedClientPoolTests(unittest.TestCase):
+    """
+    Client management of the memcached backends, which doesn't need a
+    memcached server.
+    """
+    def get_cache(self, **options):
+        from django.core.cache.backends.memcached import PyLibMCCache
+        old_pylibmc = sys.modules.get('pylibmc')
+        sys.modules['pylibmc'] = FakeMemcachedLibrary
+        try:
+            return PyLibMCCache('127.0.0.1:11211', {'OPTIONS': options})
+        finally:
+            if old_pylibmc is None:
+                del sys.modules['pylibmc']
+            else:
+                sys.modules['pylibmc'] = old_pylibmc
+
+    def test_python_memcached_client_shared(self):
+        # python-memcached clients keep connections per thread themselves.
+        import threading
+        from django.core.cache.backends.memcached import BaseMemcachedCache
+        cache = BaseMemcachedCache('127.0.0.1:11211', {},
+                                   library=FakeMemcachedLibrary,
+                                   value_not_found_exception=ValueError)
+        client = cache._cache
+        clients = []
+        thread = threading.Thread(target=lambda: clients.append(cache._cache))
+        thread.start()
+        thread.join()
+        self.assertTrue(clients[0] is client)
+        cache.close()
+        self.assertFalse(client.connected)
+
+    def test_client_reused_across_requests(self):
+        cache = self.get_cache()
+        client = cache._cache
+        self.assertTrue(cache._cache is client)
+        cache.close()
+        self.assertTrue(client.connected)
+        self.assertTrue(cache._cache is client)
+
+    def test_clients_not_shared_between_threads(self):
+        import threading
+        cache = self.get_cache()
+        client = cache._cache
+        clients = []
+        thread = threading.Thread(target=lambda: clients.append(cache._cache))
+        thread.start()
+        thread.join()
+        self.assertFalse(clients[0] is client)
+
+    def test_pool_size(self):
+        cache = self.get_cache(POOL_SIZE=1)
+        clients = [cache._pool.get() for i in range(2)]
+        for client in clients:
+            cache._pool.put(client)
+        self.assertTrue(clients[0].connected)
+        self.assertFalse(clients[1].connected)
+        self.assertTrue(cache._pool.get() is clients[0])
+
+
 class FileBasedCacheTests(unittest.TestCase, BaseCacheTests):
     """
     Specific test cases for the file-based cache.
@@ -1009,6 +1319,53 @@ class FileBasedCacheTests(unittest.TestCase, BaseCacheTests):
         self.cache = get_cache('file://%s?max_entries=30' % self.dirname)
         self.perform_cull_test(50, 29)
 
+    def test_cull_removes_oldest_entries(self):
+        for i in range(30):
+            self.cache.set('cull%d' % i, 'value')
+            fname = self.cache._key_to_file(self.cache.make_key('cull%d' % i))
+            os.utime(fname, (i, i))
+        self.cache.set('cull30', 'value')
+        self.assertFalse(self.cache.has_key('cull0'))
+        self.assertFalse(self.cache.has_key('cull9'))
+        self.assertTrue(self.cache.has_key('cull10'))
+        self.assertTrue(self.cache.has_key('cull30'))
+
+    def test_no_temporary_files_left(self):
+        self.cache.set('foo', 'bar')
+        self.cache.set('foo', 'baz')
+        files = [f for _, _, files in os.walk(self.dirname) for f in files]
+        self.assertEqual(len(files), 1)
+        self.assertEqual(self.cache.get('foo'), 'baz')
+
+    def test_temporary_files_not_counted(self):
+        self.cache.set('foo', 'bar')
+        fname = self.cache._key_to_file(self.cache.make_key('foo'))
+        tmp_path = '%s.0123.tmp' % fname
+        open(tmp_path, 'wb').close()
+        self.assertEqual(self.cache._get_num_entries(), 1)
+        for i in range(30):
+            self.cache.set('cull%d' % i, 'value')
+        # The file being written isn't culled.
+        self.assertTrue(os.path.exists(tmp_path))
+
+    def test_compressed_file_size(self):
+        cache = get_cache(self.backend_name, LOCATION=self.dirname,
+                          COMPRESSOR='django.core.cache.serializers.ZlibCompressor')
+        cache.set('large', 'x' * 10000)
+        self.assertTrue(os.path.getsize(cache._key_to_file(cache.make_key('large'))) < 1000)
+        self.assertEqual(cache.get('large'), 'x' * 10000)
+
+    def test_corrupt_file(self):
+        cache = get_cache(self.backend_name, LOCATION=self.dirname,
+                          COMPRESSOR='django.core.cache.serializers.ZlibCompressor')
+        cache.set('large', 'x' * 10000)
+        fname = cache._key_to_file(cache.make_key('large'))
+        f = open(fname, 'r+b')
+        f.truncate(os.path.getsize(fname) - 10)
+        f.close()
+        self.assertEqual(cache.get('large'), None)
+        self.assertEqual(cache.get('large', 'default'), 'default')
+
 
 class CustomCacheKeyValidationTests(unittest.TestCase):
     """
@@ -1050,6 +1407,19 @@ class GetCacheTests(unittest.TestCase):
         signals.request_finished.send(self.__class__)
         self.assertTrue(cache.closed)
 
+    def test_serializer_and_compressor(self):
+        cache = get_cache('django.core.cache.backends.locmem.LocMemCache',
+                          SERIALIZER='django.core.cache.serializers.JSONSerializer',
+                          COMPRESSOR='django.core.cache.serializers.ZlibCompressor',
+                          OPTIONS={'COMPRESS_MIN_LENGTH': 10})
+        self.assertTrue(isinstance(cache.serializer, JSONSerializer))
+        self.assertTrue(isinstance(cache.compressor, ZlibCompressor))
+        self.assertEqual(cache.compress_min_length, 10)
+
+        self.assertRaises(InvalidCacheBackendError, get_cache,
+                          'django.core.cache.backends.locmem.LocMemCache',
+                          SERIALIZER='does.not.Exist')
+
 
 @override_settings(
         CACHE_MIDDLEWARE_KEY_PREFIX='settingsprefix',
@@ -1513,6 +1883,50 @@ class CacheMiddlewareTest(TestCase):
         self.assertNotEquals(result, None)
         self.assertEqual(result.content, 'Hello World 1')
 
+    @override_settings(USE_ETAGS=True)
+    def test_conditional_get_from_cached_headers(self):
+        middleware = CacheMiddleware()
+        request = self.factory.get('/view/')
+        middleware.process_request(request)
+        response = middleware.process_response(request, hello_world_view(request, '1'))
+        etag = response['ETag']
+
+        # Drop the cached page itself: a matching conditional request is
+        # answered from the cached headers alone.
+        cache_key = get_cache_key(request, 'middlewareprefix', cache=middleware.cache)
+        middleware.cache.delete(cache_key)
+        request = self.factory.get('/view/', HTTP_IF_NONE_MATCH=etag)
+        result = middleware.process_request(request)
+        self.assertEqual(result.status_code, 304)
+        self.assertEqual(result['ETag'], etag)
+        self.assertTrue(result.has_header('Cache-Control'))
+
+        request = self.factory.get('/view/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(middleware.process_request(request).status_code, 304)
+
+        # A stale ETag requires the page.
+        request = self.factory.get('/view/', HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(middleware.process_request(request), None)
+
+    @override_settings(CACHE_MIDDLEWARE_STALE_SECONDS=30)
+    def test_stale_page_served_while_refreshing(self):
+        middleware = CacheMiddleware(cache_timeout=1)
+        request = self.factory.get('/view/')
+        middleware.process_request(request)
+        middleware.process_response(request, hello_world_view(request, '1'))
+        time.sleep(1.1)
+
+        # The first request after expiry regenerates the page...
+        request = self.factory.get('/view/')
+        self.assertEqual(middleware.process_request(request), None)
+        # ...while the others are served the expired one.
+        other_request = self.factory.get('/view/')
+        self.assertEqual(middleware.process_request(other_request).content, 'Hello World 1')
+
+        middleware.process_response(request, hello_world_view(request, '2'))
+        request = self.factory.get('/view/')
+        self.assertEqual(middleware.process_request(request).content, 'Hello World 2')
+
     @override_settings(CACHE_MIDDLEWARE_ANONYMOUS_ONLY=True)
     def test_cache_middleware_anonymous_only_wont_cause_session_access(self):
         """ The cache middleware shouldn't cause a session access due to
@@ -1658,6 +2072,133 @@ class CacheMiddlewareTest(TestCase):
         self.assertEqual(response.content, 'Hello World 18')
 
 
+class CountingCache(LocMemCache):
+    """
+    A local memory cache recording the calls made to any of its instances.
+    """
+    calls = []
+
+    def __init__(self, *args, **kwargs):
+        super(CountingCache, self).__init__(*args, **kwargs)
+        self._in_get_many = False
+
+    def get(self, *args, **kwargs):
+        # Don't record the get() calls made by get_many() itself.
+        if not self._in_get_many:
+            self.calls.append('get')
+        return super(CountingCache, self).get(*args, **kwargs)
+
+    def get_many(self, *args, **kwargs):
+        self.calls.append('get_many')
+        self._in_get_many = True
+        try:
+            return super(CountingCache, self).get_many(*args, **kwargs)
+        finally:
+            self._in_get_many = False
+
+    def set_many(self, *args, **kwargs):
+        self.calls.append('set_many')
+        return super(CountingCache, self).set_many(*args, **kwargs)
+
+
+@override_settings(
+        CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+            'counting': {
+                'BACKEND': 'regressiontests.cache.tests.CountingCache',
+                'LOCATION': 'counting',
+            },
+        },
+)
+class TemplateFragmentCacheTests(TestCase):
+
+    def setUp(self):
+        del CountingCache.calls[:]
+
+    def tearDown(self):
+        get_cache('counting').clear()
+
+    def render(self, template, **context):
+        return Template(template).render(Context(context))
+
+    def get_calls(self):
+        calls = CountingCache.calls[:]
+        del CountingCache.calls[:]
+        return calls
+
+    def test_using(self):
+        template = '{% load cache %}{% cache 60 frag using="counting" %}{{ x }}{% endcache %}'
+        self.assertEqual(self.render(template, x=1), '1')
+        self.assertEqual(self.render(template, x=2), '1')
+        self.assertTrue(self.get_calls())
+        # The fragment isn't in the default cache.
+        self.assertEqual(self.render(template.replace(' using="counting"', ''), x=3), '3')
+
+    def test_using_variable(self):
+        template = '{% load cache %}{% cache 60 frag using=alias %}{{ x }}{% endcache %}'
+        self.assertEqual(self.render(template, x=1, alias='counting'), '1')
+        self.assertEqual(self.render(template, x=2, alias='counting'), '1')
+
+    def test_loop_fetches_fragments_at_once(self):
+        template = ('{% load cache %}{% for item in items %}'
+                    '{% cache 60 card item using="counting" %}[{{ item }}{{ suffix }}]{% endcache %}'
+                    '{% endfor %}')
+        self.assertEqual(self.render(template, items=[1, 2, 3], suffix='a'), '[1a][2a][3a]')
+        self.assertEqual(self.get_calls(), ['get_many', 'set_many'])
+        self.assertEqual(self.render(template, items=[1, 2, 3, 4], suffix='b'), '[1a][2a][3a][4b]')
+        self.assertEqual(self.get_calls(), ['get_many', 'set_many'])
+        self.assertEqual(self.render(template, items=[4, 3], suffix='c'), '[4b][3a]')
+        self.assertEqual(self.get_calls(), ['get_many'])
+
+    def test_loop_renders_same_fragment_once(self):
+        renders = []
+        def count():
+            renders.append(None)
+            return len(renders)
+        template = ('{% load cache %}{% for item in items %}'
+                    '{% cache 60 frag using="counting" %}[{{ count }}]{% endcache %}'
+                    '{% endfor %}')
+        self.assertEqual(self.render(template, items=range(5), count=count), '[1]' * 5)
+        self.assertEqual(len(renders), 1)
+
+    def test_nested_loops(self):
+        template = ('{% load cache %}{% for row in rows %}'
+                    '{% cache 60 row row.0 using="counting" %}{% for item in row %}'
+                    '{% cache 60 cell item using="counting" %}{{ item }}{% endcache %}'
+                    '{% endfor %};{% endcache %}{% endfor %}')
+        self.assertEqual(self.render(template, rows=[[1, 2], [3]]), '12;3;')
+        self.assertEqual(self.render(template, rows=[[1, 5], [3]]), '12;3;')
+
+    def test_loop_over_iterator(self):
+        class Items(object):
+            # Can only be iterated over once.
+            def __init__(self, items):
+                self.items = iter(items)
+            def __len__(self):
+                return 3
+            def __iter__(self):
+                return self.items
+        template = ('{% load cache %}{% for item in items %}'
+                    '{% cache 60 card item using="counting" %}{{ item }}{% endcache %}'
+                    '{% endfor %}')
+        self.assertEqual(self.render(template, items=Items([1, 2, 3])), '123')
+        self.assertEqual(self.render(template.replace('items %}', 'items reversed %}'),
+                                     items=Items([1, 2, 3])), '321')
+
+    def test_caches_follow_settings(self):
+        template = '{% load cache %}{% cache 60 frag using="counting" %}{{ x }}{% endcache %}'
+        self.assertEqual(self.render(template, x=1), '1')
+        with override_settings(CACHES={
+                'counting': {
+                    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                    'LOCATION': 'other',
+                }}):
+            self.assertEqual(self.render(template, x=2), '2')
+        self.assertEqual(self.render(template, x=3), '1')
+
+
 @override_settings(
         CACHE_MIDDLEWARE_KEY_PREFIX='settingsprefix',
         CACHE_MIDDLEWARE_SECONDS=1,
@@ -1,6 +1,8 @@
 from django.conf import settings
+from django.core import signals
 from django.core.handlers.wsgi import WSGIHandler
 from django.test import RequestFactory
+from django.test.utils import override_settings
 from django.utils import unittest
 
 
@@ -32,3 +34,24 @@ class HandlerTests(unittest.TestCase):
         handler = WSGIHandler()
         response = handler(environ, lambda *a, **k: None)
         self.assertEqual(response.status_code, 400)
+
+    @override_settings(ROOT_URLCONF='regressiontests.handlers.urls')
+    def test_streaming_request_finished(self):
+        """
+        request_finished is sent when streaming responses are closed, after
+        their content has been produced.
+        """
+        finished = []
+        def receiver(**kwargs):
+            finished.append(True)
+        signals.request_finished.connect(receiver)
+        try:
+            environ = RequestFactory().get('/streaming/').environ
+            handler = WSGIHandler()
+            response = handler(environ, lambda *a, **k: None)
+            self.assertEqual(finished, [])
+            self.assertEqual(''.join(response), 'streamed')
+            response.close()
+            self.assertEqual(finished, [True])
+        finally:
+            signals.request_finished.disconnect(receiver)
@@ -0,0 +1,6 @@
+from django.conf.urls import patterns, url
+
+
+urlpatterns = patterns('regressiontests.handlers.views',
+    url(r'^streaming/$', 'streaming'),
+)
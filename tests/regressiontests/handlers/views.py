@@ -0,0 +1,5 @@
+from django.http import StreamingHttpResponse
+
+
+def streaming(request):
+    return StreamingHttpResponse(iter(['stream', 'ed']))
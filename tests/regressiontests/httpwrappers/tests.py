@@ -1,8 +1,8 @@
 import copy
 import pickle
 
-from django.http import (QueryDict, HttpResponse, SimpleCookie, BadHeaderError,
-        parse_cookie)
+from django.http import (QueryDict, HttpResponse, StreamingHttpResponse,
+        SimpleCookie, BadHeaderError, parse_cookie)
 from django.utils import unittest
 
 
@@ -296,6 +296,44 @@ class HttpResponseTests(unittest.TestCase):
         self.assertRaises(UnicodeEncodeError,
                           getattr, r, 'content')
 
+    def test_iterator_content_read_twice(self):
+        r = HttpResponse(iter(['abc', 'def']))
+        self.assertEqual(r.content, 'abcdef')
+        self.assertEqual(r.content, 'abcdef')
+        self.assertEqual(''.join(r), 'abcdef')
+
+class StreamingHttpResponseTests(unittest.TestCase):
+    def test_streaming_content(self):
+        r = StreamingHttpResponse(iter(['hello', u'caf\xe9', 1]))
+        self.assertTrue(r.streaming)
+        self.assertEqual(list(r), ['hello', 'caf\xc3\xa9', '1'])
+        # The content can only be read once.
+        self.assertEqual(list(r), [])
+
+    def test_no_content_attribute(self):
+        r = StreamingHttpResponse(['abc'])
+        self.assertRaises(AttributeError, getattr, r, 'content')
+        self.assertFalse(hasattr(r, 'write'))
+
+    def test_wrapped_content(self):
+        r = StreamingHttpResponse(iter(['abc', 'def']))
+        r.streaming_content = (chunk.upper() for chunk in r.streaming_content)
+        self.assertEqual(''.join(r), 'ABCDEF')
+
+    def test_close(self):
+        closed = []
+        def content():
+            try:
+                yield 'abc'
+                yield 'def'
+            finally:
+                closed.append(True)
+        r = StreamingHttpResponse(content())
+        r.streaming_content = (chunk.upper() for chunk in r.streaming_content)
+        self.assertEqual(iter(r).next(), 'ABC')
+        r.close()
+        self.assertEqual(closed, [True])
+
 class CookieTests(unittest.TestCase):
     def test_encode(self):
         """
@@ -2,7 +2,8 @@ import os
 import warnings
 
 from django.core.exceptions import ImproperlyConfigured
-from django.core.urlresolvers import reverse, clear_url_caches
+from django.core.urlresolvers import (reverse, clear_url_caches, get_resolver,
+    populate_url_caches)
 from django.test import TestCase
 from django.test.utils import override_settings
 from django.template import Template, Context
@@ -118,6 +119,19 @@ class URLTranslationTests(URLTestCaseBase):
             self.assertEqual(reverse('users'), '/pt-br/usuarios/')
 
 
+class URLCacheTests(URLTestCaseBase):
+    """
+    Tests the population of the caches of translated URL patterns.
+    """
+    def test_populate_url_caches(self):
+        populate_url_caches(languages=['en', 'nl'])
+        resolver = get_resolver(None)
+        self.assertEqual(sorted(resolver._reverse_dict), ['en', 'nl'])
+        with translation.override('nl'):
+            self.assertEqual(reverse('users'), '/nl/gebruikers/')
+        self.assertEqual(sorted(resolver._reverse_dict), ['en', 'nl'])
+
+
 class URLNamespaceTests(URLTestCaseBase):
     """
     Tests if the translations are still working within namespaces.
@@ -8,7 +8,7 @@ import StringIO
 from django.conf import settings
 from django.core import mail
 from django.http import HttpRequest
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.middleware.clickjacking import XFrameOptionsMiddleware
 from django.middleware.common import CommonMiddleware
 from django.middleware.http import ConditionalGetMiddleware
@@ -291,6 +291,16 @@ class CommonMiddlewareTest(TestCase):
         CommonMiddleware().process_response(request, response)
         self.assertEqual(len(mail.outbox), 0)
 
+    # Tests for the ETag header
+
+    @override_settings(USE_ETAGS=True)
+    def test_etag_streaming_response(self):
+        request = self._get_request('regular_url/')
+        response = CommonMiddleware().process_response(request,
+            StreamingHttpResponse(['content']))
+        self.assertFalse(response.has_header('ETag'))
+        self.assertEqual(''.join(response), 'content')
+
 
 class ConditionalGetMiddlewareTest(TestCase):
     urls = 'regressiontests.middleware.cond_get_urls'
@@ -319,6 +329,12 @@ class ConditionalGetMiddlewareTest(TestCase):
         self.assertTrue('Content-Length' in self.resp)
         self.assertEqual(int(self.resp['Content-Length']), content_length)
 
+    def test_content_length_header_not_added_streaming(self):
+        self.resp = StreamingHttpResponse(['content'])
+        self.resp = ConditionalGetMiddleware().process_response(self.req, self.resp)
+        self.assertFalse('Content-Length' in self.resp)
+        self.assertEqual(''.join(self.resp), 'content')
+
     def test_content_length_header_not_changed(self):
         bad_content_length = len(self.resp.content) + 10
         self.resp['Content-Length'] = bad_content_length
@@ -536,6 +552,24 @@ class GZipMiddlewareTest(TestCase):
         self.assertEqual(r.get('Content-Encoding'), 'gzip')
         self.assertEqual(r.get('Content-Length'), str(len(r.content)))
 
+    def test_compress_streaming_response(self):
+        """
+        Tests that compression is performed on streaming responses, as their
+        content is produced.
+        """
+        consumed = []
+        def content():
+            for chunk in [self.compressible_string] * 3:
+                consumed.append(chunk)
+                yield chunk
+        response = StreamingHttpResponse(content())
+        response['Content-Length'] = str(len(self.compressible_string) * 3)
+        r = GZipMiddleware().process_response(self.req, response)
+        self.assertEqual(consumed, [])
+        self.assertEqual(self.decompress(''.join(r)), self.compressible_string * 3)
+        self.assertEqual(r.get('Content-Encoding'), 'gzip')
+        self.assertFalse(r.has_header('Content-Length'))
+
     def test_compress_non_200_response(self):
         """
         Tests that compression is performed on responses with a status other than 200.
@@ -0,0 +1,45 @@
+from django.template import Context, Template
+from django.template.compiler import compile_template
+from django.test.utils import override_settings
+from django.utils.unittest import TestCase
+
+
+class CompilerTests(TestCase):
+
+    @override_settings(TEMPLATE_COMPILE=True, TEMPLATE_DEBUG=False)
+    def test_compiled_on_load(self):
+        template = Template('{{ a }}')
+        self.assertNotEqual(template.nodelist.compiled, None)
+
+    @override_settings(TEMPLATE_COMPILE=True, TEMPLATE_DEBUG=True)
+    def test_not_compiled_in_debug_mode(self):
+        template = Template('{{ a }}')
+        self.assertEqual(template.nodelist.compiled, None)
+
+    def test_compile(self):
+        source = ('{% for a, b in items %}{{ forloop.counter }}:{{ a }}'
+                  '{% if b %}+{% elif a %}-{% else %}0{% endif %}'
+                  '{% for c in b reversed %}{{ c|upper }}{{ forloop.parentloop.first }}{% endfor %},'
+                  '{% empty %}none{% endfor %}{{ items|length }}')
+        context = {'items': [(1, 'xy'), (0, ''), (2, None)]}
+        expected = Template(source).render(Context(context))
+        self.assertEqual(expected, u'1:1+YTrueXTrue,2:00,3:2-,3')
+        template = compile_template(Template(source))
+        self.assertEqual(template.render(Context(context)), expected)
+        self.assertEqual(template.render(Context({'items': []})), u'none0')
+
+    def test_fallback(self):
+        # Tags the compiler doesn't know are rendered by the interpreter,
+        # with their nodelists compiled.
+        template = compile_template(Template(
+            '{% with a|add:1 as b %}{% for i in x %}{{ b }}{% endfor %}{% endwith %}'
+            '{% spaceless %} <p> {{ a }} </p> {% endspaceless %}'))
+        with_node = template.nodelist[0]
+        self.assertNotEqual(with_node.nodelist.compiled, None)
+        self.assertEqual(template.render(Context({'a': 1, 'x': 'ab'})), u'22<p> 1 </p>')
+
+    def test_autoescape(self):
+        template = compile_template(Template(
+            '{{ a }}{% autoescape off %}{{ a }}{% endautoescape %}{{ a|safe }}'))
+        self.assertEqual(template.render(Context({'a': '<>'})),
+                         u'&lt;&gt;<><>')
@@ -1,5 +1,8 @@
 # coding: utf-8
-from django.template import Context
+from copy import copy
+
+from django.template import Context, Template
+from django.template.context import LazyValue
 from django.utils.unittest import TestCase
 
 
@@ -14,3 +17,101 @@ class ContextTests(TestCase):
         self.assertEqual(c.pop(), {"a": 2})
         self.assertEqual(c["a"], 1)
         self.assertEqual(c.get("foo", 42), 42)
+
+    def test_new(self):
+        c = Context({"a": 1}, autoescape=False)
+        c.render_context["b"] = 2
+        new = c.new({"c": 3})
+        self.assertFalse(new.autoescape)
+        self.assertFalse("a" in new)
+        self.assertEqual(new["c"], 3)
+        self.assertEqual(c.get("c"), None)
+        # The render context is copied, and loaded templates are shared.
+        new.render_context.push()
+        self.assertEqual(len(c.render_context.dicts), 1)
+        self.assertTrue(new.render_context.templates is c.render_context.templates)
+
+    def test_shadowing(self):
+        c = Context({"a": 1, "b": 2})
+        c.update({"a": 3})
+        c.push()
+        c["b"] = 4
+        c["c"] = 5
+        self.assertEqual((c["a"], c["b"], c["c"]), (3, 4, 5))
+        del c["b"]
+        self.assertEqual(c["b"], 2)
+        c["b"] = 6
+        duplicate = copy(c)
+        c.pop()
+        self.assertEqual((c["a"], c["b"], c.get("c")), (3, 2, None))
+        self.assertFalse("c" in c)
+        self.assertRaises(KeyError, lambda: c["c"])
+        self.assertEqual((duplicate["b"], duplicate["c"]), (6, 5))
+        c.pop()
+        self.assertEqual(c["a"], 1)
+        self.assertEqual(duplicate["a"], 3)
+
+    def test_mapping_without_keys(self):
+        class Mapping(object):
+            def __getitem__(self, key):
+                if key == "a":
+                    return 2
+                raise KeyError(key)
+            def __contains__(self, key):
+                return key == "a"
+        c = Context({"a": 1, "b": 1})
+        c.update(Mapping())
+        self.assertEqual((c["a"], c["b"]), (2, 1))
+        self.assertTrue("a" in c)
+        c.pop()
+        self.assertEqual(c["a"], 1)
+
+    def test_lazy_value(self):
+        calls = []
+        def compute(value):
+            calls.append(value)
+            return value
+        c = Context({"a": LazyValue(compute, 1), "b": LazyValue(compute, 2)})
+        self.assertTrue("a" in c)
+        self.assertEqual(calls, [])
+        self.assertEqual(Template("{{ a }}{{ a }}").render(c), u"11")
+        self.assertEqual(c.get("a"), 1)
+        self.assertEqual(calls, [1])
+
+    def test_mutate_pushed_dict(self):
+        c = Context({"a": 1})
+        d = c.push()
+        d["a"] = 2
+        d["b"] = 3
+        self.assertEqual((c["a"], c["b"]), (2, 3))
+        c.push()
+        c["b"] = 4
+        d["b"] = 5
+        self.assertEqual(c["b"], 4)
+        c.dicts[-1]["c"] = 6
+        self.assertEqual(c["c"], 6)
+        c.pop()
+        self.assertEqual((c["b"], c.get("c")), (5, None))
+        del d["a"]
+        self.assertEqual(c["a"], 1)
+        d.update(a=7)
+        self.assertEqual(c.pop(), {"a": 7, "b": 5})
+        # A popped dictionary doesn't change the context anymore.
+        d["a"] = 8
+        self.assertEqual((c["a"], c.get("b")), (1, None))
+
+    def test_mutate_updated_dict(self):
+        d = {}
+        c = Context({"a": 1})
+        c.update(d)
+        c.push()
+        d["a"] = 2
+        d["b"] = 3
+        self.assertEqual((c["a"], c["b"]), (2, 3))
+        c["a"] = 4
+        self.assertEqual(c["a"], 4)
+        c.pop()
+        self.assertEqual(c["a"], 2)
+        del d["a"]
+        self.assertEqual(c["a"], 1)
+        self.assertTrue("b" in c)
@@ -14,10 +14,15 @@ import pkg_resources
 import imp
 import StringIO
 import os.path
+import shutil
+import tempfile
 
+from django.core.management import call_command
 from django.template import TemplateDoesNotExist, Context
 from django.template.loaders.eggs import Loader as EggLoader
+from django.template.loaders import cached, persistent
 from django.template import loader
+from django.test.utils import override_settings
 from django.utils import unittest
 
 
@@ -118,6 +123,210 @@ class CachedLoader(unittest.TestCase):
         # The two templates should not have the same content
         self.assertNotEqual(t1.render(Context({})), t2.render(Context({})))
 
+    def test_load_template_override(self):
+        # Loaders returning their own templates are called as usual.
+        template_loader = cached.Loader(('regressiontests.templates.loaders.CustomEngineLoader',))
+        template = template_loader.load_template('custom.html')[0]
+        self.assertEqual(template.render(Context()), 'custom-engine')
+
+
+class CustomEngineTemplate(object):
+    def render(self, context):
+        return 'custom-engine'
+
+
+class CustomEngineLoader(loader.BaseLoader):
+    """A loader returning templates of another engine."""
+    is_usable = True
+
+    def load_template(self, template_name, template_dirs=None):
+        return CustomEngineTemplate(), None
+
+    def load_template_source(self, template_name, template_dirs=None):
+        return '{{ django }}', template_name
+
+
+class PersistentLoaderTest(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.templates = {
+            'base.html': '{% for i in items %}{% if i and i != 2 %}{{ i|add:1 }}{% endif %}{% endfor %}',
+            'simple.html': '{% load custom %}{% no_params %}',
+        }
+        self.settings_override = override_settings(TEMPLATE_CACHE_DIR=self.cache_dir,
+                                                   TEMPLATE_DEBUG=False)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.cache_dir)
+
+    def get_loader(self):
+        def load_template_source(template_name, template_dirs=None):
+            try:
+                return self.templates[template_name], template_name
+            except KeyError:
+                raise TemplateDoesNotExist(template_name)
+        template_loader = persistent.Loader(('test_template_loader',))
+        template_loader._cached_loaders = (load_template_source,)
+        return template_loader
+
+    def get_cache_path(self, template_name):
+        return self.get_loader().get_cache_path(self.templates[template_name], template_name)
+
+    def test_stored(self):
+        template = self.get_loader().load_template('base.html')[0]
+        self.assertTrue(os.path.exists(self.get_cache_path('base.html')))
+        self.assertEqual(template.render(Context({'items': [0, 1, 2, 3]})), u'24')
+
+        # Other loaders read the template from the disk instead of parsing it.
+        old_get_template_from_string = cached.get_template_from_string
+        def get_template_from_string(*args):
+            self.fail('The template should not have been parsed.')
+        cached.get_template_from_string = get_template_from_string
+        try:
+            template = self.get_loader().load_template('base.html')[0]
+        finally:
+            cached.get_template_from_string = old_get_template_from_string
+        self.assertEqual(template.render(Context({'items': [0, 1, 2, 3]})), u'24')
+
+    def test_source_changed(self):
+        self.get_loader().load_template('base.html')
+        old_path = self.get_cache_path('base.html')
+        self.templates['base.html'] = 'changed'
+        self.assertNotEqual(self.get_cache_path('base.html'), old_path)
+        template = self.get_loader().load_template('base.html')[0]
+        self.assertEqual(template.render(Context()), u'changed')
+
+    def test_included_changed(self):
+        self.templates['parent.html'] = 'PARENT[{% include "child.html" %}]'
+        self.templates['child.html'] = 'old'
+        old_template_source_loaders = loader.template_source_loaders
+        try:
+            # {% include %} loads templates through the configured loaders.
+            template_loader = loader.template_source_loaders = (self.get_loader(),)
+            template = template_loader[0].load_template('parent.html')[0]
+            self.assertEqual(template.render(Context()), u'PARENT[old]')
+            self.templates['child.html'] = 'NEW'
+            # A new process reads the parent from the disk.
+            template_loader = loader.template_source_loaders = (self.get_loader(),)
+            template = template_loader[0].load_template('parent.html')[0]
+            self.assertEqual(template.render(Context()), u'PARENT[NEW]')
+        finally:
+            loader.template_source_loaders = old_template_source_loaders
+
+    def test_invalid_file(self):
+        self.get_loader().load_template('base.html')
+        path = self.get_cache_path('base.html')
+        f = open(path, 'wb')
+        f.write('invalid')
+        f.close()
+        template = self.get_loader().load_template('base.html')[0]
+        self.assertEqual(template.render(Context({'items': [1]})), u'2')
+        self.assertNotEqual(open(path, 'rb').read(), 'invalid')
+
+    def test_simple_tag(self):
+        self.get_loader().load_template('simple.html')
+        template = self.get_loader().load_template('simple.html')[0]
+        self.assertTrue(os.path.exists(self.get_cache_path('simple.html')))
+        self.assertEqual(template.render(Context()), u'no_params - Expected result')
+
+    def test_not_picklable(self):
+        # The tag calls a lambda, which can't be pickled.
+        self.templates['lambda.html'] = '{% load custom %}{% minusone 2 %}'
+        template = self.get_loader().load_template('lambda.html')[0]
+        self.assertEqual(template.render(Context()), u'1')
+        self.assertFalse(os.path.exists(self.get_cache_path('lambda.html')))
+
+    @override_settings(TEMPLATE_COMPILE=True)
+    def test_compiled(self):
+        self.get_loader().load_template('base.html')
+        template = self.get_loader().load_template('base.html')[0]
+        self.assertNotEqual(template.nodelist.compiled, None)
+        self.assertEqual(template.render(Context({'items': [3]})), u'4')
+
+    @override_settings(TEMPLATE_DEBUG=True)
+    def test_debug(self):
+        self.get_loader().load_template('base.html')
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_precompile_command(self):
+        template_dir = os.path.join(os.path.dirname(__file__), 'templates', 'first')
+        with override_settings(TEMPLATE_DIRS=(template_dir,), TEMPLATE_LOADERS=(
+                ('django.template.loaders.persistent.Loader',
+                    ('django.template.loaders.filesystem.Loader',)),)):
+            stdout = StringIO.StringIO()
+            call_command('precompiletemplates', stdout=stdout)
+            self.assertEqual(stdout.getvalue(),
+                             '1 templates stored, 0 already up to date, 0 skipped.\n')
+            stdout = StringIO.StringIO()
+            call_command('precompiletemplates', stdout=stdout)
+            self.assertEqual(stdout.getvalue(),
+                             '0 templates stored, 1 already up to date, 0 skipped.\n')
+
+class CachedLoaderCheckTest(unittest.TestCase):
+    def setUp(self):
+        self.template_dir = tempfile.mkdtemp()
+        self.write('base.html', 'base {% include "included.html" %}')
+        self.write('included.html', 'included')
+        self.write('other.html', 'other')
+        self.loader = cached.Loader(('django.template.loaders.filesystem.Loader',))
+        # {% include %} loads templates through the configured loaders.
+        self.old_template_source_loaders = loader.template_source_loaders
+        loader.template_source_loaders = (self.loader,)
+        self.settings_override = override_settings(TEMPLATE_DIRS=(self.template_dir,))
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        loader.template_source_loaders = self.old_template_source_loaders
+        shutil.rmtree(self.template_dir)
+
+    def write(self, template_name, source):
+        path = os.path.join(self.template_dir, template_name)
+        f = open(path, 'w')
+        f.write(source)
+        f.close()
+        # Make sure the modification time changes whatever the resolution
+        # of the file system.
+        mtime = getattr(self, 'mtime', 1000000000) + 10
+        os.utime(path, (mtime, mtime))
+        self.mtime = mtime
+
+    def render(self, template_name):
+        return self.loader.load_template(template_name)[0].render(Context())
+
+    @override_settings(TEMPLATE_CACHE_CHECK_INTERVAL=0)
+    def test_changed(self):
+        self.assertEqual(self.render('other.html'), u'other')
+        self.write('other.html', 'changed')
+        self.assertEqual(self.render('other.html'), u'changed')
+
+    @override_settings(TEMPLATE_CACHE_CHECK_INTERVAL=0)
+    def test_dependencies(self):
+        self.assertEqual(self.render('base.html'), u'base included')
+        other = self.loader.load_template('other.html')[0]
+        self.write('included.html', 'changed')
+        self.assertEqual(self.render('base.html'), u'base changed')
+        # Templates that don't depend on the changed one stay in the cache.
+        self.assertTrue(self.loader.load_template('other.html')[0] is other)
+
+    @override_settings(TEMPLATE_CACHE_CHECK_INTERVAL=3600)
+    def test_interval(self):
+        self.assertEqual(self.render('other.html'), u'other')
+        self.write('other.html', 'changed')
+        self.assertEqual(self.render('other.html'), u'other')
+        self.loader.last_check -= 3600
+        self.assertEqual(self.render('other.html'), u'changed')
+
+    @override_settings(TEMPLATE_CACHE_CHECK_INTERVAL=None)
+    def test_disabled(self):
+        self.assertEqual(self.render('other.html'), u'other')
+        self.write('other.html', 'changed')
+        self.loader.last_check -= 3600
+        self.assertEqual(self.render('other.html'), u'other')
+        self.assertEqual(self.loader.source_stats, {})
+
 class RenderToStringTest(unittest.TestCase):
 
     def setUp(self):
@@ -0,0 +1,48 @@
+from django.template import Context, Variable, VariableDoesNotExist
+from django.template.base import ATTRIBUTE_LOOKUP, INDEX_LOOKUP
+from django.utils.unittest import TestCase
+
+
+class Obj(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class Mapping(object):
+    "Supports both attribute and dictionary lookups."
+    def __init__(self, items):
+        self.items = items
+        self.attr = 'attr'
+
+    def __getitem__(self, key):
+        return self.items[key]
+
+
+class VariableLookupTests(TestCase):
+
+    def test_int_lookups(self):
+        self.assertEqual(Variable('a.0.b').int_lookups, {'a': None, '0': 0, 'b': None})
+
+    def test_attribute_lookup_remembered(self):
+        var = Variable('obj.attr')
+        self.assertEqual(var.resolve(Context({'obj': Obj(attr=1)})), 1)
+        self.assertEqual(var.lookup_strategies, {('attr', Obj): ATTRIBUTE_LOOKUP})
+        self.assertEqual(var.resolve(Context({'obj': Obj(attr=2)})), 2)
+        self.assertRaises(VariableDoesNotExist, var.resolve, Context({'obj': Obj()}))
+        # Other types go through the usual lookups.
+        self.assertEqual(var.resolve(Context({'obj': {'attr': 3}})), 3)
+
+    def test_index_lookup_remembered(self):
+        var = Variable('items.1')
+        self.assertEqual(var.resolve(Context({'items': ['a', 'b']})), 'b')
+        self.assertEqual(var.lookup_strategies, {('1', list): INDEX_LOOKUP})
+        self.assertEqual(var.resolve(Context({'items': ['c', 'd']})), 'd')
+        self.assertRaises(VariableDoesNotExist, var.resolve, Context({'items': []}))
+        self.assertEqual(var.resolve(Context({'items': {'1': 'e'}})), 'e')
+
+    def test_dictionary_lookup_kept_first(self):
+        # Types supporting dictionary lookups always try them first.
+        var = Variable('obj.attr')
+        self.assertEqual(var.resolve(Context({'obj': Mapping({})})), 'attr')
+        self.assertEqual(var.lookup_strategies, {})
+        self.assertEqual(var.resolve(Context({'obj': Mapping({'attr': 'item'})})), 'item')
@@ -56,3 +56,11 @@ class ErrorIndexTest(TestCase):
                 error_source_index = e.django_template_source[1]
                 self.assertEqual(error_source_index,
                                  expected_error_source_index)
+
+    @override_settings(DEBUG=True, TEMPLATE_DEBUG=True, TEMPLATE_PROFILING=True)
+    def test_correct_exception_index_when_profiling(self):
+        template = get_template_from_string(
+            '{% load bad_tag %}{% for i in range %}{% for j in five %}{% badsimpletag %}{% endfor %}{% endfor %}')
+        with self.assertRaises(TypeError) as cm:
+            template.render(Context({'range': range(5), 'five': 5}))
+        self.assertEqual(cm.exception.django_template_source[1], (38, 57))
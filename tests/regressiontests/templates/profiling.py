@@ -0,0 +1,106 @@
+from django.db import connection
+from django.template import Context, Template
+from django.template.loader import get_template
+from django.template.profiling import template_profiled
+from django.test.utils import (setup_test_template_loader,
+    restore_template_loaders, override_settings)
+from django.utils.unittest import TestCase
+
+
+class ProfilingTests(TestCase):
+
+    def setUp(self):
+        setup_test_template_loader({
+            'base.html': '<{% block content %}{% endblock %}>',
+            'child.html': ('{% extends "base.html" %}{% block content %}'
+                           '{% for i in items %}{% include "item.html" %}{% endfor %}'
+                           '{% endblock %}'),
+            'item.html': '{{ i }}\n{% if i %}!{% endif %}',
+        })
+        self.profiles = []
+        template_profiled.connect(self.receive)
+
+    def tearDown(self):
+        template_profiled.disconnect(self.receive)
+        restore_template_loaders()
+
+    def receive(self, sender, template, context, profile, **kwargs):
+        self.profiles.append(profile)
+
+    def render(self, template_name, context):
+        return get_template(template_name).render(Context(context))
+
+    @override_settings(TEMPLATE_PROFILING=True)
+    def test_frames(self):
+        self.assertEqual(self.render('child.html', {'items': [0, 1, 2]}),
+                         u'<0\n1\n!2\n!>')
+        # The signal is only sent for the outermost template.
+        self.assertEqual(len(self.profiles), 1)
+        profile = self.profiles[0]
+        [template] = profile.root.children.values()
+        self.assertEqual(template.key.name, 'child.html')
+        self.assertEqual(template.calls, 1)
+        [extends] = template.children.values()
+        [block] = extends.children.values()
+        [for_node] = block.children.values()
+        [include] = for_node.children.values()
+        self.assertEqual(include.calls, 3)
+        [item] = include.children.values()
+        self.assertEqual(item.key.name, 'item.html')
+        self.assertEqual(item.calls, 3)
+        self.assertEqual([profile.label(f.key) for f in item.children.values()],
+                         ['{{ i }}', 'IfNode'])
+        self.assertTrue(profile.time >= template.time >= block.time >= 0)
+
+    @override_settings(TEMPLATE_PROFILING=True)
+    def test_stream(self):
+        stream = get_template('child.html').stream(Context({'items': [0, 1, 2]}),
+                                                   buffer_size=0)
+        self.assertEqual(stream.next(), u'<')
+        # The profile is sent once the output is consumed.
+        self.assertEqual(self.profiles, [])
+        self.assertEqual(u''.join(stream), u'0\n1\n!2\n!>')
+        self.assertEqual(len(self.profiles), 1)
+        profile = self.profiles[0]
+        [template] = profile.root.children.values()
+        self.assertEqual(template.key.name, 'child.html')
+        self.assertEqual(template.calls, 1)
+        [extends] = template.children.values()
+        [block] = extends.children.values()
+        [for_node] = block.children.values()
+        [include] = for_node.children.values()
+        self.assertEqual(include.calls, 3)
+        [item] = include.children.values()
+        self.assertEqual(item.key.name, 'item.html')
+        self.assertEqual(item.calls, 3)
+        self.assertEqual([profile.label(f.key) for f in item.children.values()],
+                         ['{{ i }}', 'IfNode'])
+
+    @override_settings(TEMPLATE_PROFILING=True, TEMPLATE_DEBUG=True)
+    def test_folded(self):
+        self.render('child.html', {'items': [1]})
+        stacks = [line.rsplit(' ', 1)[0]
+                  for line in self.profiles[0].folded().splitlines()]
+        self.assertTrue('child.html;test:child.html:1 {% extends "base.html" %};'
+                        'test:base.html:1 {% block content %};'
+                        'test:child.html:1 {% for i in items %};'
+                        'test:child.html:1 {% include "item.html" %};'
+                        'item.html;test:item.html:2 {% if i %}' in stacks)
+
+    @override_settings(TEMPLATE_PROFILING=True, DEBUG=True)
+    def test_queries(self):
+        def query():
+            connection.cursor().execute('SELECT 1')
+            return 'query'
+        Template('{% for i in items %}{{ query }}{% endfor %}').render(
+            Context({'items': [1, 2], 'query': query}))
+        profile = self.profiles[0]
+        self.assertEqual(profile.root.queries, 0)
+        [template] = profile.root.children.values()
+        self.assertEqual(template.queries, 2)
+        self.assertEqual(profile.folded('queries'),
+                         '<Unknown Template>;ForNode;{{ query }} 2\n')
+
+    def test_disabled(self):
+        self.render('child.html', {'items': [1]})
+        self.assertEqual(self.profiles, [])
@@ -0,0 +1,108 @@
+from django.template import Context, Template
+from django.template.loader import render_to_iterator
+from django.test.utils import (setup_test_template_loader,
+    restore_template_loaders, override_settings)
+from django.utils.unittest import TestCase
+
+
+class Items(object):
+    "An iterable recording how many items were consumed."
+    def __init__(self, count):
+        self.count = count
+        self.consumed = 0
+
+    def __iter__(self):
+        for i in range(self.count):
+            self.consumed += 1
+            yield i
+
+
+class Broken(object):
+    def fail(self):
+        raise ValueError
+
+
+class StreamingTests(TestCase):
+
+    def setUp(self):
+        setup_test_template_loader({
+            'base.html': '<{% block content %}base{% endblock %}>',
+            'child.html': ('{% extends "base.html" %}{% block content %}'
+                           '{{ block.super }}{% for i in items %}{% include "item.html" %}'
+                           '{% endfor %}{% endblock %}'),
+            'item.html': '[{{ i }}{% if i %}!{% endif %}]',
+            'broken.html': '{{ i|add }}',
+        })
+
+    def tearDown(self):
+        restore_template_loaders()
+
+    def stream(self, source, context, buffer_size=0):
+        return list(Template(source).stream(Context(context), buffer_size))
+
+    def test_same_output(self):
+        for source in [
+            '{% for a, b in items %}{{ forloop.counter }}{{ a }}{{ b|upper }}{% empty %}-{% endfor %}',
+            '{% if x %}x{% elif y %}y{% else %}z{% endif %}',
+            '{% with x|add:1 as y %}{{ y }}{% endwith %}',
+            '{{ y }}{% autoescape off %}{{ y }}{% endautoescape %}{{ y }}',
+            '{% include "child.html" %}',
+            '{% extends "child.html" %}{% block content %}{{ block.super }}/{% endblock %}',
+            '{% for i in items %}{% include "broken.html" %}{% endfor %}',
+        ]:
+            for context in [{}, {'items': [('a', 'b'), ('c', 'd')], 'x': 1, 'y': '<'}]:
+                expected = Template(source).render(Context(context))
+                self.assertEqual(u''.join(self.stream(source, context)), expected)
+
+    def test_chunks(self):
+        # Chunks are yielded at node boundaries and for every iteration of
+        # {% for %} loops, including those of extended and included templates.
+        self.assertEqual(self.stream('a{{ b }}{% for i in c %}{{ i }},{% endfor %}d',
+                                     {'b': 'b', 'c': [1, 2]}),
+                         [u'a', u'b', u'1,', u'2,', u'd'])
+        self.assertEqual(self.stream('{% include "child.html" %}', {'items': [0, 1]}),
+                         [u'<', u'base', u'[0]', u'[1!]', u'>'])
+
+    def test_buffer_size(self):
+        chunks = self.stream('{% for i in items %}{{ i }}{% endfor %}',
+                             {'items': range(10)}, buffer_size=3)
+        self.assertEqual(chunks, [u'012', u'345', u'678', u'9'])
+
+    def test_lazy(self):
+        items = Items(3)
+        stream = Template('{% for i in items %}{{ i }}{% endfor %}').stream(
+            Context({'items': items}), 0)
+        self.assertEqual(items.consumed, 0)
+        self.assertEqual(stream.next(), u'0')
+        # {% for %} loops make a list of the sequence first.
+        self.assertEqual(items.consumed, 3)
+        self.assertEqual(list(stream), [u'1', u'2'])
+
+    def test_context_restored(self):
+        context = Context({'items': [1, 2]})
+        stream = Template('{% with b=2 %}{% for i in items %}{{ i }}{% endfor %}{% endwith %}'
+                          ).stream(context, 0)
+        stream.next()
+        self.assertEqual(context['b'], 2)
+        self.assertEqual(len(context.render_context.dicts), 2)
+        list(stream)
+        self.assertFalse('b' in context)
+        self.assertEqual(len(context.render_context.dicts), 1)
+
+    def test_render_to_iterator(self):
+        context = Context({'items': [1]})
+        chunks = render_to_iterator('child.html', {'a': 1}, context_instance=context)
+        self.assertEqual(u''.join(chunks), u'<base[1!]>')
+        self.assertFalse('a' in context)
+        self.assertEqual(u''.join(render_to_iterator(['missing.html', 'item.html'])),
+                         u'[]')
+
+    @override_settings(TEMPLATE_DEBUG=True)
+    def test_debug_source(self):
+        template = Template('{% for i in items %}{% if i %}{{ i.fail }}{% endif %}{% endfor %}')
+        try:
+            list(template.stream(Context({'items': [Broken()]})))
+        except ValueError, e:
+            self.assertEqual(e.django_template_source[1], (30, 42))
+        else:
+            self.fail('The error should have been raised.')
@@ -31,17 +31,22 @@ from django.utils.safestring import mark_safe
 from django.utils.tzinfo import LocalTimezone
 
 from .callables import CallableVariablesTests
+from .compiler import CompilerTests
 from .context import ContextTests
 from .custom import CustomTagTests, CustomFilterTests
+from .lookups import VariableLookupTests
 from .parser import ParserTests
+from .profiling import ProfilingTests
 from .unicode import UnicodeTests
 from .nodelist import NodelistTest, ErrorIndexTest
 from .smartif import SmartIfTests
+from .streaming import StreamingTests
 from .response import (TemplateResponseTest, CacheMiddlewareTest,
     SimpleTemplateResponseTest, CustomURLConfTest)
 
 try:
-    from .loaders import RenderToStringTest, EggLoaderTest
+    from .loaders import (RenderToStringTest, EggLoaderTest, PersistentLoaderTest,
+        CachedLoader, CachedLoaderCheckTest)
 except ImportError, e:
     if "pkg_resources" in e.message:
         pass # If setuptools isn't installed, that's fine. Just move on.
@@ -356,6 +361,37 @@ class Templates(unittest.TestCase):
             loader.template_source_loaders = old_loaders
             settings.TEMPLATE_DEBUG = old_td
 
+    def test_include_loaded_once_per_render(self):
+        """
+        Templates included or extended through a variable are loaded once
+        per render, not once per iteration of the enclosing loop.
+        """
+        templates = {
+            'base.html': '[{% block content %}{% endblock %}]',
+            'child.html': '{% extends base %}{% block content %}{{ i }}{% endblock %}',
+        }
+        loaded = []
+        def test_template_loader(template_name, template_dirs=None):
+            loaded.append(template_name)
+            try:
+                return templates[template_name], template_name
+            except KeyError:
+                raise template.TemplateDoesNotExist(template_name)
+        old_loaders = loader.template_source_loaders
+        try:
+            loader.template_source_loaders = (test_template_loader,)
+            t = Template('{% for i in items %}{% include name %}'
+                         '{% include name with i="x" base=base only %}{% endfor %}')
+            c = Context({'items': range(3), 'name': 'child.html', 'base': 'base.html'})
+            self.assertEqual(t.render(c), u'[0][x][1][x][2][x]')
+            self.assertEqual(loaded, ['child.html', 'base.html'])
+            # A new render loads them again.
+            self.assertEqual(t.render(Context({'items': [], 'name': 'child.html'})), u'')
+            t.render(Context({'items': [0], 'name': 'child.html', 'base': 'base.html'}))
+            self.assertEqual(loaded, ['child.html', 'base.html'] * 2)
+        finally:
+            loader.template_source_loaders = old_loaders
+
     def test_token_smart_split(self):
         # Regression test for #7027
         token = template.Token(template.TOKEN_BLOCK, 'sometag _("Page not found") value|yesno:_("yes,no")')
@@ -415,6 +451,7 @@ class Templates(unittest.TestCase):
 
         # Turn TEMPLATE_DEBUG off, because tests assume that.
         old_td, settings.TEMPLATE_DEBUG = settings.TEMPLATE_DEBUG, False
+        old_compile = settings.TEMPLATE_COMPILE
 
         # Set TEMPLATE_STRING_IF_INVALID to a known string.
         old_invalid = settings.TEMPLATE_STRING_IF_INVALID
@@ -456,35 +493,38 @@ class Templates(unittest.TestCase):
             else:
                 activate('en-us')
 
-            for invalid_str, template_debug, result in [
-                    ('', False, normal_string_result),
-                    (expected_invalid_str, False, invalid_string_result),
-                    ('', True, template_debug_result)
+            for invalid_str, template_debug, template_compile, result in [
+                    ('', False, False, normal_string_result),
+                    (expected_invalid_str, False, False, invalid_string_result),
+                    ('', False, True, normal_string_result),
+                    (expected_invalid_str, False, True, invalid_string_result),
+                    ('', True, False, template_debug_result)
                 ]:
                 settings.TEMPLATE_STRING_IF_INVALID = invalid_str
                 settings.TEMPLATE_DEBUG = template_debug
+                settings.TEMPLATE_COMPILE = template_compile
                 for is_cached in (False, True):
                     try:
                         try:
                             test_template = loader.get_template(name)
                         except ShouldNotExecuteException:
-                            failures.append("Template test (Cached='%s', TEMPLATE_STRING_IF_INVALID='%s', TEMPLATE_DEBUG=%s): %s -- FAILED. Template loading invoked method that shouldn't have been invoked." % (is_cached, invalid_str, template_debug, name))
+                            failures.append("Template test (Cached='%s', TEMPLATE_STRING_IF_INVALID='%s', TEMPLATE_DEBUG=%s, TEMPLATE_COMPILE=%s): %s -- FAILED. Template loading invoked method that shouldn't have been invoked." % (is_cached, invalid_str, template_debug, template_compile, name))
 
                         try:
                             output = self.render(test_template, vals)
                         except ShouldNotExecuteException:
-                            failures.append("Template test (Cached='%s', TEMPLATE_STRING_IF_INVALID='%s', TEMPLATE_DEBUG=%s): %s -- FAILED. Template rendering invoked method that shouldn't have been invoked." % (is_cached, invalid_str, template_debug, name))
+                            failures.append("Template test (Cached='%s', TEMPLATE_STRING_IF_INVALID='%s', TEMPLATE_DEBUG=%s, TEMPLATE_COMPILE=%s): %s -- FAILED. Template rendering invoked method that shouldn't have been invoked." % (is_cached, invalid_str, template_debug, template_compile, name))
                     except ContextStackException:
-                        failures.append("Template test (Cached='%s', TEMPLATE_STRING_IF_INVALID='%s', TEMPLATE_DEBUG=%s): %s -- FAILED. Context stack was left imbalanced" % (is_cached, invalid_str, template_debug, name))
+                        failures.append("Template test (Cached='%s', TEMPLATE_STRING_IF_INVALID='%s', TEMPLATE_DEBUG=%s, TEMPLATE_COMPILE=%s): %s -- FAILED. Context stack was left imbalanced" % (is_cached, invalid_str, template_debug, template_compile, name))
                         continue
                     except Exception:
                         exc_type, exc_value, exc_tb = sys.exc_info()
                         if exc_type != result:
                             tb = '\n'.join(traceback.format_exception(exc_type, exc_value, exc_tb))
-                            failures.append("Template test (Cached='%s', TEMPLATE_STRING_IF_INVALID='%s', TEMPLATE_DEBUG=%s): %s -- FAILED. Got %s, exception: %s\n%s" % (is_cached, invalid_str, template_debug, name, exc_type, exc_value, tb))
+                            failures.append("Template test (Cached='%s', TEMPLATE_STRING_IF_INVALID='%s', TEMPLATE_DEBUG=%s, TEMPLATE_COMPILE=%s): %s -- FAILED. Got %s, exception: %s\n%s" % (is_cached, invalid_str, template_debug, template_compile, name, exc_type, exc_value, tb))
                         continue
                     if output != result:
-                        failures.append("Template test (Cached='%s', TEMPLATE_STRING_IF_INVALID='%s', TEMPLATE_DEBUG=%s): %s -- FAILED. Expected %r, got %r" % (is_cached, invalid_str, template_debug, name, result, output))
+                        failures.append("Template test (Cached='%s', TEMPLATE_STRING_IF_INVALID='%s', TEMPLATE_DEBUG=%s, TEMPLATE_COMPILE=%s): %s -- FAILED. Expected %r, got %r" % (is_cached, invalid_str, template_debug, template_compile, name, result, output))
                 cache_loader.reset()
 
             if 'LANGUAGE_CODE' in vals[1]:
@@ -497,6 +537,7 @@ class Templates(unittest.TestCase):
         restore_template_loaders()
         deactivate()
         settings.TEMPLATE_DEBUG = old_td
+        settings.TEMPLATE_COMPILE = old_compile
         settings.TEMPLATE_STRING_IF_INVALID = old_invalid
         settings.ALLOWED_INCLUDE_ROOTS = old_allowed_include_roots
 
@@ -6,11 +6,12 @@ from __future__ import absolute_import
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured, ViewDoesNotExist
 from django.core.urlresolvers import (reverse, resolve, NoReverseMatch,
-    Resolver404, ResolverMatch, RegexURLResolver, RegexURLPattern)
+    Resolver404, ResolverMatch, RegexURLResolver, RegexURLPattern,
+    get_script_prefix, set_script_prefix, ALL_LANGUAGES)
 from django.http import HttpResponseRedirect, HttpResponsePermanentRedirect
 from django.shortcuts import redirect
 from django.test import TestCase
-from django.utils import unittest
+from django.utils import translation, unittest
 from django.contrib.auth.models import User
 
 from . import urlconf_outer, urlconf_inner, middleware, views
@@ -170,6 +171,27 @@ class URLPatternReverse(TestCase):
         # Reversing None should raise an error, not return the last un-named view.
         self.assertRaises(NoReverseMatch, reverse, None)
 
+    def test_reverse_cache(self):
+        class Place(object):
+            def __init__(self, id):
+                self.id = id
+            def __unicode__(self):
+                return unicode(self.id)
+        place = Place(1)
+        self.assertEqual(reverse('places', args=[place]), '/places/1/')
+        # The text of the argument is looked up again.
+        place.id = 2
+        self.assertEqual(reverse('places', args=[place]), '/places/2/')
+        self.assertEqual(reverse('places4', kwargs={'id': 3}), '/places/3/')
+        self.assertEqual(reverse('places4', kwargs={'id': 3}), '/places/3/')
+        old_prefix = get_script_prefix()
+        set_script_prefix('/prefix/')
+        try:
+            self.assertEqual(reverse('places4', kwargs={'id': 3}), '/prefix/places/3/')
+        finally:
+            set_script_prefix(old_prefix)
+        self.assertRaises(NoReverseMatch, reverse, 'places4', kwargs={'id': 'a'})
+
 class ResolverTests(unittest.TestCase):
     def test_non_regex(self):
         """
@@ -221,6 +243,53 @@ class ResolverTests(unittest.TestCase):
                         else:
                             self.assertEqual(t.name, e['name'], 'Wrong URL name.  Expected "%s", got "%s".' % (e['name'], t.name))
 
+    def test_resolve_order(self):
+        """
+        Patterns are tried in order, whether their regex has a literal prefix
+        or not, and only those whose prefix matches the path are tried.
+        """
+        resolver = RegexURLResolver(r'^/', [
+            RegexURLPattern(r'^articles/2003/$', views.empty_view, name='special'),
+            RegexURLPattern(r'^(?P<section>\w+)/2004/$', views.empty_view, name='section'),
+            RegexURLPattern(r'^articles/(?P<year>\d+)/$', views.empty_view, name='year'),
+            RegexURLResolver(r'^blog/', [
+                RegexURLPattern(r'^$', views.empty_view, name='blog'),
+            ]),
+        ])
+        self.assertEqual(resolver.resolve('/articles/2003/').url_name, 'special')
+        self.assertEqual(resolver.resolve('/articles/2004/').url_name, 'section')
+        self.assertEqual(resolver.resolve('/blog/').url_name, 'blog')
+        patterns, positions = resolver.candidate_patterns('blog/')
+        self.assertEqual(positions, [1, 3])
+        try:
+            resolver.resolve('/blog/missing')
+        except Resolver404, e:
+            self.assertEqual([[getattr(p, 'name', None) for p in tried]
+                              for tried in e.args[0]['tried']],
+                             [['special'], ['section'], ['year'], [None, 'blog']])
+        else:
+            self.fail('resolve did not raise a 404')
+
+class PopulateTests(unittest.TestCase):
+    def test_namespaces_only(self):
+        """
+        Reversing a namespaced URL doesn't populate the reverse dictionary of
+        the URLconfs that include the namespace.
+        """
+        resolver = RegexURLResolver(r'^/', 'regressiontests.urlpatterns_reverse.namespace_urls')
+        self.assertEqual(resolver.namespace_dict['test-ns1'][0], 'test1/')
+        self.assertEqual(resolver._reverse_dict, {})
+        resolver.reverse_dict
+        self.assertEqual(resolver._reverse_dict.keys(), [ALL_LANGUAGES])
+
+    def test_shared_languages(self):
+        resolver = RegexURLResolver(r'^/', 'regressiontests.urlpatterns_reverse.urls')
+        with translation.override('en'):
+            en_dict = resolver.reverse_dict
+        with translation.override('nl'):
+            self.assertTrue(resolver.reverse_dict is en_dict)
+        self.assertEqual(resolver._reverse_dict.keys(), [ALL_LANGUAGES])
+
 class ReverseLazyTest(TestCase):
     urls = 'regressiontests.urlpatterns_reverse.reverse_lazy_urls'
 
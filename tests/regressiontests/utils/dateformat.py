@@ -32,6 +32,16 @@ class DateFormatTests(unittest.TestCase):
         if self.tz_tests:
             time.tzset()
 
+    def test_compiled_format(self):
+        dt = datetime(2009, 5, 16, 5, 30, 30)
+        dateformat.compile_format.cache_clear()
+        self.assertEqual(dateformat.compile_format(u'\\Y-Y'),
+                         ((False, u'Y-'), (True, u'Y')))
+        self.assertEqual(format(dt, '\\Y-Y'), u'Y-2009')
+        # Cached formats give the same result.
+        self.assertEqual(format(dt, '\\Y-Y'), u'Y-2009')
+        self.assertEqual(format(dt, u'\\Y-Y e'), u'Y-2009 ')
+
     def test_date(self):
         d = date(2009, 5, 16)
         self.assertEqual(date.fromtimestamp(int(format(d, 'U'))), d)
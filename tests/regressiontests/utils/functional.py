@@ -1,5 +1,5 @@
 from django.utils import unittest
-from django.utils.functional import lazy, lazy_property
+from django.utils.functional import lazy, lazy_property, lru_cache
 
 
 class FunctionalTestCase(unittest.TestCase):
@@ -37,3 +37,20 @@ class FunctionalTestCase(unittest.TestCase):
 
         self.assertRaises(NotImplementedError, lambda: A().do)
         self.assertEqual(B().do, 'DO IT')
+
+    def test_lru_cache(self):
+        calls = []
+        @lru_cache(maxsize=2)
+        def double(x):
+            calls.append(x)
+            return x * 2
+
+        self.assertEqual([double(1), double(2), double(1)], [2, 4, 2])
+        self.assertEqual(calls, [1, 2])
+        # 2 is the least recently used argument, so it's dropped.
+        self.assertEqual(double(3), 6)
+        self.assertEqual([double(1), double(3), double(2)], [2, 6, 4])
+        self.assertEqual(calls, [1, 2, 3, 2])
+        double.cache_clear()
+        self.assertEqual(double(1), 2)
+        self.assertEqual(calls, [1, 2, 3, 2, 1])
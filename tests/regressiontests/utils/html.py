@@ -1,6 +1,7 @@
 import unittest
 
 from django.utils import html
+from django.utils.safestring import SafeData
 
 class TestUtilsHtml(unittest.TestCase):
 
@@ -31,6 +32,11 @@ class TestUtilsHtml(unittest.TestCase):
             self.check_output(f, value * 2, output * 2)
         # Verify it doesn't double replace &.
         self.check_output(f, '<&', '&lt;&amp;')
+        # Strings without special characters are only marked safe.
+        self.check_output(f, 'asdf', 'asdf')
+        self.assertTrue(isinstance(f('asdf'), SafeData))
+        self.assertTrue(isinstance(f(1), SafeData))
+        self.assertEqual(f(1), u'1')
 
     def test_linebreaks(self):
         f = html.linebreaks
@@ -46,3 +46,26 @@ class NormalizeTests(unittest.TestCase):
                     ['first_group_name'])]
         result = regex_helper.normalize(pattern)
         self.assertEqual(result, expected)
+
+
+class LiteralPrefixTests(unittest.TestCase):
+    def test_literal_prefix(self):
+        for pattern, expected in [
+            (r'^articles/(\d+)/$', u'articles/'),
+            (r'^articles/\d+/$', u'articles/'),
+            (r'^a\.b\-c/', u'a.b-c/'),
+            (r'^ab?c', u'a'),
+            (r'^ab*', u'a'),
+            (r'^ab{2}', u'a'),
+            (r'^ab+c', u'ab'),
+            (r'^(?P<slug>[\w-]+)/$', u''),
+            (r'^$', u''),
+            (r'articles/$', u''),
+            (r'^foo|^bar', u''),
+            (r'^foo/(bar|baz)/', u'foo/'),
+            (r'^foo/[|]', u'foo/'),
+            (r'^foo(?i)', u''),
+            (u'^caf\xe9/', u'caf'),
+        ]:
+            self.assertEqual(regex_helper.literal_prefix(pattern), expected,
+                             pattern)
@@ -1,4 +1,7 @@
 # -*- coding: utf-8 -*-
+import gzip
+import hashlib
+import StringIO
 import unittest
 
 from django.utils import text
@@ -102,3 +105,13 @@ class TestUtilsText(unittest.TestCase):
         self.assertEqual(text.wrap(long_word, 20), long_word)
         self.assertEqual(text.wrap('a %s word' % long_word, 10),
                          u'a\n%s\nword' % long_word)
+
+    def test_compress_sequence(self):
+        data = ['%d,%s\n' % (i, hashlib.md5(str(i)).hexdigest()) for i in range(5000)]
+        chunks = list(text.compress_sequence(iter(data)))
+        self.assertTrue(len(chunks) > 2)
+        self.assertFalse('' in chunks[:-1])
+        compressed = ''.join(chunks)
+        self.assertEqual(gzip.GzipFile(mode='rb',
+                                       fileobj=StringIO.StringIO(compressed)).read(),
+                         ''.join(data))